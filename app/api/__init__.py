@@ -1,5 +1,5 @@
 """API routes and dependencies."""
 
-from app.api.dependencies import verify_api_key
+from app.api.dependencies import verify_admin_key, verify_api_key
 
-__all__ = ["verify_api_key"]
+__all__ = ["verify_api_key", "verify_admin_key"]
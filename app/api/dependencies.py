@@ -1,26 +1,35 @@
-from fastapi import HTTPException, Security, status
+import secrets
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException, Request, Security, status
 from fastapi.security import APIKeyHeader
 
 from app.config import settings
+from app.core.tenants import Tenant, TenantRegistry
 
 # Define API key header
 API_KEY_HEADER = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 
-async def verify_api_key(api_key: str = Security(API_KEY_HEADER)) -> str:
+async def verify_api_key(request: Request, api_key: str = Security(API_KEY_HEADER)) -> Tenant:
     """
     Verify the API key from request header.
 
+    The tenant is also left in `request.state.tenant` (used as the rate
+    limit key).
+
     Args:
         api_key: API key from X-API-Key header
 
     Returns:
-        The validated API key
+        The Tenant owning the key
 
     Raises:
         HTTPException: If API key is missing or invalid
     """
-    if not settings.API_KEY:
+    await TenantRegistry.refresh()
+    if not TenantRegistry.configured():
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="API key not configured on server"
@@ -33,10 +42,46 @@ async def verify_api_key(api_key: str = Security(API_KEY_HEADER)) -> str:
             headers={"WWW-Authenticate": "ApiKey"}
         )
 
-    if api_key != settings.API_KEY:
+    tenant = TenantRegistry.lookup(api_key)
+    if tenant is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid API key"
         )
 
-    return api_key
+    request.state.tenant = tenant
+    return tenant
+
+
+async def verify_admin_key(api_key: str = Security(API_KEY_HEADER)) -> None:
+    """
+    Verify that the X-API-Key header holds ADMIN_API_KEY.
+
+    Raises:
+        HTTPException: If admin endpoints are disabled or the key is missing or wrong
+    """
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled (ADMIN_API_KEY not set)"
+        )
+
+    if not api_key:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing API key. Please provide X-API-Key header.",
+            headers={"WWW-Authenticate": "ApiKey"}
+        )
+
+    if not secrets.compare_digest(api_key.encode(), settings.ADMIN_API_KEY.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin API key"
+        )
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert a (possibly timezone-aware) query timestamp to naive UTC, as stored in the DB."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
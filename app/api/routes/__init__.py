@@ -4,10 +4,20 @@ from app.api.routes.health import router as health_router
 from app.api.routes.questions import router as questions_router
 from app.api.routes.pathways import router as pathways_router
 from app.api.routes.recommendations import router as recommendations_router
+from app.api.routes.sessions import router as sessions_router
+from app.api.routes.metrics import router as metrics_router
+from app.api.routes.analytics import router as analytics_router
+from app.api.routes.export import router as export_router
+from app.api.routes.admin import router as admin_router
 
 __all__ = [
     "health_router",
     "questions_router",
     "pathways_router",
     "recommendations_router",
+    "sessions_router",
+    "metrics_router",
+    "analytics_router",
+    "export_router",
+    "admin_router",
 ]
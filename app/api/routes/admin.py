@@ -0,0 +1,74 @@
+import logging
+import os
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+
+from app.config import settings
+from app.api.dependencies import verify_admin_key
+from app.core.profiler import ProfilerBusy, SamplingProfiler
+from app.core.rate_limit import rate_limit_strict
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.post("/profile", dependencies=[Depends(verify_admin_key)])
+@rate_limit_strict
+async def profile_worker(
+    request: Request,
+    seconds: float = Query(10, gt=0, description="How long to sample"),
+    interval_ms: float = Query(5, ge=1, le=100, description="Milliseconds between samples"),
+    slow_ms: float = Query(100, ge=10, description="Report event loop stalls longer than this"),
+    format: str = Query("speedscope", description="speedscope or collapsed"),
+    include_idle: bool = Query(False, description="Also count samples taken while the loop waits for I/O"),
+    pid: Optional[int] = Query(None, description="Only profile if served by this worker (409 otherwise, retry)"),
+):
+    """
+    Profile the worker that serves this request for `seconds`.
+
+    Requires X-API-Key header with ADMIN_API_KEY.
+
+    A thread samples the event loop's Python stack every `interval_ms` while
+    the worker keeps serving traffic; nothing is sampled outside a profile.
+    Stalls of the event loop longer than `slow_ms` are reported with the
+    stack that was running (`slow_callbacks`).
+
+    With format=speedscope, `profile` opens in https://www.speedscope.app
+    (`jq .profile`); with format=collapsed it is a string of "stack count"
+    lines for flamegraph.pl (`jq -r .profile`).
+
+    Several workers share the port, so the response names the `pid` that
+    was profiled; pass `pid` to insist on one worker.
+    """
+    if format not in ("speedscope", "collapsed"):
+        raise HTTPException(status_code=400, detail="format must be one of speedscope, collapsed")
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be at most {settings.PROFILER_MAX_SECONDS:g}")
+    if slow_ms < 2 * interval_ms:
+        raise HTTPException(status_code=400, detail="slow_ms must be at least twice interval_ms")
+    if pid is not None and pid != os.getpid():
+        raise HTTPException(status_code=409, detail=f"Served by worker {os.getpid()}, not {pid}; retry")
+
+    logger.info(f"Profiling worker {os.getpid()} for {seconds:g}s (every {interval_ms:g}ms)")
+    try:
+        profile = await SamplingProfiler.profile(
+            seconds,
+            interval=interval_ms / 1000,
+            slow_threshold=slow_ms / 1000,
+            include_idle=include_idle,
+        )
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {
+        "success": True,
+        "pid": profile.pid,
+        "duration": round(profile.duration, 3),
+        "interval_ms": interval_ms,
+        "samples": sum(profile.stacks.values()),
+        "idle_samples": profile.idle_samples,
+        "slow_callbacks": profile.slow_callback_report(),
+        "format": format,
+        "profile": profile.speedscope() if format == "speedscope" else profile.collapsed(),
+    }
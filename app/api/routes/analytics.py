@@ -0,0 +1,75 @@
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_read_db
+from app.api.dependencies import naive_utc, verify_api_key
+from app.core.tenants import Tenant
+from app.schemas import EntryType, PathwayAnalyticsResponse
+from app.services.analytics import AnalyticsService
+from app.core.rate_limit import rate_limit_default
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Analytics"])
+
+
+@router.get("/analytics/pathways", response_model=PathwayAnalyticsResponse)
+@rate_limit_default
+async def get_pathway_analytics(
+    request: Request,
+    start: Optional[datetime] = Query(None, description="Window start (UTC), default 7 days before end"),
+    end: Optional[datetime] = Query(None, description="Window end (UTC, exclusive), default now"),
+    granularity: str = Query("day", description="hour, day or total"),
+    group_by: List[str] = Query(
+        [], description="pathway, entry_type, spiritual_stage, primary_need, emotional_state (repeatable)"
+    ),
+    pathway_id: Optional[int] = Query(None, description="Only count this pathway"),
+    entry_type: Optional[EntryType] = Query(None, description="Only count this entry type"),
+    db: AsyncSession = Depends(get_read_db),
+    tenant: Tenant = Depends(verify_api_key)
+):
+    """
+    Recommendation counts and average confidence over time.
+
+    Requires X-API-Key header.
+
+    Served from hourly rollups maintained as recommendations are written,
+    so even year-long windows read a small table.
+
+    Example: `/analytics/pathways?granularity=day&group_by=pathway&group_by=spiritual_stage`
+    """
+    end = naive_utc(end) or datetime.utcnow()
+    start = naive_utc(start) or end - timedelta(days=7)
+    try:
+        rows = await AnalyticsService.query(
+            db,
+            start,
+            end,
+            granularity=granularity,
+            group_by=group_by,
+            pathway_id=pathway_id,
+            entry_type=entry_type.value if entry_type else None,
+        )
+        return PathwayAnalyticsResponse(
+            success=True,
+            start=start.isoformat(),
+            end=end.isoformat(),
+            granularity=granularity,
+            group_by=group_by,
+            rows=rows
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Analytics query error: {str(e)}")
+        return PathwayAnalyticsResponse(
+            success=False,
+            start=start.isoformat(),
+            end=end.isoformat(),
+            granularity=granularity,
+            group_by=group_by,
+            error=f"Failed to load analytics: {str(e)}"
+        )
@@ -0,0 +1,64 @@
+import logging
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi.responses import StreamingResponse
+
+from app.api.dependencies import naive_utc, verify_api_key
+from app.core.tenants import Tenant
+from app.schemas import EntryType
+from app.services.export import FORMATS, ExportService
+from app.core.rate_limit import rate_limit_strict
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Export"])
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+@router.get("/export/recommendations")
+@rate_limit_strict
+async def export_recommendations(
+    request: Request,
+    format: str = Query("ndjson", description="ndjson or csv"),
+    start: Optional[datetime] = Query(None, description="Only recommendations created at/after this time (UTC)"),
+    end: Optional[datetime] = Query(None, description="Only recommendations created before this time (UTC)"),
+    pathway_id: Optional[int] = Query(None, description="Only this pathway (see GET /pathways)"),
+    entry_type: Optional[EntryType] = Query(None, description="Only this entry type"),
+    tenant: Tenant = Depends(verify_api_key)
+):
+    """
+    Stream all matching recommendations, oldest first, as NDJSON or CSV.
+
+    Requires X-API-Key header.
+
+    The body is streamed straight from a server-side database cursor, so
+    exports of any size start immediately and use constant memory. Send
+    `Accept-Encoding: gzip` (e.g. `curl --compressed`) for a gzip-encoded stream.
+    """
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    start, end = naive_utc(start), naive_utc(end)
+    if start and end and end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+
+    stmt = ExportService.build_query(
+        start=start,
+        end=end,
+        pathway_id=pathway_id,
+        entry_type=entry_type.value if entry_type else None,
+    )
+    gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {
+        "Content-Disposition": f'attachment; filename="recommendations.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        ExportService.stream(stmt, format, gzip=gzip),
+        media_type=MEDIA_TYPES[format],
+        headers=headers,
+    )
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 
 from app.config import settings
-from app.db import get_db
-from app.core.health import get_full_health_check
+from app.core.health import HealthProber
+from app.core.warmup import Warmup
 
 router = APIRouter(tags=["Health"])
 
@@ -17,17 +17,64 @@ async def health_check_simple():
     }
 
 
+@router.get("/health/live")
+async def health_check_live():
+    """
+    Liveness probe (public): the process is up and its event loop responds.
+
+    Never checks dependencies, so an outage elsewhere doesn't get workers
+    restarted.
+    """
+    return {"status": "alive"}
+
+
+def _readiness() -> JSONResponse:
+    snapshot = HealthProber.snapshot()
+    warmup = Warmup.status()
+    ready = Warmup.done() and HealthProber.ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "warmup": warmup["status"],
+            "health": snapshot["status"],
+            "checked_at": snapshot["checked_at"],
+            "age_seconds": snapshot["age_seconds"],
+            "stale": snapshot["stale"],
+        },
+    )
+
+
+@router.get("/ready")
+async def ready():
+    """
+    Readiness probe (public): 200 once this worker has finished its startup
+    warmup (DB and AI connections opened, questions loaded) and while the
+    last background health check is fresh and reached the database, 503
+    otherwise.
+    """
+    return _readiness()
+
+
+@router.get("/health/ready")
+async def health_check_ready():
+    """Readiness probe (public), same as GET /ready."""
+    return _readiness()
+
+
 @router.get("/health/detailed")
-async def health_check_detailed(db: AsyncSession = Depends(get_db)):
+async def health_check_detailed():
     """
     Detailed health check endpoint with dependency status (public).
 
-    Tests actual connectivity to:
+    Served from the last background probe (every HEALTH_PROBE_INTERVAL
+    seconds), which tests connectivity to:
     - PostgreSQL database
     - Redis cache
     - OpenRouter AI API
 
-    Returns overall status and individual component health.
+    Returns overall status and individual component health (with each
+    check's latency), when the probe ran (`checked_at`), its `age_seconds`
+    and whether it is `stale` (older than three intervals).
     """
-    health_status = await get_full_health_check(db)
-    return health_status
+    return HealthProber.snapshot()
@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.core.metrics import REGISTRY
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus metrics (public - restrict at the network level).
+
+    With METRICS_MULTIPROC_DIR set, covers all workers: this worker's live
+    values plus the others' latest snapshots.
+    """
+    return PlainTextResponse(
+        await REGISTRY.render(settings.METRICS_MULTIPROC_DIR),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,16 +1,28 @@
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException, Depends, Request
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
+from app.config import settings
+from app.db import get_db, get_user_read_db
 from app.api.dependencies import verify_api_key
+from app.core.tenants import Tenant
 from app.schemas import (
     RecommendationRequest,
     RecommendationResponse,
+    RecommendationJobRequest,
+    RecommendationJobResponse,
     UserHistoryResponse,
 )
-from app.services import RecommendationService
-from app.core.rate_limit import rate_limit_default, rate_limit_strict
+from app.services import RecommendationService, RecommendationJobManager
+from app.core.quota import QuotaExceeded
+from app.core.rate_limit import rate_limit_default
+from app.core.idempotency import (
+    IdempotencyStore,
+    IdempotencyKeyMismatch,
+    IdempotencyInProgress,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -21,12 +33,14 @@ recommendation_service = RecommendationService()
 
 
 @router.post("/recommend", response_model=RecommendationResponse)
-@rate_limit_strict
+@rate_limit_default
 async def recommend_pathway(
     request: Request,
+    response: Response,
     body: RecommendationRequest,
     db: AsyncSession = Depends(get_db),
-    api_key: str = Depends(verify_api_key)
+    tenant: Tenant = Depends(verify_api_key),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
 ):
     """
     Get AI-powered pathway recommendation based on questionnaire answers.
@@ -38,6 +52,16 @@ async def recommend_pathway(
     - Connection pooling for AI API
     - Response caching for identical answer patterns
 
+    Charged to the tenant's quotas: one request unit, plus the AI tokens
+    used when the answer is not cached. Returns 429 with Retry-After when a
+    budget is exhausted.
+
+    Send an `Idempotency-Key` header to make retries safe: a repeat with the
+    same key and body returns the original response (with an
+    `Idempotent-Replayed: true` header) or waits for the original request if
+    it is still running. Reusing a key with a different body returns 422.
+    Failed requests don't consume the key.
+
     Args:
         body: RecommendationRequest with entry_type, answers, and optional user_id
 
@@ -68,17 +92,46 @@ async def recommend_pathway(
     }
     ```
     """
+    idempotency_scope = None
+    if idempotency_key:
+        idempotency_scope = IdempotencyStore.scope_key(tenant.id, idempotency_key)
+        fingerprint = IdempotencyStore.fingerprint(body.model_dump(mode="json"))
+        try:
+            stored = await IdempotencyStore.begin(idempotency_scope, fingerprint)
+        except IdempotencyKeyMismatch:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different request body"
+            )
+        except IdempotencyInProgress:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress"
+            )
+        if stored is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            return RecommendationResponse(**stored)
+
+    completed = False
     try:
         recommendation, user_id, recommendation_id = await recommendation_service.get_recommendation(
-            body, db
+            body, db, tenant
         )
 
-        return RecommendationResponse(
+        result = RecommendationResponse(
             success=True,
             data=recommendation,
             user_id=user_id,
             recommendation_id=recommendation_id
         )
+        if idempotency_scope:
+            await IdempotencyStore.complete(
+                idempotency_scope, fingerprint, result.model_dump(mode="json")
+            )
+            completed = True
+        return result
+    except QuotaExceeded:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -87,6 +140,69 @@ async def recommend_pathway(
             success=False,
             error=f"Failed to generate recommendation: {str(e)}"
         )
+    finally:
+        # Also on cancellation (client disconnected), so the key doesn't stay
+        # in progress; shielded so a second cancellation can't interrupt it
+        if idempotency_scope and not completed:
+            await asyncio.shield(IdempotencyStore.release(idempotency_scope))
+
+
+@router.post(
+    "/recommend/jobs",
+    response_model=RecommendationJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+@rate_limit_default
+async def create_recommendation_job(
+    request: Request,
+    body: RecommendationJobRequest,
+    tenant: Tenant = Depends(verify_api_key)
+):
+    """
+    Queue a pathway recommendation and return immediately with a job id.
+
+    Requires X-API-Key header.
+
+    For clients that can't hold a connection open while an uncached
+    recommendation is generated. Poll GET /recommend/jobs/{job_id} or pass
+    `webhook_url` to receive the finished job as a POST. When
+    JOB_WEBHOOK_SECRET is set, webhook bodies are signed with HMAC-SHA256 in
+    the X-Webhook-Signature header. Webhook hosts must resolve to public
+    addresses (and be in JOB_WEBHOOK_ALLOWED_HOSTS, when set); redirects
+    are not followed.
+
+    The job is charged to the tenant's quotas when it runs; a job over
+    quota fails with a "Quota exceeded" error.
+
+    Args:
+        body: RecommendationRequest fields plus optional webhook_url
+
+    Returns:
+        RecommendationJobResponse with status "queued" and the polling URL
+    """
+    try:
+        job = await RecommendationJobManager.submit(body, tenant)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return RecommendationJobResponse(**RecommendationJobManager.to_response(job))
+
+
+@router.get("/recommend/jobs/{job_id}", response_model=RecommendationJobResponse)
+@rate_limit_default
+async def get_recommendation_job(
+    request: Request,
+    job_id: str,
+    tenant: Tenant = Depends(verify_api_key)
+):
+    """
+    Get the status of a recommendation job, including the result once completed.
+
+    Requires X-API-Key header.
+    """
+    job = await RecommendationJobManager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found or expired")
+    return RecommendationJobResponse(**RecommendationJobManager.to_response(job))
 
 
 @router.get("/users/{user_id}/history", response_model=UserHistoryResponse)
@@ -94,27 +210,39 @@ async def recommend_pathway(
 async def get_user_history(
     request: Request,
     user_id: str,
-    db: AsyncSession = Depends(get_db),
-    api_key: str = Depends(verify_api_key)
+    limit: int = Query(settings.HISTORY_DEFAULT_LIMIT, ge=1, le=settings.HISTORY_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, max_length=256),
+    db: AsyncSession = Depends(get_user_read_db),
+    tenant: Tenant = Depends(verify_api_key)
 ):
     """
-    Get a user's recommendation history.
+    Get a user's recommendation history, newest first.
 
     Requires X-API-Key header.
 
+    Results are paginated: pass the returned `next_cursor` as `cursor` to get
+    the next page. `next_cursor` is null on the last page.
+
     Args:
-        user_id: External user ID
+        user_id: External user ID (or internal user UUID)
+        limit: Page size
+        cursor: Opaque cursor from the previous page
 
     Returns:
-        UserHistoryResponse with list of past recommendations
+        UserHistoryResponse with one page of past recommendations
     """
     try:
-        history = await recommendation_service.get_user_history(db, user_id)
+        history, next_cursor = await recommendation_service.get_user_history(
+            db, user_id, limit=limit, cursor=cursor
+        )
         return UserHistoryResponse(
             success=True,
             user_id=user_id,
-            recommendations=history
+            recommendations=history,
+            next_cursor=next_cursor
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"History retrieval error: {str(e)}")
         return UserHistoryResponse(
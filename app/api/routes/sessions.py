@@ -0,0 +1,109 @@
+import logging
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_db
+from app.api.dependencies import verify_api_key
+from app.core.tenants import Tenant
+from app.schemas import (
+    QuestionnaireSessionCreate,
+    QuestionnaireSessionAnswers,
+    QuestionnaireSessionResponse,
+    RecommendationResponse,
+)
+from app.services import QuestionnaireSessionManager
+from app.core.quota import QuotaExceeded
+from app.core.rate_limit import rate_limit_default
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Sessions"])
+
+
+async def _load_session(session_id: str) -> dict:
+    session = await QuestionnaireSessionManager.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session '{session_id}' not found or expired")
+    return session
+
+
+@router.post("/sessions", response_model=QuestionnaireSessionResponse)
+@rate_limit_default
+async def create_session(
+    request: Request,
+    body: QuestionnaireSessionCreate,
+    tenant: Tenant = Depends(verify_api_key)
+):
+    """
+    Start a questionnaire session that accepts answers as the user gives them.
+
+    Requires X-API-Key header.
+
+    Send answers with POST /sessions/{session_id}/answers after each question
+    and finish with POST /sessions/{session_id}/submit. Near the end of the
+    questionnaire the most likely completions are precomputed, so the final
+    submit usually returns a cached result.
+    """
+    session = await QuestionnaireSessionManager.create_session(body.entry_type, body.user_id)
+    return QuestionnaireSessionResponse(success=True, **QuestionnaireSessionManager.describe(session))
+
+
+@router.post("/sessions/{session_id}/answers", response_model=QuestionnaireSessionResponse)
+@rate_limit_default
+async def add_session_answers(
+    request: Request,
+    session_id: str,
+    body: QuestionnaireSessionAnswers,
+    tenant: Tenant = Depends(verify_api_key)
+):
+    """
+    Add (or change) answers in a questionnaire session.
+
+    Requires X-API-Key header.
+
+    Example body: `{"answers": {"Q8": "Maybe / unsure"}}`
+    """
+    session = await _load_session(session_id)
+    session = await QuestionnaireSessionManager.add_answers(session, body.answers)
+    return QuestionnaireSessionResponse(success=True, **QuestionnaireSessionManager.describe(session))
+
+
+@router.post("/sessions/{session_id}/submit", response_model=RecommendationResponse)
+@rate_limit_default
+async def submit_session(
+    request: Request,
+    session_id: str,
+    body: Optional[QuestionnaireSessionAnswers] = None,
+    db: AsyncSession = Depends(get_db),
+    tenant: Tenant = Depends(verify_api_key)
+):
+    """
+    Finish a questionnaire session and get the pathway recommendation.
+
+    Requires X-API-Key header.
+
+    The body is optional and may carry the last answers. Returns the same
+    response as POST /recommend.
+    """
+    session = await _load_session(session_id)
+    try:
+        recommendation, user_id, recommendation_id = await QuestionnaireSessionManager.submit(
+            session, db, body.answers if body else None, tenant
+        )
+        return RecommendationResponse(
+            success=True,
+            data=recommendation,
+            user_id=user_id,
+            recommendation_id=recommendation_id
+        )
+    except QuotaExceeded:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Session submit error: {str(e)}")
+        return RecommendationResponse(
+            success=False,
+            error=f"Failed to generate recommendation: {str(e)}"
+        )
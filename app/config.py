@@ -10,29 +10,168 @@ class Settings(BaseSettings):
     OPENROUTER_API_KEY: str = os.getenv("OPENROUTER_API_KEY", "")
     OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1/chat/completions"
     AI_MODEL: str = "mistralai/mistral-7b-instruct"
+    # Multiplex AI calls over HTTP/2 (needs the h2 package, from httpx[http2])
+    AI_HTTP2: bool = os.getenv("AI_HTTP2", "true").lower() == "true"
 
     # Application Settings
     APP_NAME: str = "LogosReach Pathway Recommendation API"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
 
-    # API Authentication
+    # API Authentication. API_KEY is the "default" interactive tenant; more tenants
+    # come from the api_keys table (scripts/api_keys.py) or, if set, API_KEYS_FILE
+    # (JSON list of {"tenant", "key_sha256", "tier"}), reloaded every API_KEYS_REFRESH_SECONDS
     API_KEY: str = os.getenv("API_KEY", "")
+    API_KEYS_FILE: str = os.getenv("API_KEYS_FILE", "")
+    API_KEYS_REFRESH_SECONDS: float = float(os.getenv("API_KEYS_REFRESH_SECONDS", "60"))
+    # Separate key for operator endpoints (/admin/*); empty disables them
+    ADMIN_API_KEY: str = os.getenv("ADMIN_API_KEY", "")
 
     # PostgreSQL Database Configuration
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
 
+    # Connection budget: the most connections the whole deployment may hold
+    # to the database, split evenly across the WEB_CONCURRENCY worker
+    # processes (half of each share kept open, half burst overflow). Keep it
+    # below Postgres max_connections, leaving room for scripts and admin.
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "4"))  # Worker processes (run.py --production)
+    DB_MAX_CONNECTIONS: int = int(os.getenv("DB_MAX_CONNECTIONS", "80"))
+    # Connecting through PgBouncer in transaction pooling mode (disables prepared statement caching)
+    DB_PGBOUNCER: bool = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+    # Optional streaming read replica for history, analytics, export and health reads.
+    # Reads fall back to the primary while the replica lags more than
+    # REPLICA_MAX_LAG_SECONDS; a user's reads stay on the primary for
+    # READ_YOUR_WRITES_SECONDS after their own write (keep it above the max lag)
+    READ_REPLICA_URL: str = os.getenv("READ_REPLICA_URL", "")
+    READ_REPLICA_MAX_CONNECTIONS: int = int(os.getenv("READ_REPLICA_MAX_CONNECTIONS", "80"))  # Budget as above
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    REPLICA_LAG_CHECK_INTERVAL: float = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5"))
+    REPLICA_LAG_CHECK_TIMEOUT: float = float(os.getenv("REPLICA_LAG_CHECK_TIMEOUT", "1"))
+    READ_YOUR_WRITES_SECONDS: int = int(os.getenv("READ_YOUR_WRITES_SECONDS", "15"))
+
+    # Monthly range partitioning of questionnaire_responses / pathway_recommendations.
+    # Only affects newly created tables (scripts/migrate.py / reset_db); maintain with
+    # scripts/maintain_partitions.py
+    DB_PARTITIONING_ENABLED: bool = os.getenv("DB_PARTITIONING_ENABLED", "false").lower() == "true"
+    PARTITION_PREMAKE_MONTHS: int = int(os.getenv("PARTITION_PREMAKE_MONTHS", "3"))
+    PARTITION_RETENTION_MONTHS: int = int(os.getenv("PARTITION_RETENTION_MONTHS", "0"))  # 0 keeps everything
+    PARTITION_RETENTION_DROP: bool = os.getenv("PARTITION_RETENTION_DROP", "false").lower() == "true"  # Else detach
+
     # Redis Configuration (for shared caching across workers)
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     CACHE_TTL: int = int(os.getenv("CACHE_TTL", "3600"))  # 1 hour default
+    REDIS_RETRY_MAX_BACKOFF: float = float(os.getenv("REDIS_RETRY_MAX_BACKOFF", "30"))  # Seconds between reconnects
 
     # Rate Limiting Configuration
     RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
     RATE_LIMIT_PER_HOUR: int = int(os.getenv("RATE_LIMIT_PER_HOUR", "500"))
+    # Tokens a worker may reserve per client and spend without asking Redis
+    RATE_LIMIT_LOCAL_BATCH: int = int(os.getenv("RATE_LIMIT_LOCAL_BATCH", "20"))
+    RATE_LIMIT_LOCAL_LEASE: float = float(os.getenv("RATE_LIMIT_LOCAL_LEASE", "1.0"))  # Seconds
+
+    # Cost-weighted quotas per tenant (0 disables a budget). Every recommendation
+    # costs one request unit; AI calls (cache misses) also cost their total tokens
+    QUOTA_REQUESTS_PER_MINUTE: int = int(os.getenv("QUOTA_REQUESTS_PER_MINUTE", "300"))
+    QUOTA_AI_TOKENS_PER_HOUR: int = int(os.getenv("QUOTA_AI_TOKENS_PER_HOUR", "200000"))
+    # Reserved per AI call until its real usage is known (prompt + max_tokens)
+    QUOTA_AI_TOKENS_ESTIMATE: int = int(os.getenv("QUOTA_AI_TOKENS_ESTIMATE", "1500"))
+
+    # AI call scheduling (per worker): interactive tenants go first when all slots
+    # are busy, and batch work may hold at most AI_BATCH_MAX_SHARE of the slots
+    AI_MAX_CONCURRENCY: int = int(os.getenv("AI_MAX_CONCURRENCY", "16"))
+    AI_BATCH_MAX_SHARE: float = float(os.getenv("AI_BATCH_MAX_SHARE", "0.5"))
+
+    # Load shedding: reject with 503 + Retry-After while the worker is overloaded.
+    # Expensive routes (recommend, export, analytics) are shed at the *_EXPENSIVE
+    # thresholds, all other routes at *_ALL; health and metrics are never shed (0 disables)
+    LOAD_SHED_ENABLED: bool = os.getenv("LOAD_SHED_ENABLED", "true").lower() == "true"
+    LOAD_SHED_LAG_INTERVAL: float = float(os.getenv("LOAD_SHED_LAG_INTERVAL", "0.1"))  # Seconds
+    LOAD_SHED_LAG_EXPENSIVE: float = float(os.getenv("LOAD_SHED_LAG_EXPENSIVE", "0.2"))  # Seconds
+    LOAD_SHED_LAG_ALL: float = float(os.getenv("LOAD_SHED_LAG_ALL", "1.0"))  # Seconds
+    LOAD_SHED_IN_FLIGHT_EXPENSIVE: int = int(os.getenv("LOAD_SHED_IN_FLIGHT_EXPENSIVE", "200"))
+    LOAD_SHED_IN_FLIGHT_ALL: int = int(os.getenv("LOAD_SHED_IN_FLIGHT_ALL", "500"))
+    LOAD_SHED_RETRY_AFTER: int = int(os.getenv("LOAD_SHED_RETRY_AFTER", "2"))  # Seconds
+
+    # Metrics across uvicorn workers: each worker writes a snapshot to this
+    # directory (fresh per deployment; run.py creates one) and /metrics adds
+    # them up. Empty = /metrics shows only the worker that serves the scrape
+    METRICS_MULTIPROC_DIR: str = os.getenv("METRICS_MULTIPROC_DIR", "")
+    METRICS_SNAPSHOT_INTERVAL: float = float(os.getenv("METRICS_SNAPSHOT_INTERVAL", "5"))  # Seconds
+
+    # Per-request timing spans (app/core/tracing.py): share of requests traced,
+    # whether they get a Server-Timing header, and an optional external tracer
+    # ("package.module:function" returning a context manager per span)
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+    TRACE_SERVER_TIMING: bool = os.getenv("TRACE_SERVER_TIMING", "true").lower() == "true"
+    TRACE_HOOK: str = os.getenv("TRACE_HOOK", "")
+
+    # Background health probing: /health/detailed and /health/ready serve the
+    # last snapshot (stale after 3 intervals)
+    HEALTH_PROBE_INTERVAL: float = float(os.getenv("HEALTH_PROBE_INTERVAL", "15"))  # Seconds
+    HEALTH_PROBE_TIMEOUT: float = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))  # Seconds per check
+
+    # Worker warmup at startup (in the background; /ready answers 503 until it
+    # is done): pooled DB connections and AI endpoint connections to open, and
+    # how many cached recommendations to copy from Redis into the in-memory
+    # cache (0 skips a step)
+    WARMUP_DB_CONNECTIONS: int = int(os.getenv("WARMUP_DB_CONNECTIONS", "5"))
+    WARMUP_AI_CONNECTIONS: int = int(os.getenv("WARMUP_AI_CONNECTIONS", "4"))
+    WARMUP_L1_CACHE_ENTRIES: int = int(os.getenv("WARMUP_L1_CACHE_ENTRIES", "0"))
+    WARMUP_TIMEOUT: float = float(os.getenv("WARMUP_TIMEOUT", "30"))  # Seconds per step
+
+    # On-demand sampling profiler (POST /admin/profile)
+    PROFILER_MAX_SECONDS: float = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
 
     # AI API Retry Configuration
     AI_MAX_RETRIES: int = int(os.getenv("AI_MAX_RETRIES", "3"))
     AI_RETRY_DELAY: float = float(os.getenv("AI_RETRY_DELAY", "1.0"))
+    # Targeted follow-ups for fields missing from a malformed/truncated response
+    AI_REPAIR_MAX_FOLLOWUPS: int = int(os.getenv("AI_REPAIR_MAX_FOLLOWUPS", "1"))
+
+    # Asynchronous recommendation jobs
+    RECOMMEND_JOB_BACKEND: str = os.getenv("RECOMMEND_JOB_BACKEND", "redis")  # 'redis' or 'memory'
+    RECOMMEND_JOB_WORKERS: int = int(os.getenv("RECOMMEND_JOB_WORKERS", "4"))  # Per app process
+    RECOMMEND_JOB_TTL: int = int(os.getenv("RECOMMEND_JOB_TTL", "86400"))  # Keep results 24 hours
+    RECOMMEND_JOB_POLL_TIMEOUT: float = float(os.getenv("RECOMMEND_JOB_POLL_TIMEOUT", "2"))
+    JOB_WEBHOOK_SECRET: str = os.getenv("JOB_WEBHOOK_SECRET", "")
+    JOB_WEBHOOK_TIMEOUT: float = float(os.getenv("JOB_WEBHOOK_TIMEOUT", "10"))
+    JOB_WEBHOOK_MAX_RETRIES: int = int(os.getenv("JOB_WEBHOOK_MAX_RETRIES", "3"))
+    # Webhook hosts clients may use (comma-separated; empty = any public host).
+    # Hosts resolving to private, loopback, link-local or reserved addresses are
+    # always refused unless JOB_WEBHOOK_ALLOW_PRIVATE (local development only)
+    JOB_WEBHOOK_ALLOWED_HOSTS: str = os.getenv("JOB_WEBHOOK_ALLOWED_HOSTS", "")
+    JOB_WEBHOOK_ALLOW_PRIVATE: bool = os.getenv("JOB_WEBHOOK_ALLOW_PRIVATE", "false").lower() == "true"
+
+    # Idempotency-Key support for POST /recommend
+    IDEMPOTENCY_TTL: int = int(os.getenv("IDEMPOTENCY_TTL", "86400"))  # Keep stored responses 24 hours
+    # In-progress marker TTL; extended while the request runs, so this only bounds how
+    # long a key stays blocked after its worker died
+    IDEMPOTENCY_LOCK_TTL: int = int(os.getenv("IDEMPOTENCY_LOCK_TTL", "30"))
+    IDEMPOTENCY_WAIT_TIMEOUT: float = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "35"))
+
+    # Questionnaire sessions with speculative precomputation
+    SESSION_TTL: int = int(os.getenv("SESSION_TTL", "3600"))
+    SPECULATION_MIN_PROGRESS: float = float(os.getenv("SPECULATION_MIN_PROGRESS", "0.8"))  # e.g. Q8 of 10
+    SPECULATION_MAX_REMAINING: int = int(os.getenv("SPECULATION_MAX_REMAINING", "2"))
+    SPECULATION_MAX_CANDIDATES: int = int(os.getenv("SPECULATION_MAX_CANDIDATES", "3"))  # Running per session (0 disables)
+    SPECULATION_SESSION_BUDGET: int = int(os.getenv("SPECULATION_SESSION_BUDGET", "6"))  # Total per session
+    SPECULATION_MAX_CONCURRENT: int = int(os.getenv("SPECULATION_MAX_CONCURRENT", "20"))  # Per app process
+
+    # User history pagination
+    HISTORY_DEFAULT_LIMIT: int = int(os.getenv("HISTORY_DEFAULT_LIMIT", "20"))
+    HISTORY_MAX_LIMIT: int = int(os.getenv("HISTORY_MAX_LIMIT", "100"))
+    HISTORY_CACHE_TTL: int = int(os.getenv("HISTORY_CACHE_TTL", "300"))
+
+    # Pathway analytics (served from the pathway_rollups table)
+    ANALYTICS_MAX_WINDOW_DAYS: int = int(os.getenv("ANALYTICS_MAX_WINDOW_DAYS", "366"))
+
+    # Bulk export (rows fetched per server-side cursor round trip)
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+    # external_user_id -> users.id resolution cache
+    USER_REF_CACHE_TTL: int = int(os.getenv("USER_REF_CACHE_TTL", "86400"))
+    USER_RESOLVER_LRU_SIZE: int = int(os.getenv("USER_RESOLVER_LRU_SIZE", "50000"))
 
     # Request Validation
     MAX_ANSWER_LENGTH: int = int(os.getenv("MAX_ANSWER_LENGTH", "1000"))
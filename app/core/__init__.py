@@ -1,17 +1,68 @@
 """Core utilities and middleware."""
 
 from app.core.cache import RedisCache
-from app.core.rate_limit import limiter, rate_limit_exceeded_handler, rate_limit_default, rate_limit_strict
-from app.core.health import check_database, check_redis, check_openrouter, get_full_health_check
+from app.core.history_cache import HistoryCache
+from app.core.user_resolver import UserResolver
+from app.core.idempotency import IdempotencyStore, IdempotencyKeyMismatch, IdempotencyInProgress
+from app.core.quota import QuotaManager, QuotaExceeded
+from app.core.tenants import Tenant, TenantRegistry, Tier
+from app.core.scheduler import AIScheduler
+from app.core.load_shedding import LoadShedder, LoadSheddingMiddleware
+from app.core.tracing import RequestTimingMiddleware, Tracing, annotate, span
+from app.core.profiler import SamplingProfiler, ProfilerBusy
+from app.core.rate_limit import (
+    limiter,
+    RateLimitExceeded,
+    RateLimitHeadersMiddleware,
+    rate_limit_exceeded_handler,
+    rate_limit_default,
+    rate_limit_strict,
+)
+from app.core.health import (
+    HealthProber,
+    check_database,
+    check_database_replica,
+    check_redis,
+    check_openrouter,
+    get_full_health_check,
+)
+from app.core.warmup import Warmup
+from app.core.webhooks import WebhookClient, WebhookURLError
 
 __all__ = [
     "RedisCache",
+    "HistoryCache",
+    "UserResolver",
+    "IdempotencyStore",
+    "IdempotencyKeyMismatch",
+    "IdempotencyInProgress",
+    "Tenant",
+    "TenantRegistry",
+    "Tier",
+    "AIScheduler",
+    "LoadShedder",
+    "LoadSheddingMiddleware",
+    "RequestTimingMiddleware",
+    "Tracing",
+    "annotate",
+    "span",
+    "SamplingProfiler",
+    "ProfilerBusy",
+    "QuotaManager",
+    "QuotaExceeded",
     "limiter",
+    "RateLimitExceeded",
+    "RateLimitHeadersMiddleware",
     "rate_limit_exceeded_handler",
     "rate_limit_default",
     "rate_limit_strict",
+    "HealthProber",
     "check_database",
+    "check_database_replica",
     "check_redis",
     "check_openrouter",
     "get_full_health_check",
+    "Warmup",
+    "WebhookClient",
+    "WebhookURLError",
 ]
@@ -1,4 +1,5 @@
 import json
+import time
 import hashlib
 import logging
 from typing import Optional, Dict, Any
@@ -6,24 +7,56 @@ import redis.asyncio as redis
 from cachetools import TTLCache
 
 from app.config import settings
+from app.core.metrics import Counter
 
 logger = logging.getLogger(__name__)
 
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Recommendation cache lookups by layer (redis, memory) and result (hit, miss, error); "
+    "the memory layer is only consulted when Redis misses or is unavailable",
+    ["layer", "result"],
+)
+
+CACHE_KEY_PREFIX = "pathway_rec:"
+
 
 class RedisCache:
     """
     Redis-based cache for sharing cached responses across multiple workers.
     Falls back to in-memory cache if Redis is unavailable.
+
+    After a failure, Redis is retried with exponential backoff (1s doubling
+    up to REDIS_RETRY_MAX_BACKOFF): in between, callers get no client and use
+    their fallbacks immediately instead of each waiting on a dead connection.
     """
 
     _redis_client: Optional[redis.Redis] = None
     _fallback_cache: TTLCache = TTLCache(maxsize=1000, ttl=settings.CACHE_TTL)
     _redis_available: bool = True
+    _retry_at: float = 0.0
+    _retry_backoff: float = 1.0
+
+    @classmethod
+    def _schedule_retry(cls):
+        cls._retry_at = time.monotonic() + cls._retry_backoff
+        cls._retry_backoff = min(cls._retry_backoff * 2, settings.REDIS_RETRY_MAX_BACKOFF)
+
+    @classmethod
+    def _mark_available(cls):
+        if not cls._redis_available:
+            logger.info("Redis reachable again")
+        cls._redis_available = True
+        cls._retry_backoff = 1.0
 
     @classmethod
     async def get_client(cls) -> Optional[redis.Redis]:
         """Get or create Redis client."""
         if cls._redis_client is None:
+            if not settings.REDIS_URL or time.monotonic() < cls._retry_at:
+                return None
+            # Claim this attempt before awaiting, so concurrent callers don't pile on
+            cls._schedule_retry()
             try:
                 cls._redis_client = redis.from_url(
                     settings.REDIS_URL,
@@ -34,13 +67,43 @@ class RedisCache:
                 )
                 # Test connection
                 await cls._redis_client.ping()
-                cls._redis_available = True
+                cls._mark_available()
             except Exception as e:
                 logger.warning(f"Redis connection failed, using fallback cache: {e}")
                 cls._redis_available = False
                 cls._redis_client = None
         return cls._redis_client
 
+    @classmethod
+    async def get_available_client(cls) -> Optional[redis.Redis]:
+        """
+        Get the Redis client only if Redis is currently usable.
+
+        For features that keep their own in-memory fallback; they should call
+        mark_unavailable() when a Redis command fails.
+        """
+        client = await cls.get_client()
+        if client is None:
+            return None
+        if not cls._redis_available:
+            if time.monotonic() < cls._retry_at:
+                return None
+            cls._schedule_retry()
+            try:
+                await client.ping()
+            except Exception:
+                return None
+            cls._mark_available()
+        return client
+
+    @classmethod
+    def mark_unavailable(cls, error: Exception):
+        """Record a Redis failure so callers switch to their fallback until the next retry."""
+        if cls._redis_available:
+            logger.warning(f"Redis error, using fallback: {error}")
+            cls._redis_available = False
+            cls._schedule_retry()
+
     @classmethod
     async def close(cls):
         """Close Redis connection."""
@@ -55,23 +118,27 @@ class RedisCache:
             {"entry_type": entry_type, "answers": dict(sorted(answers.items()))},
             sort_keys=True
         )
-        return f"pathway_rec:{hashlib.md5(sorted_answers.encode()).hexdigest()}"
+        return f"{CACHE_KEY_PREFIX}{hashlib.md5(sorted_answers.encode()).hexdigest()}"
 
     @classmethod
     async def get(cls, key: str) -> Optional[Dict[str, Any]]:
         """Get value from cache (Redis or fallback)."""
-        try:
-            client = await cls.get_client()
-            if client and cls._redis_available:
+        client = await cls.get_available_client()
+        if client:
+            try:
                 value = await client.get(key)
                 if value:
+                    CACHE_LOOKUPS.inc(layer="redis", result="hit")
                     return json.loads(value)
-        except Exception as e:
-            logger.warning(f"Redis get error, using fallback: {e}")
-            cls._redis_available = False
+                CACHE_LOOKUPS.inc(layer="redis", result="miss")
+            except Exception as e:
+                CACHE_LOOKUPS.inc(layer="redis", result="error")
+                cls.mark_unavailable(e)
 
         # Fallback to in-memory cache
-        return cls._fallback_cache.get(key)
+        value = cls._fallback_cache.get(key)
+        CACHE_LOOKUPS.inc(layer="memory", result="miss" if value is None else "hit")
+        return value
 
     @classmethod
     async def set(cls, key: str, value: Dict[str, Any], ttl: Optional[int] = None) -> bool:
@@ -82,17 +149,56 @@ class RedisCache:
         # Always set in fallback cache for local worker
         cls._fallback_cache[key] = value
 
-        try:
-            client = await cls.get_client()
-            if client and cls._redis_available:
+        client = await cls.get_available_client()
+        if client:
+            try:
                 await client.setex(key, ttl, json_value)
                 return True
-        except Exception as e:
-            logger.warning(f"Redis set error: {e}")
-            cls._redis_available = False
+            except Exception as e:
+                cls.mark_unavailable(e)
 
         return False
 
+    @classmethod
+    async def hydrate_fallback(cls, limit: int) -> int:
+        """
+        Copy up to `limit` cached recommendations from Redis into the in-memory cache.
+
+        For worker startup: the in-memory cache then already covers popular
+        answers if Redis becomes unavailable. Entries get a full CACHE_TTL in
+        memory, whatever their remaining TTL in Redis.
+
+        Returns:
+            Number of entries loaded
+        """
+        client = await cls.get_available_client()
+        limit = min(limit, cls._fallback_cache.maxsize)
+        if client is None or limit <= 0:
+            return 0
+
+        keys = []
+        loaded = 0
+        try:
+            async for key in client.scan_iter(match=f"{CACHE_KEY_PREFIX}*", count=1000):
+                keys.append(key)
+                if len(keys) >= limit:
+                    break
+
+            for i in range(0, len(keys), 100):
+                batch = keys[i:i + 100]
+                for key, value in zip(batch, await client.mget(batch)):
+                    if value is None:  # Expired since the scan
+                        continue
+                    try:
+                        cls._fallback_cache[key] = json.loads(value)
+                        loaded += 1
+                    except json.JSONDecodeError:
+                        continue
+        except Exception as e:
+            cls.mark_unavailable(e)
+            raise
+        return loaded
+
     @classmethod
     async def health_check(cls) -> Dict[str, Any]:
         """Check Redis connection health."""
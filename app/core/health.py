@@ -1,11 +1,28 @@
+"""
+Dependency health checks.
+
+HealthProber runs the checks in the background every HEALTH_PROBE_INTERVAL
+seconds, over the app's shared clients (DB pool, Redis client, AI HTTP
+client), and keeps the last result: GET /health/detailed and the readiness
+probe read that snapshot, so monitors polling them never cause extra
+connections or calls to OpenRouter.
+"""
 import asyncio
+import logging
+import time
+from datetime import datetime, timezone
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.core.cache import RedisCache
+from app.core.tenants import TenantRegistry
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_MODELS_URL = "https://openrouter.ai/api/v1/models"
 
 
 async def check_database(db: AsyncSession) -> Dict[str, Any]:
@@ -29,13 +46,19 @@ async def check_database(db: AsyncSession) -> Dict[str, Any]:
         }
 
 
+async def check_database_replica() -> Dict[str, Any]:
+    """Check read replica connectivity and replication lag."""
+    from app.db.routing import ReadRouter  # app.db imports app.core
+    return await ReadRouter.health_check()
+
+
 async def check_redis() -> Dict[str, Any]:
     """Check Redis connectivity."""
     return await RedisCache.health_check()
 
 
 async def check_openrouter() -> Dict[str, Any]:
-    """Check OpenRouter API connectivity."""
+    """Check OpenRouter API connectivity (over the shared AI HTTP client)."""
     if not settings.OPENROUTER_API_KEY:
         return {
             "status": "unconfigured",
@@ -43,34 +66,37 @@ async def check_openrouter() -> Dict[str, Any]:
             "error": "OPENROUTER_API_KEY not set"
         }
 
+    # The pooled client used for AI calls (app.services imports app.core)
+    from app.services.recommendation import RecommendationService
+
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # Use a lightweight endpoint to check connectivity
-            response = await client.get(
-                "https://openrouter.ai/api/v1/models",
-                headers={
-                    "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
-                }
-            )
-
-            if response.status_code == 200:
-                return {
-                    "status": "healthy",
-                    "connected": True,
-                    "model": settings.AI_MODEL
-                }
-            elif response.status_code == 401:
-                return {
-                    "status": "unhealthy",
-                    "connected": False,
-                    "error": "Invalid API key"
-                }
-            else:
-                return {
-                    "status": "degraded",
-                    "connected": True,
-                    "status_code": response.status_code
-                }
+        client = await RecommendationService.get_http_client()
+        response = await client.get(
+            OPENROUTER_MODELS_URL,
+            headers={
+                "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
+            },
+            timeout=settings.HEALTH_PROBE_TIMEOUT,
+        )
+
+        if response.status_code == 200:
+            return {
+                "status": "healthy",
+                "connected": True,
+                "model": settings.AI_MODEL
+            }
+        elif response.status_code == 401:
+            return {
+                "status": "unhealthy",
+                "connected": False,
+                "error": "Invalid API key"
+            }
+        else:
+            return {
+                "status": "degraded",
+                "connected": True,
+                "status_code": response.status_code
+            }
     except httpx.TimeoutException:
         return {
             "status": "unhealthy",
@@ -85,35 +111,60 @@ async def check_openrouter() -> Dict[str, Any]:
         }
 
 
-async def get_full_health_check(db: AsyncSession) -> Dict[str, Any]:
+async def check_database_pooled() -> Dict[str, Any]:
+    """Check the database over a session from the app's pool."""
+    from app.db.database import AsyncSessionLocal  # app.db imports app.core
+
+    if AsyncSessionLocal is None:
+        return {"status": "unhealthy", "connected": False, "error": "DATABASE_URL not set"}
+    async with AsyncSessionLocal() as db:
+        return await check_database(db)
+
+
+async def _timed(check) -> Dict[str, Any]:
+    """Run a check with HEALTH_PROBE_TIMEOUT, adding its latency."""
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(check, settings.HEALTH_PROBE_TIMEOUT)
+    except asyncio.TimeoutError:
+        result = {"status": "unhealthy", "connected": False, "error": "Health check timed out"}
+    except Exception as e:
+        result = {"status": "error", "error": str(e)}
+    return {**result, "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+
+async def get_full_health_check(db: Optional[AsyncSession] = None) -> Dict[str, Any]:
     """
     Perform comprehensive health check on all dependencies.
 
+    Args:
+        db: Session to check the database with (default: a pooled session)
+
     Returns:
         Dict with overall status and individual component statuses.
     """
     # Run all checks concurrently
-    db_check, redis_check, openrouter_check = await asyncio.gather(
-        check_database(db),
-        check_redis(),
-        check_openrouter(),
-        return_exceptions=True
-    )
-
-    # Handle any exceptions that occurred
-    if isinstance(db_check, Exception):
-        db_check = {"status": "error", "error": str(db_check)}
-    if isinstance(redis_check, Exception):
-        redis_check = {"status": "error", "error": str(redis_check)}
-    if isinstance(openrouter_check, Exception):
-        openrouter_check = {"status": "error", "error": str(openrouter_check)}
+    checks = [
+        _timed(check_database(db) if db is not None else check_database_pooled()),
+        _timed(check_redis()),
+        _timed(check_openrouter()),
+    ]
+    if settings.READ_REPLICA_URL:
+        checks.append(_timed(check_database_replica()))
+    # _timed turns failures into results
+    db_check, redis_check, openrouter_check, *replica_check = await asyncio.gather(*checks)
+
+    components = {
+        "database": db_check,
+        "redis": redis_check,
+        "openrouter": openrouter_check
+    }
+    if replica_check:
+        # Reads fall back to the primary, so the replica is never critical
+        components["database_replica"] = replica_check[0]
 
     # Determine overall status
-    statuses = [
-        db_check.get("status"),
-        redis_check.get("status"),
-        openrouter_check.get("status")
-    ]
+    statuses = [component.get("status") for component in components.values()]
 
     if all(s == "healthy" for s in statuses):
         overall_status = "healthy"
@@ -128,14 +179,98 @@ async def get_full_health_check(db: AsyncSession) -> Dict[str, Any]:
 
     return {
         "status": overall_status,
-        "components": {
-            "database": db_check,
-            "redis": redis_check,
-            "openrouter": openrouter_check
-        },
+        "components": components,
         "config": {
-            "api_key_configured": bool(settings.API_KEY),
+            "api_key_configured": TenantRegistry.configured(),
             "debug_mode": settings.DEBUG,
             "rate_limit_per_minute": settings.RATE_LIMIT_PER_MINUTE
         }
     }
+
+
+class HealthProber:
+    """Background health checks; serves the last snapshot (see module docstring)."""
+
+    _snapshot: Optional[Dict[str, Any]] = None
+    _checked_at: Optional[datetime] = None
+    _checked_monotonic: float = 0.0
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def probe(cls) -> Dict[str, Any]:
+        """Run all checks now and store the result as the current snapshot."""
+        snapshot = await get_full_health_check()
+        cls._snapshot = snapshot
+        cls._checked_at = datetime.now(timezone.utc)
+        cls._checked_monotonic = time.monotonic()
+        return snapshot
+
+    @classmethod
+    async def _run(cls):
+        while True:
+            try:
+                previous = cls._snapshot["status"] if cls._snapshot else None
+                status = (await cls.probe())["status"]
+                if previous is not None and status != previous:
+                    logger.warning(f"Health changed from {previous} to {status}")
+            except Exception as e:
+                logger.error(f"Health probe failed: {e}")
+            await asyncio.sleep(settings.HEALTH_PROBE_INTERVAL)
+
+    @classmethod
+    def start(cls):
+        """Start probing in the background (call from the app lifespan)."""
+        if cls._task is None:
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            await asyncio.gather(cls._task, return_exceptions=True)
+            cls._task = None
+
+    @classmethod
+    def age(cls) -> Optional[float]:
+        """Seconds since the last probe finished, or None before the first one."""
+        if cls._snapshot is None:
+            return None
+        return time.monotonic() - cls._checked_monotonic
+
+    @classmethod
+    def is_stale(cls) -> bool:
+        """Whether the snapshot is missing or older than three probe intervals."""
+        age = cls.age()
+        return age is None or age > 3 * settings.HEALTH_PROBE_INTERVAL
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, Any]:
+        """The last health check result with when it was taken and how old it is."""
+        if cls._snapshot is None:
+            return {
+                "status": "starting",
+                "components": {},
+                "checked_at": None,
+                "age_seconds": None,
+                "stale": True,
+                "probe_interval_seconds": settings.HEALTH_PROBE_INTERVAL,
+            }
+        return {
+            **cls._snapshot,
+            "checked_at": cls._checked_at.isoformat(),
+            "age_seconds": round(cls.age(), 1),
+            "stale": cls.is_stale(),
+            "probe_interval_seconds": settings.HEALTH_PROBE_INTERVAL,
+        }
+
+    @classmethod
+    def ready(cls) -> bool:
+        """
+        Whether this worker should receive traffic.
+
+        Needs a fresh snapshot with a reachable database; Redis has fallbacks
+        and OpenRouter is only needed for cache misses, so they only degrade.
+        """
+        if cls.is_stale():
+            return False
+        return cls._snapshot["components"]["database"].get("status") == "healthy"
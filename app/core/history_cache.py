@@ -0,0 +1,170 @@
+import json
+import uuid
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from cachetools import TTLCache
+
+from app.config import settings
+from app.core.cache import RedisCache
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: user's hash; ARGV: page field, fresh version token, TTL. Reads the
+# version and page, giving the hash a version first if it has none (new or
+# expired), so every page is built against a real token.
+GET_PAGE_SCRIPT = """
+local version = redis.call('HGET', KEYS[1], 'ver')
+if not version then
+    version = ARGV[2]
+    redis.call('HSET', KEYS[1], 'ver', version)
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return {version, redis.call('HGET', KEYS[1], ARGV[1])}
+"""
+# KEYS[1]: user's hash; ARGV: version the page was built at, page field,
+# page, TTL. Stores the page only while that version is still current, so
+# an invalidation or expiry since the read drops it.
+SET_PAGE_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'ver') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+HISTORY_CACHE_REQUESTS = Counter(
+    "history_cache_requests_total",
+    "User history page cache lookups by result (hit, miss)",
+    ["result"],
+)
+
+
+class HistoryCache:
+    """
+    Cache for user history pages, invalidated when a user gets a new record.
+
+    Each user has one Redis hash `history:{user_uuid}` holding a version
+    token and the cached pages. A read returns the current version (creating
+    one if the hash has none), and a page built after a miss is stored only
+    if that version is still current at store time (compare-and-set in one
+    Lua script). Writers replace the version *after* their commit, so a page
+    built from a snapshot that missed a concurrent write is never stored,
+    and neither is one whose hash expired in between. Old pages are dropped
+    with the version. scripts/check_history_cache.py exercises this with
+    concurrent writes.
+
+    Falls back to process-local caches if Redis is unavailable, in which case
+    invalidation only reaches the local worker and HISTORY_CACHE_TTL bounds
+    staleness elsewhere.
+    """
+
+    PAGE_PREFIX = "history:"
+    VERSION_FIELD = "ver"
+
+    _fallback_pages: TTLCache = TTLCache(maxsize=10000, ttl=settings.HISTORY_CACHE_TTL)
+    _scripts: Dict[str, Any] = {}
+    _script_client = None
+
+    @staticmethod
+    def _page_field(limit: int, cursor: Optional[str]) -> str:
+        return f"page:{limit}:{cursor or ''}"
+
+    @staticmethod
+    def _new_version() -> str:
+        # A fresh random token rather than a counter, so a version can never
+        # come back around after the hash expires and is recreated
+        return uuid.uuid4().hex[:16]
+
+    @classmethod
+    def _script(cls, client, source: str):
+        if cls._script_client is not client:
+            cls._scripts = {}
+            cls._script_client = client
+        if source not in cls._scripts:
+            cls._scripts[source] = client.register_script(source)
+        return cls._scripts[source]
+
+    @classmethod
+    async def get_page(
+        cls, user_id: str, limit: int, cursor: Optional[str]
+    ) -> Tuple[str, Optional[Tuple[List[Dict[str, Any]], Optional[str]]]]:
+        """
+        Look up a cached history page.
+
+        Returns:
+            Tuple of (current version, cached (records, next_cursor) or None).
+            Pass the version to set_page() after querying on a miss.
+        """
+        field = cls._page_field(limit, cursor)
+        version, page = None, None
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                version, raw_page = await cls._script(client, GET_PAGE_SCRIPT)(
+                    keys=[f"{cls.PAGE_PREFIX}{user_id}"],
+                    args=[field, cls._new_version(), settings.HISTORY_CACHE_TTL],
+                )
+                page = json.loads(raw_page) if raw_page else None
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+                client = None
+        if not client:
+            entry = cls._fallback_pages.get(user_id)
+            if entry is None:
+                entry = cls._fallback_pages[user_id] = {cls.VERSION_FIELD: cls._new_version()}
+            version = entry[cls.VERSION_FIELD]
+            page = entry.get(field)
+
+        if page is not None and page["v"] == version:
+            HISTORY_CACHE_REQUESTS.inc(result="hit")
+            return version, (page["records"], page["next_cursor"])
+        HISTORY_CACHE_REQUESTS.inc(result="miss")
+        return version, None
+
+    @classmethod
+    async def set_page(
+        cls,
+        user_id: str,
+        version: str,
+        limit: int,
+        cursor: Optional[str],
+        records: List[Dict[str, Any]],
+        next_cursor: Optional[str],
+    ):
+        """Store a page built from a query that started at `version`, if that is still current."""
+        field = cls._page_field(limit, cursor)
+        page = {"v": version, "records": records, "next_cursor": next_cursor}
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                await cls._script(client, SET_PAGE_SCRIPT)(
+                    keys=[f"{cls.PAGE_PREFIX}{user_id}"],
+                    args=[version, field, json.dumps(page), settings.HISTORY_CACHE_TTL],
+                )
+                return
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+        entry = cls._fallback_pages.get(user_id)
+        if entry is not None and entry[cls.VERSION_FIELD] == version:
+            entry[field] = page
+
+    @classmethod
+    async def invalidate(cls, user_id: str):
+        """Invalidate all cached pages of a user. Call after the write has committed."""
+        version = cls._new_version()
+        cls._fallback_pages[user_id] = {cls.VERSION_FIELD: version}
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                # One transaction: the new version replaces the hash with its pages
+                key = f"{cls.PAGE_PREFIX}{user_id}"
+                pipe = client.pipeline(transaction=True)
+                pipe.delete(key)
+                pipe.hset(key, cls.VERSION_FIELD, version)
+                pipe.expire(key, settings.HISTORY_CACHE_TTL)
+                await pipe.execute()
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
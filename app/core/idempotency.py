@@ -0,0 +1,229 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+from app.config import settings
+from app.core.cache import RedisCache
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: idempotency key; ARGV[1]: the claim record (JSON, with the
+# claimer's token), ARGV[2]: lock TTL in seconds. Only touch the key while it
+# still holds this claim: after an expiry another request may have claimed it.
+EXTEND_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class IdempotencyKeyMismatch(Exception):
+    """Idempotency key was reused with a different request body."""
+
+
+class IdempotencyInProgress(Exception):
+    """The original request for this key is still running after the wait timeout."""
+
+
+class IdempotencyStore:
+    """
+    Stores results of requests made with an Idempotency-Key header.
+
+    The first request for a key claims it with an in-progress marker
+    (SET NX in Redis, so the claim is atomic across workers). Repeats with
+    the same key and body either wait for that request to finish or get the
+    stored response back; a repeat with a different body is rejected. Falls
+    back to an in-memory store if Redis is unavailable.
+
+    The marker expires after IDEMPOTENCY_LOCK_TTL, but the claiming worker
+    extends it every third of that while the request runs, however long
+    AI retries and queueing take; it only lapses if the worker dies.
+    """
+
+    KEY_PREFIX = "idempotency:recommend:"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+
+    _fallback_store: TTLCache = TTLCache(maxsize=10000, ttl=settings.IDEMPOTENCY_TTL)
+    # Requests running in this worker, so local repeats don't need to poll
+    _inflight: Dict[str, asyncio.Future] = {}
+    # Claim record and lock-extending task per key claimed by this worker
+    _claims: Dict[str, str] = {}
+    _keepalives: Dict[str, asyncio.Task] = {}
+    _scripts: Dict[str, Any] = {}
+    _script_client = None
+
+    @classmethod
+    def scope_key(cls, tenant_id: str, idempotency_key: str) -> str:
+        """Namespace the client's key by tenant so clients can't collide."""
+        client = hashlib.sha256(tenant_id.encode()).hexdigest()[:16]
+        return f"{cls.KEY_PREFIX}{client}:{idempotency_key}"
+
+    @classmethod
+    def fingerprint(cls, body: Dict[str, Any]) -> str:
+        """Hash of the (validated) request body."""
+        return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+
+    @classmethod
+    async def _load(cls, key: str) -> Optional[Dict[str, Any]]:
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                value = await client.get(key)
+                return json.loads(value) if value else None
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+        return cls._fallback_store.get(key)
+
+    @classmethod
+    def _script(cls, client, source: str):
+        if cls._script_client is not client:
+            cls._scripts = {}
+            cls._script_client = client
+        if source not in cls._scripts:
+            cls._scripts[source] = client.register_script(source)
+        return cls._scripts[source]
+
+    @classmethod
+    async def _claim(cls, key: str, record: Dict[str, Any]) -> bool:
+        claimed = None
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                claimed = bool(await client.set(
+                    key, json.dumps(record), nx=True, ex=settings.IDEMPOTENCY_LOCK_TTL
+                ))
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+        if claimed is None:
+            claimed = key not in cls._fallback_store
+            if claimed:
+                cls._fallback_store[key] = record
+        if claimed:
+            cls._inflight[key] = asyncio.get_running_loop().create_future()
+            cls._claims[key] = json.dumps(record)
+            cls._keepalives[key] = asyncio.create_task(cls._keep_claim(key))
+        return claimed
+
+    @classmethod
+    async def _keep_claim(cls, key: str):
+        """Extend a claim's lock TTL until the request completes or releases it."""
+        while True:
+            await asyncio.sleep(settings.IDEMPOTENCY_LOCK_TTL / 3)
+            client = await RedisCache.get_available_client()
+            if client is None:
+                continue  # The in-memory claim doesn't expire early
+            try:
+                script = cls._script(client, EXTEND_SCRIPT)
+                if not await script(keys=[key], args=[cls._claims[key], settings.IDEMPOTENCY_LOCK_TTL]):
+                    logger.warning(f"Idempotency claim for {key} was lost while the request ran")
+                    return
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+
+    @classmethod
+    async def begin(cls, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim an idempotency key or get the stored response for it.
+
+        Args:
+            key: Scoped key from scope_key()
+            fingerprint: Request body fingerprint
+
+        Returns:
+            None if the caller claimed the key and should process the request,
+            otherwise the stored response of the original request
+
+        Raises:
+            IdempotencyKeyMismatch: If the key was used with a different body
+            IdempotencyInProgress: If the original request is still running
+                after IDEMPOTENCY_WAIT_TIMEOUT seconds
+        """
+        record = {"status": cls.IN_PROGRESS, "fingerprint": fingerprint, "token": uuid.uuid4().hex}
+        if await cls._claim(key, record):
+            return None
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        delay = 0.05
+        while True:
+            existing = await cls._load(key)
+            if existing is None:
+                # Original request failed and released the key - take it over
+                if await cls._claim(key, record):
+                    return None
+                continue
+            if existing["fingerprint"] != fingerprint:
+                raise IdempotencyKeyMismatch()
+            if existing["status"] == cls.COMPLETED:
+                return existing["response"]
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise IdempotencyInProgress()
+
+            local = cls._inflight.get(key)
+            if local is not None:
+                # Same worker: wait on the in-flight request directly
+                try:
+                    await asyncio.wait_for(asyncio.shield(local), remaining)
+                except asyncio.TimeoutError:
+                    raise IdempotencyInProgress()
+                except Exception:
+                    pass
+                continue
+
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.5)
+
+    @classmethod
+    async def complete(cls, key: str, fingerprint: str, response: Dict[str, Any]):
+        """Store the response for a claimed key and wake local waiters."""
+        record = {"status": cls.COMPLETED, "fingerprint": fingerprint, "response": response}
+        cls._fallback_store[key] = record
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                await client.setex(key, settings.IDEMPOTENCY_TTL, json.dumps(record))
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+        cls._resolve(key)
+
+    @classmethod
+    async def release(cls, key: str):
+        """
+        Drop a claim after a failed request so a retry can run it again.
+
+        Only deletes the key while it still holds this worker's claim.
+        """
+        claim = cls._claims.get(key)
+        cls._fallback_store.pop(key, None)
+        client = await RedisCache.get_available_client()
+        if client and claim is not None:
+            try:
+                await cls._script(client, RELEASE_SCRIPT)(keys=[key], args=[claim])
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+        cls._resolve(key)
+
+    @classmethod
+    def _resolve(cls, key: str):
+        cls._claims.pop(key, None)
+        keepalive = cls._keepalives.pop(key, None)
+        if keepalive is not None:
+            keepalive.cancel()
+        future = cls._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(None)
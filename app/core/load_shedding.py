@@ -0,0 +1,158 @@
+"""
+Load shedding based on event loop lag and in-flight requests.
+
+When a worker falls behind, every request it accepts makes the others
+slower until all of them time out. The middleware below rejects requests
+early with 503 and Retry-After instead, expensive routes first:
+
+- expensive routes (AI recommendations, exports, analytics) are shed when
+  loop lag exceeds LOAD_SHED_LAG_EXPENSIVE or in-flight requests exceed
+  LOAD_SHED_IN_FLIGHT_EXPENSIVE;
+- all other routes only past LOAD_SHED_LAG_ALL / LOAD_SHED_IN_FLIGHT_ALL;
+- health checks, /ready, /metrics and /admin (profiling an overloaded
+  worker) are never shed.
+
+Loop lag is how late a periodic timer fires (LOAD_SHED_LAG_INTERVAL); it
+rises as soon as the loop has more ready work than it can run.
+"""
+import asyncio
+import json
+import math
+from typing import Optional
+
+from app.config import settings
+from app.core.metrics import Counter, Gauge, REGISTRY
+
+LOAD_SHED_REQUESTS = Counter(
+    "load_shed_requests_total",
+    "Requests rejected with 503 by load shedding, by route class (expensive, standard) and reason (loop_lag, in_flight)",
+    ["route_class", "reason"],
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being processed",
+)
+EVENT_LOOP_LAG = Gauge(
+    "event_loop_lag_seconds",
+    "Smoothed event loop lag (the most lagging worker)",
+    multiprocess_mode="max",
+)
+
+EXEMPT = "exempt"
+EXPENSIVE = "expensive"
+STANDARD = "standard"
+
+EXEMPT_PREFIXES = ("/health", "/ready", "/metrics", "/admin")
+EXPENSIVE_PREFIXES = ("/recommend", "/export", "/analytics")
+
+
+def route_class(path: str) -> str:
+    """Shedding class of a request: exempt, expensive or standard."""
+    if path.startswith(EXEMPT_PREFIXES):
+        return EXEMPT
+    if path.startswith("/recommend/jobs"):
+        # Queuing and polling jobs is cheap; the work runs in the job workers
+        return STANDARD
+    if path.startswith(EXPENSIVE_PREFIXES) or (path.startswith("/sessions/") and path.endswith("/submit")):
+        return EXPENSIVE
+    return STANDARD
+
+
+class LoadShedder:
+    """Event loop lag monitor and in-flight counter for this worker."""
+
+    lag: float = 0.0
+    in_flight: int = 0
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def _monitor(cls):
+        loop = asyncio.get_running_loop()
+        interval = settings.LOAD_SHED_LAG_INTERVAL
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            sample = max(loop.time() - start - interval, 0.0)
+            # React to a spike at once, let it fade over a few intervals
+            cls.lag = max(sample, cls.lag * 0.5)
+
+    @classmethod
+    def start(cls):
+        """Start measuring loop lag (call from the app lifespan)."""
+        if cls._task is None:
+            cls._task = asyncio.create_task(cls._monitor())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            await asyncio.gather(cls._task, return_exceptions=True)
+            cls._task = None
+
+    @classmethod
+    def shed_reason(cls, klass: str) -> Optional[str]:
+        """Why a request of this class should be shed now, or None to serve it."""
+        if klass == EXEMPT:
+            return None
+        if klass == EXPENSIVE:
+            max_lag, max_in_flight = settings.LOAD_SHED_LAG_EXPENSIVE, settings.LOAD_SHED_IN_FLIGHT_EXPENSIVE
+        else:
+            max_lag, max_in_flight = settings.LOAD_SHED_LAG_ALL, settings.LOAD_SHED_IN_FLIGHT_ALL
+        if max_lag and cls.lag > max_lag:
+            return "loop_lag"
+        if max_in_flight and cls.in_flight >= max_in_flight:
+            return "in_flight"
+        return None
+
+
+class LoadSheddingMiddleware:
+    """Rejects requests with 503 while the worker is overloaded (see module docstring)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.LOAD_SHED_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        klass = route_class(scope["path"])
+        reason = LoadShedder.shed_reason(klass)
+        if reason is not None:
+            LOAD_SHED_REQUESTS.inc(route_class=klass, reason=reason)
+            await self._reject(send, reason)
+            return
+
+        LoadShedder.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            LoadShedder.in_flight -= 1
+
+    @staticmethod
+    async def _reject(send, reason: str):
+        retry_after = max(settings.LOAD_SHED_RETRY_AFTER, math.ceil(LoadShedder.lag))
+        body = json.dumps({
+            "success": False,
+            "error": "Server overloaded",
+            "detail": f"Request shed ({reason}), retry later",
+            "retry_after": retry_after,
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def _collect_load_metrics():
+    HTTP_IN_FLIGHT.set(LoadShedder.in_flight)
+    EVENT_LOOP_LAG.set(LoadShedder.lag)
+
+
+REGISTRY.register_collector(_collect_load_metrics)
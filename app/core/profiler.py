@@ -0,0 +1,240 @@
+"""
+On-demand sampling profiler for the event loop thread of this worker.
+
+Nothing runs until a profile is requested. For the requested duration a
+daemon thread reads the loop thread's Python stack every interval
+(sys._current_frames) and counts identical stacks; requests keep being
+served meanwhile. A heartbeat task on the loop marks when the loop last got
+to run: while it is overdue by more than the slow threshold the loop is
+blocked by one callback, and the stacks sampled in that stretch are
+reported as a slow callback. This works with uvloop, where asyncio's own
+slow-callback logging (debug mode) is not available.
+
+Stacks are returned in collapsed format ("frame;frame;frame count", for
+flamegraph.pl / speedscope) or as a speedscope JSON profile.
+"""
+import asyncio
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+MAX_STACK_DEPTH = 128
+BASE_DIR = str(Path(__file__).resolve().parent.parent.parent) + os.sep
+STDLIB_DIR = sysconfig.get_paths()["stdlib"] + os.sep
+
+Stack = Tuple[str, ...]
+
+
+class ProfilerBusy(Exception):
+    """A profile is already running in this worker."""
+
+
+class SlowCallback:
+    """A stretch in which the event loop did not get to run."""
+
+    __slots__ = ("offset", "duration", "stacks")
+
+    def __init__(self, offset: float):
+        self.offset = offset  # Seconds since the profile started
+        self.duration = 0.0
+        self.stacks: Counter = Counter()
+
+
+class Profile(NamedTuple):
+    """Result of one profiling run."""
+
+    pid: int
+    duration: float
+    interval: float
+    stacks: Counter
+    idle_samples: int
+    slow_callbacks: List[SlowCallback]
+
+    def collapsed(self) -> str:
+        """Stacks in collapsed format, most frequent first."""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common())
+
+    def speedscope(self) -> Dict[str, Any]:
+        """Stacks as a speedscope "sampled" profile (https://www.speedscope.app)."""
+        frames: List[Dict[str, Any]] = []
+        index: Dict[str, int] = {}
+        samples, weights = [], []
+        for stack, count in self.stacks.most_common():
+            sample = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    name, _, location = label.partition(" (")
+                    file, _, line = location.rstrip(")").rpartition(":")
+                    frames.append({"name": name, "file": file, "line": int(line) if line.isdigit() else None})
+                sample.append(index[label])
+            samples.append(sample)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"worker {self.pid}",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": f"worker {self.pid}",
+            "exporter": "logosreach",
+        }
+
+    def slow_callback_report(self) -> List[Dict[str, Any]]:
+        """Slow callbacks, longest first, each with the stack it was sampled in most."""
+        return [
+            {
+                "offset_ms": round(slow.offset * 1000, 1),
+                "duration_ms": round(slow.duration * 1000, 1),
+                "samples": sum(slow.stacks.values()),
+                "stack": ";".join(slow.stacks.most_common(1)[0][0]) if slow.stacks else None,
+            }
+            for slow in sorted(self.slow_callbacks, key=lambda s: s.duration, reverse=True)
+        ]
+
+
+_labels: Dict[Any, str] = {}
+
+
+def _label(code) -> str:
+    """Frame label "qualname (path:first line)", cached per code object."""
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        if path.startswith(BASE_DIR):
+            path = path[len(BASE_DIR):]
+        elif "site-packages" + os.sep in path:
+            path = path.split("site-packages" + os.sep, 1)[1]
+        elif path.startswith(STDLIB_DIR):
+            path = path[len(STDLIB_DIR):]
+        name = getattr(code, "co_qualname", code.co_name)
+        label = _labels[code] = f"{name} ({path}:{code.co_firstlineno})"
+    return label
+
+
+def _stack(frame) -> Stack:
+    """Stack of a frame, outermost call first."""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+def _is_idle(frame) -> bool:
+    """Whether the loop thread is waiting for I/O (selector, or inside uvloop's C loop)."""
+    code = frame.f_code
+    if code.co_filename.endswith("selectors.py"):
+        return True
+    return code.co_name in ("run", "run_until_complete", "run_forever") and f"{os.sep}asyncio{os.sep}" in code.co_filename
+
+
+class SamplingProfiler:
+    """Runs one profile at a time per worker (see module docstring)."""
+
+    _running: bool = False
+
+    @classmethod
+    async def profile(
+        cls,
+        seconds: float,
+        interval: float = 0.005,
+        slow_threshold: float = 0.1,
+        include_idle: bool = False,
+    ) -> Profile:
+        """
+        Sample the event loop thread for `seconds`.
+
+        Args:
+            seconds: How long to sample
+            interval: Seconds between samples
+            slow_threshold: Loop stalls longer than this are reported as slow callbacks
+            include_idle: Also count samples taken while the loop waits for I/O
+
+        Raises:
+            ProfilerBusy: If a profile is already running in this worker
+        """
+        if cls._running:
+            raise ProfilerBusy("A profile is already running in this worker")
+        cls._running = True
+        try:
+            return await cls._profile(seconds, interval, slow_threshold, include_idle)
+        finally:
+            cls._running = False
+
+    @classmethod
+    async def _profile(cls, seconds: float, interval: float, slow_threshold: float, include_idle: bool) -> Profile:
+        loop_thread = threading.get_ident()
+        stop = threading.Event()
+        start = time.perf_counter()
+        # Written by the heartbeat (loop thread), read by the sampler
+        heartbeat = [start]
+        stacks: Counter = Counter()
+        idle = [0]
+        slow_callbacks: List[SlowCallback] = []
+
+        async def beat():
+            while True:
+                heartbeat[0] = time.perf_counter()
+                await asyncio.sleep(interval)
+
+        def sample():
+            current: Optional[SlowCallback] = None
+            blocked_since = 0.0
+            while not stop.wait(interval):
+                frame = sys._current_frames().get(loop_thread)
+                if frame is None:
+                    continue
+                now = time.perf_counter()
+                last_beat = heartbeat[0]
+                stack = None
+                if include_idle or not _is_idle(frame):
+                    stack = _stack(frame)
+                    stacks[stack] += 1
+                else:
+                    idle[0] += 1
+
+                if now - last_beat > interval + slow_threshold:
+                    if current is None:
+                        blocked_since = last_beat + interval
+                        current = SlowCallback(blocked_since - start)
+                        slow_callbacks.append(current)
+                    current.duration = now - blocked_since
+                    current.stacks[stack or _stack(frame)] += 1
+                elif current is not None:
+                    # The heartbeat ran again: the stall ended before it
+                    current.duration = max(current.duration, last_beat - blocked_since)
+                    current = None
+
+        heartbeat_task = asyncio.create_task(beat())
+        sampler = threading.Thread(target=sample, name="sampling-profiler", daemon=True)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            heartbeat_task.cancel()
+            await asyncio.gather(heartbeat_task, return_exceptions=True)
+            # Joined off the loop: the sampler may be mid-sample
+            await asyncio.to_thread(sampler.join)
+
+        return Profile(
+            pid=os.getpid(),
+            duration=time.perf_counter() - start,
+            interval=interval,
+            stacks=stacks,
+            idle_samples=idle[0],
+            slow_callbacks=slow_callbacks,
+        )
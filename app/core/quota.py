@@ -0,0 +1,227 @@
+"""
+Cost-weighted quotas per tenant.
+
+Route rate limits count requests; quotas count what a request costs. Every
+recommendation costs one unit of the tenant's request budget
+(QUOTA_REQUESTS_PER_MINUTE), and one that actually calls the AI API also
+costs its token usage against the AI budget (QUOTA_AI_TOKENS_PER_HOUR). A
+cache hit therefore never touches the AI budget.
+
+Budgets use the same GCRA as the rate limiter, weighted by cost: a budget
+refills continuously and can be spent in one burst up to its full size. An
+AI call is admitted by reserving QUOTA_AI_TOKENS_ESTIMATE tokens, and the
+reservation is corrected to the real usage once the call finishes (usage may
+exceed the estimate; the difference is charged anyway and delays the next
+admission). Without Redis, budgets are kept per worker in memory.
+"""
+import logging
+import math
+import time
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from cachetools import LRUCache
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+from app.core.cache import RedisCache
+from app.core.metrics import Counter
+from app.core.rate_limit import Rate
+
+logger = logging.getLogger(__name__)
+
+QUOTA_DECISIONS = Counter(
+    "quota_decisions_total",
+    "Quota admissions by kind (cache_hit, ai_call) and result (allowed, denied_requests, denied_ai_tokens)",
+    ["kind", "result"],
+)
+QUOTA_AI_TOKENS = Counter(
+    "quota_ai_tokens_total",
+    "AI tokens charged to tenant budgets (actual usage after reconciliation)",
+)
+
+# KEYS: one TAT key per budget; ARGV[1]: 1 to charge even over budget, then
+# (interval ms, period ms, cost) per key. All-or-nothing across the keys.
+# Returns {1} when charged, or {0, index of the exhausted budget, retry after ms}.
+QUOTA_SCRIPT = """
+redis.replicate_commands()
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local force = ARGV[1] == '1'
+local tats = {}
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[i * 3 - 1])
+    local period = tonumber(ARGV[i * 3])
+    local cost = tonumber(ARGV[i * 3 + 1])
+    local tat = math.max(tonumber(redis.call('GET', key)) or now, now)
+    local new_tat = tat + cost * interval
+    if not force and cost > 0 and new_tat - now > period then
+        return {0, i, math.ceil(new_tat - period - now)}
+    end
+    tats[i] = math.max(new_tat, now)
+end
+for i, key in ipairs(KEYS) do
+    if tats[i] > now then
+        redis.call('SET', key, string.format('%.3f', tats[i]), 'PX', math.ceil(tats[i] - now))
+    else
+        redis.call('DEL', key)
+    end
+end
+return {1}
+"""
+
+
+class QuotaExceeded(Exception):
+    """A tenant's request or AI budget is exhausted."""
+
+    def __init__(self, budget: str, retry_after: float):
+        super().__init__(f"Quota exceeded: {budget} budget exhausted")
+        self.budget = budget
+        self.retry_after = retry_after
+
+
+class Budget(NamedTuple):
+    name: str
+    rate: Rate
+
+
+class QuotaReservation(NamedTuple):
+    client: str
+    ai_tokens: int
+
+
+class QuotaManager:
+    """Request and AI-token budgets per tenant, shared through Redis."""
+
+    KEY_PREFIX = "quota:"
+
+    _script = None
+    _script_client = None
+    _memory_tats: LRUCache = LRUCache(maxsize=10000)
+
+    @classmethod
+    def _requests_budget(cls) -> Optional[Budget]:
+        if settings.QUOTA_REQUESTS_PER_MINUTE <= 0:
+            return None
+        return Budget("requests", Rate(settings.QUOTA_REQUESTS_PER_MINUTE, 60))
+
+    @classmethod
+    def _ai_budget(cls) -> Optional[Budget]:
+        if settings.QUOTA_AI_TOKENS_PER_HOUR <= 0:
+            return None
+        return Budget("ai_tokens", Rate(settings.QUOTA_AI_TOKENS_PER_HOUR, 3600))
+
+    @classmethod
+    def _charge_memory(cls, charges: Sequence[Tuple[str, Budget, float]], force: bool) -> Optional[Tuple[int, float]]:
+        now = time.monotonic()
+        tats = []
+        for index, (key, budget, cost) in enumerate(charges):
+            tat = max(cls._memory_tats.get(key, now), now)
+            new_tat = tat + cost * budget.rate.interval
+            if not force and cost > 0 and new_tat - now > budget.rate.period:
+                return index, new_tat - budget.rate.period - now
+            tats.append(max(new_tat, now))
+        for (key, _, _), tat in zip(charges, tats):
+            cls._memory_tats[key] = tat
+        return None
+
+    @classmethod
+    async def _charge(cls, client: str, charges: List[Tuple[Budget, float]], force: bool = False):
+        """
+        Charge costs to several of a client's budgets, all or nothing.
+
+        Raises:
+            QuotaExceeded: If a budget can't cover its cost (unless `force`)
+        """
+        charges = [
+            (f"{cls.KEY_PREFIX}{budget.name}:{client}", budget, cost)
+            for budget, cost in charges
+            if budget is not None and cost
+        ]
+        if not charges:
+            return
+
+        denied = None
+        redis_client = await RedisCache.get_available_client()
+        if redis_client:
+            try:
+                if cls._script is None or cls._script_client is not redis_client:
+                    cls._script = redis_client.register_script(QUOTA_SCRIPT)
+                    cls._script_client = redis_client
+                args = ["1" if force else "0"]
+                for _, budget, cost in charges:
+                    args += [budget.rate.interval * 1000, budget.rate.period * 1000, cost]
+                result = await cls._script(keys=[key for key, _, _ in charges], args=args)
+                if not result[0]:
+                    denied = (int(result[1]) - 1, result[2] / 1000)
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+                denied = cls._charge_memory(charges, force)
+        else:
+            denied = cls._charge_memory(charges, force)
+
+        if denied is not None:
+            index, retry_after = denied
+            raise QuotaExceeded(charges[index][1].name, retry_after)
+
+    @classmethod
+    async def admit(cls, client: str, ai_call: bool) -> Optional[QuotaReservation]:
+        """
+        Charge a recommendation to the client's budgets before serving it.
+
+        Args:
+            client: Tenant id
+            ai_call: Whether the answer has to come from the AI API (cache miss)
+
+        Returns:
+            For AI calls, the reservation to pass to reconcile() afterwards
+
+        Raises:
+            QuotaExceeded: If the request or AI budget is exhausted
+        """
+        kind = "ai_call" if ai_call else "cache_hit"
+        ai_budget = cls._ai_budget() if ai_call else None
+        # Never more than the whole budget, or the call could not be admitted at all
+        estimate = min(settings.QUOTA_AI_TOKENS_ESTIMATE, ai_budget.rate.limit) if ai_budget else 0
+        try:
+            await cls._charge(client, [(cls._requests_budget(), 1), (ai_budget, estimate)])
+        except QuotaExceeded as e:
+            QUOTA_DECISIONS.inc(kind=kind, result=f"denied_{e.budget}")
+            logger.info(f"Quota exceeded for client {client[:8]}: {e.budget} budget, retry in {e.retry_after:.1f}s")
+            raise
+        QUOTA_DECISIONS.inc(kind=kind, result="allowed")
+        if not ai_call:
+            return None
+        return QuotaReservation(client, estimate)
+
+    @classmethod
+    async def reconcile(cls, reservation: Optional[QuotaReservation], ai_tokens: int):
+        """
+        Correct an AI reservation to the tokens the call actually used.
+
+        Args:
+            reservation: Result of admit() (None is ignored)
+            ai_tokens: Total tokens reported by the AI API, including retries and follow-ups
+        """
+        if reservation is None:
+            return
+        QUOTA_AI_TOKENS.inc(ai_tokens)
+        if reservation.ai_tokens == 0:
+            # AI budget disabled at admission
+            return
+        await cls._charge(reservation.client, [(cls._ai_budget(), ai_tokens - reservation.ai_tokens)], force=True)
+
+
+async def quota_exceeded_handler(request: Request, exc: QuotaExceeded) -> JSONResponse:
+    """429 response for an exhausted quota, shaped like the rate limit response."""
+    retry_after = max(math.ceil(exc.retry_after), 1)
+    return JSONResponse(
+        status_code=429,
+        content={
+            "success": False,
+            "error": "Quota exceeded",
+            "detail": f"The tenant's {exc.budget} budget is exhausted",
+            "retry_after": retry_after,
+        },
+        headers={"Retry-After": str(retry_after)},
+    )
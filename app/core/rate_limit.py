@@ -1,51 +1,351 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+"""
+Rate limiting with GCRA (generic cell rate algorithm).
+
+A limit like "10/minute" allows 10 requests at once and then one every 6
+seconds; unlike a fixed window there is no window edge where twice the limit
+gets through. The state per client is one timestamp in Redis (the
+"theoretical arrival time"), updated by a Lua script in a single round trip,
+so all workers share the limit.
+
+To keep Redis off the hot path, each worker reserves a small batch of tokens
+per client and spends them locally for up to RATE_LIMIT_LOCAL_LEASE seconds.
+The batch grows while a client keeps using it up and shrinks when tokens are
+left over; leftovers go back to Redis with the next call. Batches are capped
+so that all workers together hold at most half of a limit, and limits too
+small to share (like 10/minute on 4 workers) always go to Redis.
+
+Without Redis, limits are enforced per worker in memory with the same
+algorithm until Redis is back.
+"""
+import functools
+import logging
+import math
+import time
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from cachetools import LRUCache
 from fastapi import Request
 from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
 
 from app.config import settings
+from app.core.cache import RedisCache
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_CHECKS = Counter(
+    "rate_limit_checks_total",
+    "Rate limit checks by where they were decided (local, redis, memory) and result (allowed, denied)",
+    ["source", "result"],
+)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# KEYS[1]: TAT key; ARGV: interval ms, period ms, tokens wanted, unused tokens returned.
+# Returns {granted, remaining, retry after ms, reset after ms}.
+GCRA_SCRIPT = """
+redis.replicate_commands()
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local returned = tonumber(ARGV[4])
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+tat = math.max(tat - returned * interval, now)
+local available = math.max(math.floor((now + period - tat) / interval), 0)
+local granted = math.min(wanted, available)
+tat = tat + granted * interval
+if tat > now then
+    redis.call('SET', KEYS[1], string.format('%.3f', tat), 'PX', math.ceil(tat - now))
+end
+local retry = 0
+if granted < wanted then
+    retry = math.max(math.ceil(tat + interval - period - now), 0)
+end
+return {granted, available - granted, retry, math.ceil(tat - now)}
+"""
+
+
+class Rate(NamedTuple):
+    limit: int
+    period: float  # Seconds
+
+    @property
+    def interval(self) -> float:
+        """Seconds for one token to be replenished."""
+        return self.period / self.limit
+
+    @classmethod
+    def parse(cls, value: str) -> "Rate":
+        """
+        Parse a limit string such as "10/minute", "500/hour" or "5/10 seconds".
+
+        Raises:
+            ValueError: If the string is not a valid limit
+        """
+        try:
+            count, per = value.split("/", 1)
+            parts = per.strip().split()
+            multiplier = float(parts[0]) if len(parts) == 2 else 1
+            period = PERIODS[parts[-1].rstrip("s")] * multiplier
+            rate = cls(int(count), period)
+        except (ValueError, KeyError, IndexError):
+            raise ValueError(f"Invalid rate limit: {value!r}")
+        if rate.limit < 1 or rate.period <= 0:
+            raise ValueError(f"Invalid rate limit: {value!r}")
+        return rate
+
+    def __str__(self) -> str:
+        return f"{self.limit} per {self.period:g} seconds"
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # Seconds until the next request is allowed (0 if allowed)
+    reset_after: float  # Seconds until the full limit is available again
+
+
+class RateLimitExceeded(Exception):
+    """A request was over its rate limit."""
+
+    def __init__(self, result: RateLimitResult, rate: Rate):
+        super().__init__(f"Rate limit exceeded: {rate}")
+        self.result = result
+        self.rate = rate
+
+
+class _Reservation:
+    """Tokens one worker holds for one client."""
+
+    __slots__ = ("tokens", "batch", "expires", "remaining", "reset_at", "blocked_until")
+
+    def __init__(self):
+        self.tokens = 0
+        self.batch = 1
+        self.expires = 0.0
+        self.remaining = 0  # Shared remaining when the tokens were reserved
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+
+
+class RateLimiter:
+    """GCRA limiter shared through Redis, with per-worker token reservations."""
+
+    KEY_PREFIX = "ratelimit:"
+
+    def __init__(self, key_func: Callable[[Request], str]):
+        self.key_func = key_func
+        self._reservations: LRUCache = LRUCache(maxsize=10000)
+        self._memory_tats: LRUCache = LRUCache(maxsize=10000)
+        self._script = None
+        self._script_client = None
+
+    def _max_batch(self, rate: Rate) -> int:
+        return max(1, min(settings.RATE_LIMIT_LOCAL_BATCH, rate.limit // (2 * max(1, settings.WEB_CONCURRENCY))))
+
+    async def _take_redis(self, client, key: str, rate: Rate, wanted: int, returned: int) -> Tuple[int, int, float, float]:
+        if self._script is None or self._script_client is not client:
+            self._script = client.register_script(GCRA_SCRIPT)
+            self._script_client = client
+        granted, remaining, retry_ms, reset_ms = await self._script(
+            keys=[f"{self.KEY_PREFIX}{key}"],
+            args=[rate.interval * 1000, rate.period * 1000, wanted, returned],
+        )
+        return int(granted), int(remaining), retry_ms / 1000, reset_ms / 1000
+
+    def _take_memory(self, key: str, rate: Rate) -> RateLimitResult:
+        """One token from the in-process GCRA state (Redis unavailable)."""
+        now = time.monotonic()
+        tat = max(self._memory_tats.get(key, now), now)
+        available = max(math.floor((now + rate.period - tat) / rate.interval), 0)
+        if available < 1:
+            retry_after = tat + rate.interval - rate.period - now
+            return RateLimitResult(False, rate.limit, 0, max(retry_after, 0.0), tat - now)
+        tat += rate.interval
+        self._memory_tats[key] = tat
+        return RateLimitResult(True, rate.limit, available - 1, 0.0, tat - now)
+
+    async def hit(self, key: str, rate: Rate) -> RateLimitResult:
+        """
+        Count one request against `key`'s limit.
+
+        Args:
+            key: Client and endpoint identifier
+            rate: Limit to enforce
+
+        Returns:
+            RateLimitResult; `allowed` is False if the request is over the limit
+        """
+        now = time.monotonic()
+        reservation = self._reservations.get(key)
+        if reservation is not None:
+            if now < reservation.expires and reservation.tokens > 0:
+                reservation.tokens -= 1
+                RATE_LIMIT_CHECKS.inc(source="local", result="allowed")
+                return RateLimitResult(
+                    True, rate.limit, reservation.remaining + reservation.tokens,
+                    0.0, max(reservation.reset_at - now, 0.0),
+                )
+            if now < reservation.blocked_until:
+                RATE_LIMIT_CHECKS.inc(source="local", result="denied")
+                return RateLimitResult(
+                    False, rate.limit, 0, reservation.blocked_until - now, max(reservation.reset_at - now, 0.0)
+                )
+
+        client = await RedisCache.get_available_client()
+        if client is None:
+            result = self._take_memory(key, rate)
+            RATE_LIMIT_CHECKS.inc(source="memory", result="allowed" if result.allowed else "denied")
+            return result
+
+        if reservation is None:
+            reservation = self._reservations[key] = _Reservation()
+        returned = 0
+        if now < reservation.expires:
+            # Used up the whole batch within its lease: reserve more next time
+            reservation.batch = min(reservation.batch * 2, self._max_batch(rate))
+        elif reservation.tokens > 0:
+            returned = reservation.tokens
+            reservation.batch = max(reservation.batch // 2, 1)
+        reservation.batch = min(reservation.batch, self._max_batch(rate))
+        reservation.tokens = 0
+
+        try:
+            granted, remaining, retry_after, reset_after = await self._take_redis(
+                client, key, rate, reservation.batch, returned
+            )
+        except Exception as e:
+            RedisCache.mark_unavailable(e)
+            result = self._take_memory(key, rate)
+            RATE_LIMIT_CHECKS.inc(source="memory", result="allowed" if result.allowed else "denied")
+            return result
+
+        now = time.monotonic()
+        reservation.remaining = remaining
+        reservation.reset_at = now + reset_after
+        if granted < 1:
+            reservation.expires = 0.0
+            reservation.batch = 1
+            reservation.blocked_until = now + retry_after
+            RATE_LIMIT_CHECKS.inc(source="redis", result="denied")
+            return RateLimitResult(False, rate.limit, 0, retry_after, reset_after)
+
+        reservation.tokens = granted - 1
+        reservation.expires = now + settings.RATE_LIMIT_LOCAL_LEASE
+        RATE_LIMIT_CHECKS.inc(source="redis", result="allowed")
+        return RateLimitResult(True, rate.limit, remaining + reservation.tokens, 0.0, reset_after)
+
+    def limit(self, limit_string: str, key_func: Optional[Callable[[Request], str]] = None):
+        """
+        Decorator limiting a route per client.
+
+        The route must take a `request: Request` argument. Each decorated
+        route has its own limit; the result is left in
+        `request.state.rate_limit` for the X-RateLimit-* response headers.
+
+        Args:
+            limit_string: Limit such as "10/minute" or "100/hour"
+            key_func: Client key for a request (default: the limiter's)
+
+        Raises:
+            RateLimitExceeded: From the route, when the client is over the limit
+        """
+        rate = Rate.parse(limit_string)
+        key_func = key_func or self.key_func
+
+        def decorator(func):
+            scope = f"{func.__module__}.{func.__name__}"
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                request = kwargs.get("request")
+                if not isinstance(request, Request):
+                    request = next((arg for arg in args if isinstance(arg, Request)), None)
+                if request is None:
+                    raise RuntimeError(f"{scope} needs a `request: Request` argument to be rate limited")
+                result = await self.hit(f"{scope}:{key_func(request)}", rate)
+                request.state.rate_limit = result
+                if not result.allowed:
+                    raise RateLimitExceeded(result, rate)
+                return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
 
 
 def get_api_key_or_ip(request: Request) -> str:
     """
-    Get rate limit key based on API key (preferred) or IP address.
+    Get rate limit key based on tenant or API key (preferred) or IP address.
 
     This allows per-client rate limiting when API key is provided,
     falling back to IP-based limiting for unauthenticated requests.
+    All keys of a tenant share its limits.
     """
+    tenant = getattr(request.state, "tenant", None)
+    if tenant is not None:
+        return f"tenant:{tenant.id}"
     api_key = request.headers.get("X-API-Key")
     if api_key:
         return f"api_key:{api_key[:16]}"  # Use first 16 chars of API key
-    return f"ip:{get_remote_address(request)}"
+    return f"ip:{request.client.host if request.client else '127.0.0.1'}"
 
 
 # Create limiter instance with custom key function
-limiter = Limiter(
-    key_func=get_api_key_or_ip,
-    default_limits=[f"{settings.RATE_LIMIT_PER_MINUTE}/minute"],
-    storage_uri=settings.REDIS_URL if settings.REDIS_URL else None,
-    strategy="fixed-window",
-)
+limiter = RateLimiter(key_func=get_api_key_or_ip)
+
+
+def rate_limit_headers(result: RateLimitResult) -> dict:
+    """X-RateLimit-* headers describing a client's limit after a request."""
+    return {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
+        "X-RateLimit-Reset": str(math.ceil(result.reset_after)),
+    }
 
 
 async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> JSONResponse:
     """Custom handler for rate limit exceeded errors."""
+    retry_after = max(math.ceil(exc.result.retry_after), 1)
     return JSONResponse(
         status_code=429,
         content={
             "success": False,
             "error": "Rate limit exceeded",
-            "detail": str(exc.detail),
-            "retry_after": exc.retry_after if hasattr(exc, 'retry_after') else 60
+            "detail": str(exc.rate),
+            "retry_after": retry_after,
         },
-        headers={
-            "Retry-After": str(exc.retry_after if hasattr(exc, 'retry_after') else 60),
-            "X-RateLimit-Limit": str(settings.RATE_LIMIT_PER_MINUTE),
-        }
+        headers={"Retry-After": str(retry_after), **rate_limit_headers(exc.result)},
     )
 
 
+class RateLimitHeadersMiddleware:
+    """Adds X-RateLimit-* headers to responses of rate limited routes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                result = scope.get("state", {}).get("rate_limit")
+                if result is not None:
+                    headers = MutableHeaders(scope=message)
+                    if "x-ratelimit-limit" not in headers:
+                        headers.update(rate_limit_headers(result))
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
 def get_rate_limit_decorator(limit_string: str = None):
     """
     Get a rate limit decorator with custom limit.
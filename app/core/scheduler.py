@@ -0,0 +1,135 @@
+"""
+Priority scheduling of AI calls.
+
+Each worker runs at most AI_MAX_CONCURRENCY AI calls at once. When all
+slots are busy, callers queue by tier: a free slot always goes to the
+longest-waiting interactive caller before any batch caller, and batch work
+(batch tenants, speculative cache warming) may hold at most
+AI_BATCH_MAX_SHARE of the slots, so interactive requests find capacity even
+while a backfill is running.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Tuple
+
+from app.config import settings
+from app.core.metrics import Gauge, Histogram, REGISTRY
+from app.core.tenants import Tier
+from app.core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+AI_SCHEDULER_WAIT = Histogram(
+    "ai_scheduler_wait_seconds",
+    "Time AI calls waited for a scheduler slot, by tier",
+    ["tier"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+AI_SCHEDULER_QUEUED = Gauge(
+    "ai_scheduler_queued",
+    "AI calls waiting for a scheduler slot, by tier",
+    ["tier"],
+)
+AI_SCHEDULER_RUNNING = Gauge(
+    "ai_scheduler_running",
+    "AI calls holding a scheduler slot, by tier",
+    ["tier"],
+)
+
+# Lower runs first
+PRIORITY = {Tier.INTERACTIVE: 0, Tier.BATCH: 1}
+
+
+class AIScheduler:
+    """Per-worker slots for AI calls, granted by tier priority then arrival."""
+
+    _running: Dict[Tier, int] = {tier: 0 for tier in Tier}
+    _queued: Dict[Tier, int] = {tier: 0 for tier in Tier}
+    _waiters: List[Tuple[int, int, Tier, asyncio.Future]] = []
+    _sequence = itertools.count()
+
+    @classmethod
+    def _batch_slots(cls) -> int:
+        return max(1, int(settings.AI_MAX_CONCURRENCY * settings.AI_BATCH_MAX_SHARE))
+
+    @classmethod
+    def _can_run(cls, tier: Tier) -> bool:
+        if sum(cls._running.values()) >= settings.AI_MAX_CONCURRENCY:
+            return False
+        return tier != Tier.BATCH or cls._running[Tier.BATCH] < cls._batch_slots()
+
+    @classmethod
+    def _queued_ahead(cls, tier: Tier) -> bool:
+        return any(cls._queued[other] for other in Tier if PRIORITY[other] <= PRIORITY[tier])
+
+    @classmethod
+    def _grant_waiting(cls):
+        """Hand free slots to the highest-priority waiters."""
+        while cls._waiters:
+            _, _, tier, future = cls._waiters[0]
+            if future.done():
+                # Cancelled while waiting
+                heapq.heappop(cls._waiters)
+                continue
+            if not cls._can_run(tier):
+                # The head is the most urgent waiter; anything behind it waits too
+                break
+            heapq.heappop(cls._waiters)
+            cls._queued[tier] -= 1
+            cls._running[tier] += 1
+            future.set_result(None)
+
+    @classmethod
+    async def _acquire(cls, tier: Tier):
+        if cls._can_run(tier) and not cls._queued_ahead(tier):
+            cls._running[tier] += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(cls._waiters, (PRIORITY[tier], next(cls._sequence), tier, future))
+        cls._queued[tier] += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled: pass the slot on
+                cls._release(tier)
+            else:
+                cls._queued[tier] -= 1
+                cls._grant_waiting()
+            raise
+
+    @classmethod
+    def _release(cls, tier: Tier):
+        cls._running[tier] -= 1
+        cls._grant_waiting()
+
+    @classmethod
+    @asynccontextmanager
+    async def slot(cls, tier: Tier) -> AsyncIterator[None]:
+        """
+        Hold an AI call slot for the duration of the block.
+
+        Args:
+            tier: Tier of the tenant the call is made for
+        """
+        start = time.perf_counter()
+        with span("ai.queue"):
+            await cls._acquire(tier)
+        AI_SCHEDULER_WAIT.observe(time.perf_counter() - start, tier=tier.value)
+        try:
+            yield
+        finally:
+            cls._release(tier)
+
+
+async def _collect_scheduler_metrics():
+    for tier in Tier:
+        AI_SCHEDULER_QUEUED.set(AIScheduler._queued[tier], tier=tier.value)
+        AI_SCHEDULER_RUNNING.set(AIScheduler._running[tier], tier=tier.value)
+
+
+REGISTRY.register_collector(_collect_scheduler_metrics)
@@ -0,0 +1,119 @@
+"""
+Tenants and their API keys.
+
+Keys come from the api_keys table (managed with scripts/api_keys.py) or,
+when API_KEYS_FILE is set, from a JSON file of key hashes; the API_KEY
+setting is always accepted as the "default" interactive tenant. The
+registry is held in memory and reloaded every API_KEYS_REFRESH_SECONDS, so
+authenticating a request never waits on the database.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from enum import Enum
+from typing import Dict, NamedTuple, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Tier(str, Enum):
+    """Service tier of a tenant; interactive AI work is scheduled ahead of batch."""
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+
+
+class Tenant(NamedTuple):
+    id: str
+    tier: Tier
+
+
+DEFAULT_TENANT = "default"
+
+
+class TenantRegistry:
+    """
+    In-memory map of API key hashes to tenants.
+
+    API_KEYS_FILE format:
+        [{"tenant": "acme", "key_sha256": "<hex>", "tier": "batch"}, ...]
+    """
+
+    _tenants: Dict[str, Tenant] = {}
+    _loaded_at: float = 0.0
+    _load_lock: asyncio.Lock = asyncio.Lock()
+
+    @staticmethod
+    def hash_key(api_key: str) -> str:
+        """sha256 hex digest under which a key is stored."""
+        return hashlib.sha256(api_key.encode()).hexdigest()
+
+    @classmethod
+    def _load_file(cls, path: str) -> Dict[str, Tenant]:
+        with open(path) as f:
+            entries = json.load(f)
+        return {
+            entry["key_sha256"].lower(): Tenant(entry["tenant"], Tier(entry.get("tier", Tier.INTERACTIVE.value)))
+            for entry in entries
+        }
+
+    @classmethod
+    async def _load_db(cls) -> Dict[str, Tenant]:
+        # Imported here: app.db imports app.core
+        from sqlalchemy import select
+        from app.db.database import AsyncSessionLocal
+        from app.db.models import ApiKey
+
+        if AsyncSessionLocal is None:
+            return {}
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(
+                select(ApiKey.key_hash, ApiKey.tenant, ApiKey.tier).where(ApiKey.revoked_at.is_(None))
+            )
+            return {key_hash: Tenant(tenant, Tier(tier)) for key_hash, tenant, tier in rows}
+
+    @classmethod
+    async def load(cls) -> int:
+        """
+        Reload the registry from API_KEYS_FILE or the api_keys table.
+
+        On failure the previous keys stay in use (and API_KEY always works).
+
+        Returns:
+            Number of keys accepted
+        """
+        try:
+            if settings.API_KEYS_FILE:
+                tenants = cls._load_file(settings.API_KEYS_FILE)
+            else:
+                tenants = await cls._load_db()
+        except Exception as e:
+            logger.warning(f"Could not load API keys, keeping {len(cls._tenants)} known keys: {e}")
+            tenants = dict(cls._tenants)
+
+        if settings.API_KEY:
+            tenants[cls.hash_key(settings.API_KEY)] = Tenant(DEFAULT_TENANT, Tier.INTERACTIVE)
+        cls._tenants = tenants
+        cls._loaded_at = time.monotonic()
+        return len(tenants)
+
+    @classmethod
+    async def refresh(cls):
+        """Reload the registry if it is older than API_KEYS_REFRESH_SECONDS (one caller at a time)."""
+        stale = time.monotonic() - cls._loaded_at >= settings.API_KEYS_REFRESH_SECONDS
+        if stale and not cls._load_lock.locked():
+            async with cls._load_lock:
+                await cls.load()
+
+    @classmethod
+    def lookup(cls, api_key: str) -> Optional[Tenant]:
+        """Tenant owning an API key, or None if the key is unknown or revoked."""
+        return cls._tenants.get(cls.hash_key(api_key))
+
+    @classmethod
+    def configured(cls) -> bool:
+        """Whether any API key is accepted."""
+        return bool(cls._tenants or settings.API_KEY)
@@ -0,0 +1,188 @@
+"""
+Per-request timing spans.
+
+RequestTimingMiddleware starts a trace for a sampled request
+(TRACE_SAMPLE_RATE) and keeps it in a context variable; code on the request
+path times its stages with
+
+    with span("db.user"):
+        ...
+
+A sampled request gets a Server-Timing header (total time per span name, if
+TRACE_SERVER_TIMING) and one JSON log line with every span. Outside a
+sampled request span() costs one context variable lookup.
+
+TRACE_HOOK ("package.module:function") plugs in an external tracer: the
+function is called with the span name and must return a context manager
+that wraps the stage, e.g. an OpenTelemetry tracer's start_as_current_span.
+"""
+import importlib
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+TRACE_EXCLUDED_PREFIXES = ("/health", "/ready", "/metrics")
+
+
+class Trace:
+    """Spans recorded for one request."""
+
+    __slots__ = ("start", "spans", "fields", "closed")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        # (name, start offset, duration, failed)
+        self.spans: List[Tuple[str, float, float, bool]] = []
+        self.fields: Dict[str, Any] = {}
+        self.closed = False
+
+    def server_timing(self, total: float) -> str:
+        """Server-Timing header value: time per span name (summed) and the total, in ms."""
+        durations: Dict[str, float] = {}
+        for name, _, duration, _ in self.spans:
+            durations[name] = durations.get(name, 0.0) + duration
+        durations["total"] = total
+        return ", ".join(f"{name};dur={duration * 1000:.1f}" for name, duration in durations.items())
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+class Tracing:
+    """External tracer hook (see module docstring)."""
+
+    hook: Optional[Callable[[str], ContextManager]] = None
+
+    @classmethod
+    def set_hook(cls, hook: Optional[Callable[[str], ContextManager]]):
+        cls.hook = hook
+
+    @classmethod
+    def load_hook(cls) -> Optional[str]:
+        """
+        Install the TRACE_HOOK function, if configured.
+
+        Returns:
+            The hook's path, or None if no hook is configured
+
+        Raises:
+            ValueError: If TRACE_HOOK is not "module:function" or can't be imported
+        """
+        if not settings.TRACE_HOOK:
+            return None
+        module_name, _, attr = settings.TRACE_HOOK.partition(":")
+        try:
+            cls.set_hook(getattr(importlib.import_module(module_name), attr))
+        except (ImportError, AttributeError, ValueError) as e:
+            raise ValueError(f"Invalid TRACE_HOOK {settings.TRACE_HOOK!r}: {e}")
+        return settings.TRACE_HOOK
+
+
+class _Span:
+    __slots__ = ("name", "_trace", "_start", "_external")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._trace = trace = _current_trace.get()
+        if trace is not None and not trace.closed:
+            self._external = Tracing.hook(self.name) if Tracing.hook else None
+            if self._external is not None:
+                self._external.__enter__()
+            self._start = time.perf_counter()
+        else:
+            self._trace = None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        trace = self._trace
+        if trace is not None:
+            end = time.perf_counter()
+            trace.spans.append((self.name, self._start - trace.start, end - self._start, exc_type is not None))
+            if self._external is not None:
+                self._external.__exit__(exc_type, exc, tb)
+        return False
+
+
+def span(name: str) -> _Span:
+    """Time a stage of the current request (no-op if it isn't sampled)."""
+    return _Span(name)
+
+
+def annotate(**fields: Any):
+    """Add fields to the current request's timing log line (no-op if it isn't sampled)."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.fields.update(fields)
+
+
+class RequestTimingMiddleware:
+    """Traces sampled requests; adds Server-Timing and logs the spans (see module docstring)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"].startswith(TRACE_EXCLUDED_PREFIXES)
+            or random.random() >= settings.TRACE_SAMPLE_RATE
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        token = _current_trace.set(trace)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.TRACE_SERVER_TIMING:
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", trace.server_timing(time.perf_counter() - trace.start)
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            # Tasks started by the request (e.g. speculation) inherit the trace;
+            # their later spans are not recorded
+            trace.closed = True
+            _current_trace.reset(token)
+            self._log(scope, trace, status_code, time.perf_counter() - trace.start)
+
+    @staticmethod
+    def _log(scope, trace: Trace, status_code: int, total: float):
+        tenant = scope.get("state", {}).get("tenant")
+        record = {
+            "event": "request_timing",
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "tenant": tenant.id if tenant else None,
+            "duration_ms": round(total * 1000, 2),
+            **trace.fields,
+            "spans": [
+                {
+                    "name": name,
+                    "start_ms": round(start * 1000, 2),
+                    "duration_ms": round(duration * 1000, 2),
+                    **({"error": True} if failed else {}),
+                }
+                for name, start, duration, failed in trace.spans
+            ],
+        }
+        logger.info(json.dumps(record))
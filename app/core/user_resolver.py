@@ -0,0 +1,69 @@
+import logging
+from typing import Optional
+
+from cachetools import LRUCache
+
+from app.config import settings
+from app.core.cache import RedisCache
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+USER_RESOLVER_LOOKUPS = Counter(
+    "user_resolver_lookups_total",
+    "User identifier resolutions by tier that answered (local, redis, miss)",
+    ["tier"],
+)
+
+
+class UserResolver:
+    """
+    Resolves user identifiers (external_user_id, or an internal UUID string)
+    to the internal users.id without a database round trip.
+
+    Bounded in-process LRU in front of Redis. The mapping never changes once
+    a user exists (external_user_id is unique and users are not re-keyed),
+    so entries are never invalidated, only aged out.
+    """
+
+    KEY_PREFIX = "user_ref:"
+
+    _local: LRUCache = LRUCache(maxsize=settings.USER_RESOLVER_LRU_SIZE)
+
+    @classmethod
+    async def get(cls, identifier: str) -> Optional[str]:
+        """Internal user UUID (as a string) for an identifier, if known."""
+        user_id = cls._local.get(identifier)
+        if user_id is not None:
+            USER_RESOLVER_LOOKUPS.inc(tier="local")
+            return user_id
+
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                user_id = await client.get(f"{cls.KEY_PREFIX}{identifier}")
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+        if user_id is not None:
+            cls._local[identifier] = user_id
+            USER_RESOLVER_LOOKUPS.inc(tier="redis")
+            return user_id
+
+        USER_RESOLVER_LOOKUPS.inc(tier="miss")
+        return None
+
+    @classmethod
+    async def set(cls, identifier: str, user_id: str):
+        """Remember which internal user an identifier refers to."""
+        cls._local[identifier] = user_id
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                await client.setex(f"{cls.KEY_PREFIX}{identifier}", settings.USER_REF_CACHE_TTL, user_id)
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+
+    @classmethod
+    def clear_local(cls):
+        """Drop the in-process entries (e.g. after the users table was reset)."""
+        cls._local.clear()
@@ -0,0 +1,135 @@
+"""
+Worker warmup.
+
+A freshly started worker has no database connections, no keep-alive (or
+TLS session) to the AI endpoint and no questions catalog in memory, so its
+first requests pay for all of that. Warmup does it up front, in the
+background from the app lifespan, while GET /ready answers 503: the load
+balancer only routes to the worker once every step has finished.
+
+Steps run concurrently, each bounded by WARMUP_TIMEOUT. A failed step is
+reported but doesn't keep the worker unready forever; whether a dependency
+is reachable is the health prober's call.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.core.cache import RedisCache
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_database() -> Dict[str, Any]:
+    """Open WARMUP_DB_CONNECTIONS connections in each database pool."""
+    from app.db.pool import warm_pools  # app.db imports app.core
+
+    return {"connections": await warm_pools(settings.WARMUP_DB_CONNECTIONS)}
+
+
+async def warm_ai() -> Dict[str, Any]:
+    """Open WARMUP_AI_CONNECTIONS connections to the AI endpoint."""
+    from app.services.recommendation import HTTP2_AVAILABLE, RecommendationService  # app.services imports app.core
+
+    if settings.AI_HTTP2 and not HTTP2_AVAILABLE:
+        logger.warning("AI_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+    return {
+        "connections": await RecommendationService.warm_http_client(settings.WARMUP_AI_CONNECTIONS),
+        "http2": settings.AI_HTTP2 and HTTP2_AVAILABLE,
+    }
+
+
+async def load_questions() -> Dict[str, Any]:
+    """Load the questions catalog into memory."""
+    from app.services.recommendation import RecommendationService
+
+    questions = await asyncio.to_thread(RecommendationService._load_questions)
+    return {"flows": len(questions.get("flows", {}))}
+
+
+async def hydrate_l1_cache() -> Dict[str, Any]:
+    """Copy up to WARMUP_L1_CACHE_ENTRIES cached recommendations from Redis into memory."""
+    return {"entries": await RedisCache.hydrate_fallback(settings.WARMUP_L1_CACHE_ENTRIES)}
+
+
+async def _run_step(step) -> Dict[str, Any]:
+    """Run a step with WARMUP_TIMEOUT, adding its status and latency."""
+    start = time.perf_counter()
+    try:
+        result = {"status": "ok", **await asyncio.wait_for(step(), settings.WARMUP_TIMEOUT)}
+    except asyncio.TimeoutError:
+        result = {"status": "error", "error": "Timed out"}
+    except Exception as e:
+        result = {"status": "error", "error": str(e)}
+    return {**result, "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+
+class Warmup:
+    """Warms this worker up once at startup (see module docstring)."""
+
+    _steps: Dict[str, Any] = {}
+    _duration: Optional[float] = None
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def _enabled_steps(cls) -> Dict[str, Any]:
+        from app.db.database import async_engine
+
+        steps = {"questions": load_questions}
+        if settings.WARMUP_DB_CONNECTIONS > 0 and async_engine is not None:
+            steps["database"] = warm_database
+        if settings.WARMUP_AI_CONNECTIONS > 0 and settings.OPENROUTER_API_KEY:
+            steps["ai"] = warm_ai
+        if settings.WARMUP_L1_CACHE_ENTRIES > 0:
+            steps["l1_cache"] = hydrate_l1_cache
+        return steps
+
+    @classmethod
+    async def run(cls) -> Dict[str, Any]:
+        """Run all enabled steps now; the worker counts as warm afterwards."""
+        start = time.perf_counter()
+        steps = cls._enabled_steps()
+        results = await asyncio.gather(*(_run_step(step) for step in steps.values()))
+        cls._steps = dict(zip(steps, results))
+        cls._duration = time.perf_counter() - start
+
+        failed = [name for name, result in cls._steps.items() if result["status"] != "ok"]
+        summary = ", ".join(
+            f"{name} {result['latency_ms']}ms" for name, result in cls._steps.items()
+        )
+        if failed:
+            logger.warning(f"Warmup finished in {cls._duration:.2f}s with failed steps {failed}: {summary}")
+        else:
+            logger.info(f"Warmup finished in {cls._duration:.2f}s: {summary}")
+        return cls.status()
+
+    @classmethod
+    def start(cls):
+        """Start warming up in the background (call from the app lifespan)."""
+        if cls._task is None:
+            cls._task = asyncio.create_task(cls.run())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            await asyncio.gather(cls._task, return_exceptions=True)
+            cls._task = None
+
+    @classmethod
+    def done(cls) -> bool:
+        """Whether warmup has finished (successfully or not)."""
+        return cls._duration is not None
+
+    @classmethod
+    def status(cls) -> Dict[str, Any]:
+        """Warmup state with the result of each step once finished."""
+        if not cls.done():
+            return {"status": "warming", "steps": {}}
+        return {
+            "status": "complete",
+            "duration_ms": round(cls._duration * 1000, 1),
+            "steps": cls._steps,
+        }
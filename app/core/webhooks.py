@@ -0,0 +1,127 @@
+"""
+Outbound webhook delivery that can't be pointed at internal services.
+
+Webhook URLs come from API clients, so without checks any tenant could make
+the server POST to loopback, the private network or a cloud metadata
+endpoint (169.254.169.254). A URL is accepted only if its host is allowed
+(JOB_WEBHOOK_ALLOWED_HOSTS, when set) and every address it resolves to is
+public. The check runs when the job is submitted and again at delivery,
+and delivery connects to the address that was checked (the hostname is
+kept for the Host header and TLS), so a DNS answer that changes in between
+(rebinding) can't redirect it. Redirects are never followed, and the
+client is separate from the AI client and ignores proxy environment
+variables.
+"""
+import asyncio
+import ipaddress
+import socket
+from typing import Dict, NamedTuple, Optional
+
+import httpx
+
+from app.config import settings
+
+
+class WebhookURLError(ValueError):
+    """A webhook URL that may not be called."""
+
+
+class WebhookTarget(NamedTuple):
+    """A checked webhook URL and the address to connect to."""
+
+    url: str
+    host: str
+    address: str
+
+
+def _allowed_hosts() -> set:
+    return {h.strip().lower() for h in settings.JOB_WEBHOOK_ALLOWED_HOSTS.split(",") if h.strip()}
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])  # Drop an IPv6 zone id
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def resolve_webhook(url: str) -> WebhookTarget:
+    """
+    Check a webhook URL and resolve the address to deliver to.
+
+    Args:
+        url: Absolute http(s) URL
+
+    Returns:
+        WebhookTarget with the first resolved address
+
+    Raises:
+        WebhookURLError: If the URL, its host or any address it resolves to is not allowed
+    """
+    parsed = httpx.URL(url)
+    if parsed.scheme not in ("http", "https") or not parsed.host:
+        raise WebhookURLError("webhook_url must be an absolute http(s) URL")
+    host = parsed.host.lower()
+
+    allowed = _allowed_hosts()
+    if allowed and host not in allowed:
+        raise WebhookURLError(f"webhook_url host '{host}' is not allowed")
+
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    try:
+        infos = await asyncio.wait_for(
+            asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM),
+            settings.JOB_WEBHOOK_TIMEOUT,
+        )
+    except (OSError, asyncio.TimeoutError):
+        raise WebhookURLError(f"webhook_url host '{host}' does not resolve")
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    if not addresses:
+        raise WebhookURLError(f"webhook_url host '{host}' does not resolve")
+
+    # Every address must be public: a client may connect to any of them
+    if not settings.JOB_WEBHOOK_ALLOW_PRIVATE and not all(_is_public(a) for a in addresses):
+        raise WebhookURLError(f"webhook_url host '{host}' resolves to a non-public address")
+    return WebhookTarget(url=url, host=host, address=addresses[0])
+
+
+class WebhookClient:
+    """HTTP client for webhook deliveries (see module docstring)."""
+
+    _client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        if cls._client is None or cls._client.is_closed:
+            cls._client = httpx.AsyncClient(
+                timeout=settings.JOB_WEBHOOK_TIMEOUT,
+                follow_redirects=False,
+                trust_env=False,  # A proxy would resolve the hostname itself
+                limits=httpx.Limits(max_keepalive_connections=10, max_connections=50),
+            )
+        return cls._client
+
+    @classmethod
+    async def close(cls):
+        """Close the client (call on shutdown)."""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+    @classmethod
+    async def post(cls, url: str, content: bytes, headers: Dict[str, str]) -> httpx.Response:
+        """
+        POST to a webhook URL, checked and pinned to its resolved address.
+
+        Raises:
+            WebhookURLError: If the URL is (no longer) allowed
+            httpx.HTTPError: If the request fails
+        """
+        target = await resolve_webhook(url)
+        pinned = httpx.URL(url).copy_with(host=target.address)
+        return await cls.get_client().post(
+            pinned,
+            content=content,
+            headers={**headers, "Host": httpx.URL(url).netloc.decode("ascii")},
+            extensions={"sni_hostname": target.host},
+        )
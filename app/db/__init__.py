@@ -1,14 +1,23 @@
 """Database module."""
 
-from app.db.database import Base, async_engine, get_db, init_db
-from app.db.models import User, QuestionnaireResponse, PathwayRecommendationRecord
+from app.db.database import Base, async_engine, replica_engine, get_db
+from app.db.migrations import SchemaVersionError, verify_schema
+from app.db.routing import ReadRouter, get_read_db, get_user_read_db
+from app.db.models import User, QuestionnaireResponse, PathwayRecommendationRecord, AIRawResponse, PathwayRollup
 
 __all__ = [
     "Base",
     "async_engine",
+    "replica_engine",
     "get_db",
-    "init_db",
+    "get_read_db",
+    "get_user_read_db",
+    "ReadRouter",
+    "verify_schema",
+    "SchemaVersionError",
     "User",
     "QuestionnaireResponse",
     "PathwayRecommendationRecord",
+    "AIRawResponse",
+    "PathwayRollup",
 ]
@@ -1,44 +1,102 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import uuid
+from functools import lru_cache
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker, AsyncAttrs
 from sqlalchemy.orm import declarative_base
 from sqlalchemy import create_engine
 
 from app.config import settings
+from app.db.pool import InstrumentedQueuePool, pool_limits, register_engine
+
+
+def to_async_url(url: str) -> str:
+    """Convert a sync URL to an async URL for asyncpg."""
+    return url.replace("postgresql://", "postgresql+asyncpg://") if url else ""
+
+
+ASYNC_DATABASE_URL = to_async_url(settings.DATABASE_URL)
+ASYNC_READ_REPLICA_URL = to_async_url(settings.READ_REPLICA_URL)
+
+
+def connect_args() -> dict:
+    """asyncpg connect arguments for the configured connection mode (also for one-off engines)."""
+    if not settings.DB_PGBOUNCER:
+        return {}
+    # PgBouncer transaction pooling hands each transaction to any server
+    # connection, where statements prepared on another one don't exist: turn
+    # off asyncpg's and SQLAlchemy's statement caches, and give the remaining
+    # (per-query) prepared statements unique names so they can't collide
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+    }
+
+
+def _create_engine(url: str, name: str, max_connections: int):
+    limits = pool_limits(max_connections, settings.WEB_CONCURRENCY)
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_logging_name=name,
+        pool_pre_ping=True,
+        pool_size=limits.pool_size,
+        max_overflow=limits.max_overflow,
+        pool_timeout=30,       # Wait up to 30s for connection
+        pool_recycle=1800,     # Recycle connections every 30 minutes
+        echo=settings.DEBUG,   # Log SQL in debug mode
+        connect_args=connect_args(),
+    )
+    register_engine(name, engine)
+    return engine
+
+
+def _create_sessionmaker(engine):
+    return async_sessionmaker(
+        bind=engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
 
-# Convert sync URL to async URL for asyncpg
-ASYNC_DATABASE_URL = settings.DATABASE_URL.replace(
-    "postgresql://", "postgresql+asyncpg://"
-) if settings.DATABASE_URL else ""
-
-# Async engine for production use (non-blocking)
-async_engine = create_async_engine(
-    ASYNC_DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=20,          # Increased for concurrent requests
-    max_overflow=40,       # Allow more connections during spikes
-    pool_timeout=30,       # Wait up to 30s for connection
-    pool_recycle=1800,     # Recycle connections every 30 minutes
-    echo=settings.DEBUG,   # Log SQL in debug mode
+
+# Async engine for production use (non-blocking); all writes go here
+async_engine = _create_engine(
+    ASYNC_DATABASE_URL, "primary", settings.DB_MAX_CONNECTIONS
 ) if ASYNC_DATABASE_URL else None
 
 # Async session factory
-AsyncSessionLocal = async_sessionmaker(
-    bind=async_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-) if async_engine else None
-
-# Sync engine for migrations and init only
-sync_engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-) if settings.DATABASE_URL else None
-
-# Base class for models
-Base = declarative_base()
+AsyncSessionLocal = _create_sessionmaker(async_engine) if async_engine else None
+
+# Optional streaming replica for read-only queries (routed by app.db.routing.ReadRouter)
+replica_engine = _create_engine(
+    ASYNC_READ_REPLICA_URL, "replica", settings.READ_REPLICA_MAX_CONNECTIONS
+) if ASYNC_READ_REPLICA_URL else None
+
+ReplicaSessionLocal = _create_sessionmaker(replica_engine) if replica_engine else None
+
+
+@lru_cache(maxsize=1)
+def get_sync_engine():
+    """
+    Sync (psycopg2) engine for synchronous tooling.
+
+    Created on first use, so app workers, which never need it, don't hold
+    a second pool.
+    """
+    if not settings.DATABASE_URL:
+        return None
+    return create_engine(
+        settings.DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=5,
+        max_overflow=10,
+    )
+
+
+# Base class for models (AsyncAttrs: `await obj.awaitable_attrs.<name>` loads lazy attributes)
+Base = declarative_base(cls=AsyncAttrs)
 
 
 async def get_db() -> AsyncSession:
@@ -49,15 +107,3 @@ async def get_db() -> AsyncSession:
         finally:
             await session.close()
 
-
-async def init_db():
-    """Initialize database tables asynchronously."""
-    from app.db.models import Base
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-
-def init_db_sync():
-    """Initialize database tables synchronously (for startup)."""
-    from app.db.models import Base
-    Base.metadata.create_all(bind=sync_engine)
@@ -0,0 +1,150 @@
+"""
+Alembic schema migrations.
+
+The schema is created and changed only by `python scripts/migrate.py` (which
+`python run.py` also runs once before starting the workers). Workers only
+check at startup that the database is at the revision they were built for,
+a single-row read instead of create_all's catalog queries and table locks.
+"""
+import asyncio
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from alembic.util import CommandError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Schema as the app's create_all() used to leave it; see migrations/versions/0001_*
+BASELINE_REVISION = "0001"
+
+# pg_advisory_xact_lock key, so concurrent migrate runs apply each revision once
+MIGRATION_LOCK_ID = 7_283_640_211
+
+
+class SchemaVersionError(RuntimeError):
+    """The database schema is not at the revision this build expects."""
+
+
+def alembic_config() -> Config:
+    """Alembic config for the project (migrations/, alembic.ini)."""
+    config = Config(str(PROJECT_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(PROJECT_ROOT / "migrations"))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+@lru_cache(maxsize=1)
+def _script_directory() -> ScriptDirectory:
+    return ScriptDirectory.from_config(alembic_config())
+
+
+def head_revision() -> str:
+    """Newest revision in migrations/versions."""
+    return _script_directory().get_current_head()
+
+
+async def current_revision(conn: AsyncConnection) -> Optional[str]:
+    """Revision the database is at, or None if it has never been migrated."""
+    if not await conn.scalar(text("SELECT to_regclass('alembic_version') IS NOT NULL")):
+        return None
+    return await conn.scalar(text("SELECT version_num FROM alembic_version"))
+
+
+def _upgrade(sync_conn, revision: str, adopt: bool):
+    config = alembic_config()
+    config.attributes["connection"] = sync_conn
+    if adopt:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
+
+
+async def upgrade_database(engine: AsyncEngine, revision: str = "head") -> Tuple[Optional[str], Optional[str]]:
+    """
+    Migrate the database to `revision`, in one transaction.
+
+    A database created by the old create_all() startup (tables but no
+    alembic_version) is first stamped at the baseline revision. Also creates
+    the upcoming monthly partitions when partitioning is enabled.
+
+    Args:
+        engine: Engine for the primary database
+        revision: Target revision (default: newest)
+
+    Returns:
+        Tuple of (revision before, revision after)
+    """
+    from app.db.partitions import ensure_partitions
+
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_ID})
+        before = await current_revision(conn)
+        adopt = before is None and await conn.scalar(text("SELECT to_regclass('users') IS NOT NULL"))
+        if adopt:
+            logger.info(f"Existing schema without migration history, stamping it at {BASELINE_REVISION}")
+        await conn.run_sync(_upgrade, revision, adopt)
+        if settings.DB_PARTITIONING_ENABLED:
+            # Inserts fail without a partition for the current month
+            await ensure_partitions(conn)
+        after = await current_revision(conn)
+    return before, after
+
+
+def migrate(revision: str = "head") -> Tuple[Optional[str], Optional[str]]:
+    """
+    Run upgrade_database() from synchronous code (run.py, scripts/migrate.py).
+
+    Uses a throwaway connection, so nothing is left in the app's pool.
+    """
+    from app.db.database import ASYNC_DATABASE_URL, connect_args
+
+    async def run():
+        engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool, connect_args=connect_args())
+        try:
+            return await upgrade_database(engine, revision)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+async def verify_schema(engine: AsyncEngine) -> str:
+    """
+    Check that the database is migrated to this build's head revision.
+
+    A revision newer than any this build knows is accepted with a warning:
+    during a rolling deploy, older workers keep running against a schema
+    migrated for the new release.
+
+    Returns:
+        The database's revision
+
+    Raises:
+        SchemaVersionError: If the database is unmigrated or behind
+    """
+    async with engine.connect() as conn:
+        revision = await current_revision(conn)
+    head = head_revision()
+    if revision == head:
+        return revision
+    if revision is None:
+        raise SchemaVersionError("Database schema is not initialized - run `python scripts/migrate.py`")
+    try:
+        _script_directory().get_revision(revision)
+    except CommandError:
+        logger.warning(f"Database schema is at revision {revision}, newer than this build ({head})")
+        return revision
+    raise SchemaVersionError(
+        f"Database schema is at revision {revision}, this build needs {head} - run `python scripts/migrate.py`"
+    )
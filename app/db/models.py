@@ -1,11 +1,24 @@
+import hashlib
+import json
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Float, DateTime, Text, ForeignKey, JSON, Index
+from sqlalchemy import Column, String, Float, DateTime, Text, ForeignKey, JSON, Index, Integer, SmallInteger
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
+from app.config import settings
 from app.db.database import Base
 
+# Monthly range partitioning of the append-only tables (see app/db/partitions.py).
+# Postgres requires the partition key in every unique constraint, so partitioned
+# tables get a composite (id, created_at) primary key, and foreign keys into
+# them can't be declared - the questionnaire link is then only enforced by the ORM.
+PARTITIONED = settings.DB_PARTITIONING_ENABLED
+
+
+def _partition_args() -> dict:
+    return {"postgresql_partition_by": "RANGE (created_at)"} if PARTITIONED else {}
+
 
 class User(Base):
     """User model - represents a user taking the questionnaire."""
@@ -29,11 +42,33 @@ class QuestionnaireResponse(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     entry_type = Column(String(50), nullable=False)  # 'yes_i_know' or 'no_im_new'
     answers = Column(JSON, nullable=False)  # Store all Q&A as JSON
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True, primary_key=PARTITIONED)
 
     # Relationships
     user = relationship("User", back_populates="questionnaire_responses")
-    recommendation = relationship("PathwayRecommendationRecord", back_populates="questionnaire_response", uselist=False)
+    recommendation = relationship(
+        "PathwayRecommendationRecord",
+        primaryjoin="QuestionnaireResponse.id == foreign(PathwayRecommendationRecord.questionnaire_response_id)",
+        back_populates="questionnaire_response",
+        uselist=False,
+    )
+
+    __table_args__ = (_partition_args(),)
+
+
+class AIRawResponse(Base):
+    """Raw AI responses, content-addressed so identical payloads are stored once."""
+    __tablename__ = "ai_raw_responses"
+
+    content_hash = Column(String(64), primary_key=True)  # sha256 of the canonical JSON
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    @staticmethod
+    def hash_payload(payload: dict) -> str:
+        """Content hash of a payload (key order and whitespace don't matter)."""
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode()).hexdigest()
 
 
 class PathwayRecommendationRecord(Base):
@@ -42,33 +77,88 @@ class PathwayRecommendationRecord(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
-    questionnaire_response_id = Column(UUID(as_uuid=True), ForeignKey("questionnaire_responses.id"), nullable=False)
+    questionnaire_response_id = Column(
+        UUID(as_uuid=True),
+        *(() if PARTITIONED else (ForeignKey("questionnaire_responses.id"),)),
+        nullable=False,
+    )
 
     # AI Recommendation Results
-    recommended_pathway = Column(String(255), nullable=False, index=True)
+    recommended_pathway = Column(String(255), nullable=False)  # As worded by the AI
+    pathway_id = Column(SmallInteger, nullable=True)  # settings.PATHWAYS id, NULL if unresolved
     confidence = Column(Float, nullable=False)
 
-    # Detected Profile
+    # Detected Profile (text as returned by the AI, plus enum codes from app/services/pathways.py)
     spiritual_stage = Column(String(100), nullable=False)
     primary_need = Column(String(100), nullable=False)
     emotional_state = Column(String(100), nullable=False)
+    spiritual_stage_code = Column(SmallInteger, nullable=True)
+    primary_need_code = Column(SmallInteger, nullable=True)
+    emotional_state_code = Column(SmallInteger, nullable=True)
 
     # AI Response Details
     reasoning = Column(Text, nullable=False)
     next_step_message = Column(Text, nullable=False)
 
-    # Raw AI response for debugging/audit
-    raw_ai_response = Column(JSON, nullable=True)
+    # Raw AI response for debugging/audit, stored once per distinct payload
+    raw_response_hash = Column(String(64), ForeignKey("ai_raw_responses.content_hash"), nullable=True)
+    # Legacy inline copy, only set on rows not yet moved by scripts/backfill_raw_responses.py
+    raw_ai_response = deferred(Column(JSON, nullable=True))
 
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True, primary_key=PARTITIONED)
 
     # Relationships
     user = relationship("User", back_populates="recommendations")
-    questionnaire_response = relationship("QuestionnaireResponse", back_populates="recommendation")
+    # Loaded on access only: `await record.awaitable_attrs.raw_response`
+    raw_response = relationship("AIRawResponse", lazy="select")
+    questionnaire_response = relationship(
+        "QuestionnaireResponse",
+        primaryjoin="foreign(PathwayRecommendationRecord.questionnaire_response_id) == QuestionnaireResponse.id",
+        back_populates="recommendation",
+    )
 
     # Composite indexes for common query patterns
     __table_args__ = (
         Index('ix_recommendations_user_created', 'user_id', 'created_at'),
-        Index('ix_recommendations_pathway_created', 'recommended_pathway', 'created_at'),
+        Index('ix_recommendations_pathway_id_created', 'pathway_id', 'created_at'),
+        _partition_args(),
     )
+
+
+class PathwayRollup(Base):
+    """
+    Hourly recommendation counts per pathway, entry type and detected profile.
+
+    Maintained incrementally by the writer (see AnalyticsService.record), so
+    analytics read a few hundred rollup rows instead of scanning
+    pathway_recommendations. Rebuild with scripts/rebuild_rollups.py.
+    """
+    __tablename__ = "pathway_rollups"
+
+    bucket = Column(DateTime, primary_key=True)  # Start of the hour (UTC)
+    pathway_id = Column(SmallInteger, primary_key=True)  # 0 = unresolved pathway
+    entry_type = Column(String(50), primary_key=True)
+    spiritual_stage_code = Column(SmallInteger, primary_key=True)
+    primary_need_code = Column(SmallInteger, primary_key=True)
+    emotional_state_code = Column(SmallInteger, primary_key=True)
+    recommendation_count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+
+
+class ApiKey(Base):
+    """
+    API keys of the tenants allowed to call the API.
+
+    Only a sha256 hash of each key is stored; key_prefix (the first few
+    characters) identifies a key for listing and revoking. Manage with
+    scripts/api_keys.py.
+    """
+    __tablename__ = "api_keys"
+
+    key_hash = Column(String(64), primary_key=True)
+    key_prefix = Column(String(16), nullable=False)
+    tenant = Column(String(100), nullable=False, index=True)
+    tier = Column(String(20), nullable=False, default="interactive")  # app.core.tenants.Tier
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
@@ -0,0 +1,154 @@
+"""
+Monthly range partitions for the append-only tables.
+
+Partitions are named `{table}_pYYYYMM` and cover [first of month, first of
+next month). Months are created ahead of time, since an insert into a month
+without a partition fails, and retention detaches (or drops) whole months
+instead of running large DELETEs.
+"""
+import logging
+import re
+from datetime import date, datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("questionnaire_responses", "pathway_recommendations")
+
+_PARTITION_NAME = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def retention_cutoff(today: Optional[date] = None) -> Optional[datetime]:
+    """
+    Oldest created_at still retained, or None if nothing is ever removed.
+
+    Adding `created_at >= cutoff` to queries lets Postgres prune the expired
+    partitions at plan time.
+    """
+    if not settings.DB_PARTITIONING_ENABLED or settings.PARTITION_RETENTION_MONTHS <= 0:
+        return None
+    oldest = add_months(month_start(today or date.today()), -settings.PARTITION_RETENTION_MONTHS)
+    return datetime(oldest.year, oldest.month, 1)
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> List[date]:
+    """Months that currently have an attached partition of a table."""
+    result = await conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table},
+    )
+    months = []
+    for (name,) in result:
+        match = _PARTITION_NAME.search(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+async def create_partition(conn: AsyncConnection, table: str, month: date):
+    """Create the partition of `table` for one month (no-op if it exists)."""
+    await conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+
+
+async def ensure_partitions(
+    conn: AsyncConnection,
+    months_ahead: Optional[int] = None,
+    today: Optional[date] = None,
+    dry_run: bool = False,
+    months: Optional[Iterable[date]] = None,
+) -> List[str]:
+    """
+    Create partitions from the current month through `months_ahead` months ahead.
+
+    Args:
+        conn: Connection (in a transaction)
+        months_ahead: Defaults to PARTITION_PREMAKE_MONTHS
+        today: Reference date (defaults to today)
+        dry_run: Only report what would be created
+        months: Explicit months to cover instead (e.g. for importing old data)
+
+    Returns:
+        Names of the partitions created (or that would be, with dry_run)
+    """
+    if months is None:
+        if months_ahead is None:
+            months_ahead = settings.PARTITION_PREMAKE_MONTHS
+        current = month_start(today or date.today())
+        months = [add_months(current, offset) for offset in range(months_ahead + 1)]
+    else:
+        months = sorted({month_start(month) for month in months})
+
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = set(await list_partitions(conn, table))
+        for month in months:
+            if month in existing:
+                continue
+            if not dry_run:
+                await create_partition(conn, table, month)
+            created.append(partition_name(table, month))
+    return created
+
+
+async def apply_retention(
+    conn: AsyncConnection,
+    retention_months: Optional[int] = None,
+    drop: Optional[bool] = None,
+    today: Optional[date] = None,
+    dry_run: bool = False,
+) -> List[str]:
+    """
+    Detach (or drop) partitions that lie entirely before the retention window.
+
+    A detached partition is an ordinary table again: out of every query on
+    the parent, but still there to archive or inspect before dropping.
+
+    Returns:
+        Names of the partitions removed (or that would be, with dry_run)
+    """
+    if retention_months is None:
+        retention_months = settings.PARTITION_RETENTION_MONTHS
+    if drop is None:
+        drop = settings.PARTITION_RETENTION_DROP
+    if retention_months <= 0:
+        return []
+
+    oldest_kept = add_months(month_start(today or date.today()), -retention_months)
+    removed = []
+    for table in PARTITIONED_TABLES:
+        for month in await list_partitions(conn, table):
+            if month >= oldest_kept:
+                continue
+            name = partition_name(table, month)
+            if not dry_run:
+                await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                if drop:
+                    await conn.execute(text(f"DROP TABLE {name}"))
+            removed.append(name)
+    return removed
@@ -0,0 +1,137 @@
+"""
+Connection pool sizing and instrumentation.
+
+Each engine's pool is sized from a total connection budget for the whole
+deployment, split evenly across the worker processes, so adding workers
+never pushes the app past what Postgres (or PgBouncer) allows.
+"""
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack
+from typing import Dict, NamedTuple
+
+from sqlalchemy import exc, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import Counter, Gauge, Histogram, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a connection from the pool (waiting, connecting and pre-ping), by pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after pool_timeout because the pool was exhausted, by pool",
+    ["pool"],
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Database pool connections by pool (primary, replica) and state (checked_out, idle, overflow)",
+    ["pool", "state"],
+)
+DB_POOL_UTILIZATION = Gauge(
+    "db_pool_utilization",
+    "Checked-out connections as a fraction of the pool's maximum (pool_size + max_overflow), by pool (busiest worker)",
+    ["pool"],
+    multiprocess_mode="max",
+)
+
+
+class PoolLimits(NamedTuple):
+    pool_size: int
+    max_overflow: int
+
+
+def pool_limits(max_connections: int, workers: int) -> PoolLimits:
+    """
+    Per-process pool limits for a total connection budget.
+
+    Each worker gets an equal share (at least 2), half kept open and half
+    available as short-lived overflow for bursts.
+
+    Args:
+        max_connections: Connections the whole deployment may open
+        workers: Worker processes sharing the budget
+
+    Returns:
+        PoolLimits(pool_size, max_overflow) for one process
+    """
+    per_worker = max(2, max_connections // max(1, workers))
+    pool_size = (per_worker + 1) // 2
+    return PoolLimits(pool_size, per_worker - pool_size)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that records checkout wait times and timeouts.
+
+    The metric label is the pool's logging name (`pool_logging_name` on the
+    engine), which SQLAlchemy carries over when it recreates the pool.
+    """
+
+    def connect(self):
+        name = self._orig_logging_name or "default"
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.inc(pool=name)
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start, pool=name)
+
+
+_engines = {}
+
+
+def register_engine(name: str, engine):
+    """Export pool gauges for an async engine on /metrics."""
+    _engines[name] = engine
+
+
+async def warm_pools(connections: int) -> Dict[str, int]:
+    """
+    Open connections in every registered pool before traffic arrives.
+
+    Checks out up to `connections` at once (at most pool_size, as overflow
+    connections are closed on return) and runs a query on each, so they stay
+    in the pool connected and set up.
+
+    Returns:
+        Connections opened per pool
+    """
+    opened = {}
+    for name, engine in _engines.items():
+        count = min(connections, engine.sync_engine.pool.size())
+        async with AsyncExitStack() as stack:
+            # Wait for every checkout, so none is still pending when the stack closes
+            results = await asyncio.gather(
+                *(stack.enter_async_context(engine.connect()) for _ in range(count)),
+                return_exceptions=True,
+            )
+            conns = [r for r in results if not isinstance(r, BaseException)]
+            await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+        if len(conns) < count:
+            error = next(r for r in results if isinstance(r, BaseException))
+            raise RuntimeError(f"{name} pool: opened {len(conns)} of {count} connections: {error}")
+        opened[name] = count
+    return opened
+
+
+async def _collect_pool_metrics():
+    for name, engine in _engines.items():
+        pool = engine.sync_engine.pool
+        checked_out = pool.checkedout()
+        DB_POOL_CONNECTIONS.set(checked_out, pool=name, state="checked_out")
+        DB_POOL_CONNECTIONS.set(pool.checkedin(), pool=name, state="idle")
+        DB_POOL_CONNECTIONS.set(max(pool.overflow(), 0), pool=name, state="overflow")
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        DB_POOL_UTILIZATION.set(checked_out / capacity if capacity else 0.0, pool=name)
+
+
+REGISTRY.register_collector(_collect_pool_metrics)
@@ -0,0 +1,232 @@
+"""
+Routing of read-only queries between the primary and the read replica.
+
+Writes always use the primary (`get_db`). Read-only routes and services use
+`get_read_db` / `ReadRouter.session()`, which hand out replica sessions
+while the replica is configured, reachable and within REPLICA_MAX_LAG_SECONDS
+of the primary, and primary sessions otherwise. Reads of a user who wrote
+within the last READ_YOUR_WRITES_SECONDS go to the primary, so nobody sees
+their own new recommendation missing.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from cachetools import TTLCache
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.cache import RedisCache
+from app.core.metrics import Counter, Gauge
+from app.db.database import AsyncSessionLocal, ReplicaSessionLocal, replica_engine
+
+logger = logging.getLogger(__name__)
+
+DB_READ_ROUTES = Counter(
+    "db_read_routes_total",
+    "Read-only sessions by pool used and reason (replica, no_replica, replica_unavailable, read_your_writes)",
+    ["pool", "reason"],
+)
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag of the read replica at the last check (-1 if unreachable)",
+    multiprocess_mode="max",
+)
+
+# Zero when the standby has replayed everything it received (an idle primary
+# must not look like lag); also zero when the "replica" is not a standby at all
+REPLICA_LAG_SQL = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+
+class ReadRouter:
+    """
+    Picks the session factory for read-only work.
+
+    Replica lag is measured by a background task every
+    REPLICA_LAG_CHECK_INTERVAL seconds (started from the app lifespan);
+    requests only read its last verdict, so none waits on a lag query or a
+    dead replica. Until the first successful check, whenever the replica is
+    unreachable or too far behind, and if the verdict is older than three
+    intervals, reads go to the primary.
+
+    Recent writers are tracked in Redis (shared by all workers) with an
+    in-process copy; without Redis the escape hatch only covers reads served
+    by the worker that handled the write.
+    """
+
+    WRITE_PREFIX = "recent_write:"
+
+    _healthy: bool = False
+    _lag: Optional[float] = None
+    _checked_at: float = 0.0
+    _task: Optional[asyncio.Task] = None
+    _recent_writes: TTLCache = TTLCache(maxsize=10000, ttl=settings.READ_YOUR_WRITES_SECONDS)
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return ReplicaSessionLocal is not None
+
+    @classmethod
+    async def check_lag(cls) -> Optional[float]:
+        """
+        Measure replica lag now and update the routing verdict.
+
+        Returns:
+            Lag in seconds, or None if the replica could not be reached
+        """
+        async def measure():
+            async with replica_engine.connect() as conn:
+                return await conn.scalar(REPLICA_LAG_SQL)
+
+        try:
+            # The timeout covers getting a connection too: a dead replica can
+            # otherwise hold the check for the whole connect/pool timeout
+            lag = float(await asyncio.wait_for(measure(), timeout=settings.REPLICA_LAG_CHECK_TIMEOUT) or 0)
+        except Exception as e:
+            if cls._lag is not None or not cls._checked_at:
+                reason = "timed out" if isinstance(e, asyncio.TimeoutError) else e
+                logger.warning(f"Read replica unreachable, reading from primary: {reason}")
+            lag = None
+
+        healthy = lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+        if lag is not None and healthy != cls._healthy:
+            if healthy:
+                logger.info(f"Read replica in use (lag {lag:.1f}s)")
+            else:
+                logger.warning(f"Read replica {lag:.1f}s behind, reading from primary")
+        cls._healthy, cls._lag, cls._checked_at = healthy, lag, time.monotonic()
+        DB_REPLICA_LAG.set(lag if lag is not None else -1)
+        return lag
+
+    @classmethod
+    async def _run(cls):
+        while True:
+            try:
+                await cls.check_lag()
+            except Exception as e:
+                logger.error(f"Replica lag check failed: {e}")
+            await asyncio.sleep(settings.REPLICA_LAG_CHECK_INTERVAL)
+
+    @classmethod
+    def start(cls):
+        """Start checking replica lag in the background (call from the app lifespan)."""
+        if cls.enabled() and cls._task is None:
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            await asyncio.gather(cls._task, return_exceptions=True)
+            cls._task = None
+
+    @classmethod
+    def replica_usable(cls) -> bool:
+        """Whether reads may go to the replica, from the last background check."""
+        if not cls.enabled() or not cls._healthy:
+            return False
+        return time.monotonic() - cls._checked_at < 3 * settings.REPLICA_LAG_CHECK_INTERVAL
+
+    @classmethod
+    async def mark_write(cls, *user_ids: str):
+        """
+        Send reads of these users to the primary for READ_YOUR_WRITES_SECONDS.
+
+        Call before committing the write, with every identifier the user's
+        data may be read by (external id and internal UUID).
+        """
+        user_ids = [user_id for user_id in user_ids if user_id]
+        if not cls.enabled() or not user_ids:
+            return
+        for user_id in user_ids:
+            cls._recent_writes[user_id] = True
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                async with client.pipeline(transaction=False) as pipe:
+                    for user_id in user_ids:
+                        pipe.setex(f"{cls.WRITE_PREFIX}{user_id}", settings.READ_YOUR_WRITES_SECONDS, 1)
+                    await pipe.execute()
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+
+    @classmethod
+    async def recently_wrote(cls, user_id: str) -> bool:
+        """Whether the user wrote within READ_YOUR_WRITES_SECONDS."""
+        if user_id in cls._recent_writes:
+            return True
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                return bool(await client.exists(f"{cls.WRITE_PREFIX}{user_id}"))
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+        return False
+
+    @classmethod
+    async def sessionmaker(cls, user_id: Optional[str] = None):
+        """
+        Session factory for a read-only unit of work.
+
+        Args:
+            user_id: The user whose data is read, if any (read-your-writes)
+        """
+        if not cls.enabled():
+            reason = "no_replica"
+        elif not cls.replica_usable():
+            reason = "replica_unavailable"
+        elif user_id and await cls.recently_wrote(user_id):
+            reason = "read_your_writes"
+        else:
+            DB_READ_ROUTES.inc(pool="replica", reason="replica")
+            return ReplicaSessionLocal
+        DB_READ_ROUTES.inc(pool="primary", reason=reason)
+        return AsyncSessionLocal
+
+    @classmethod
+    @asynccontextmanager
+    async def session(cls, user_id: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+        """Read-only session routed as in sessionmaker()."""
+        factory = await cls.sessionmaker(user_id)
+        async with factory() as session:
+            yield session
+
+    @classmethod
+    async def health_check(cls) -> dict:
+        """Replica status for the detailed health check."""
+        lag = await cls.check_lag()
+        if lag is None:
+            return {"status": "unhealthy", "connected": False, "reads_from": "primary"}
+        return {
+            "status": "healthy" if cls._healthy else "degraded",
+            "connected": True,
+            "lag_seconds": round(lag, 3),
+            "reads_from": "replica" if cls.replica_usable() else "primary",
+        }
+
+
+async def get_read_db() -> AsyncSession:
+    """Async dependency to get a session for read-only queries (replica when usable)."""
+    async with ReadRouter.session() as session:
+        yield session
+
+
+async def get_user_read_db(user_id: str) -> AsyncSession:
+    """
+    Async dependency for read-only queries of one user's data.
+
+    Takes the `user_id` path parameter; the primary serves the reads for a
+    while after that user's own writes.
+    """
+    async with ReadRouter.session(user_id) as session:
+        yield session
+
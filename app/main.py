@@ -2,18 +2,31 @@ import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from slowapi.errors import RateLimitExceeded
 
 from app.config import settings
-from app.db import async_engine, init_db
+from app.db import ReadRouter, async_engine, verify_schema
+from app.db.pool import pool_limits
 from app.core.cache import RedisCache
-from app.core.rate_limit import limiter, rate_limit_exceeded_handler
-from app.services import RecommendationService
+from app.core.health import HealthProber
+from app.core.load_shedding import LoadShedder, LoadSheddingMiddleware
+from app.core.metrics import REGISTRY
+from app.core.quota import QuotaExceeded, quota_exceeded_handler
+from app.core.rate_limit import RateLimitExceeded, RateLimitHeadersMiddleware, rate_limit_exceeded_handler
+from app.core.tenants import TenantRegistry
+from app.core.tracing import RequestTimingMiddleware, Tracing
+from app.core.warmup import Warmup
+from app.core.webhooks import WebhookClient
+from app.services import RecommendationService, RecommendationJobManager
 from app.api.routes import (
     health_router,
     questions_router,
     pathways_router,
     recommendations_router,
+    sessions_router,
+    metrics_router,
+    analytics_router,
+    export_router,
+    admin_router,
 )
 
 # Configure logging
@@ -32,25 +45,67 @@ async def lifespan(app: FastAPI):
 
     if not settings.OPENROUTER_API_KEY:
         logger.warning("OPENROUTER_API_KEY not set!")
-    if not settings.API_KEY:
-        logger.warning("API_KEY not set! API will reject all requests.")
     if not settings.DATABASE_URL:
         logger.error("DATABASE_URL not set!")
 
-    # Initialize database tables
-    logger.info("Initializing database...")
-    await init_db()
-    logger.info("Database initialized successfully!")
+    # Schema changes are applied once per deploy by scripts/migrate.py (run.py
+    # runs it before starting workers); each worker only checks the revision
+    revision = await verify_schema(async_engine)
+    limits = pool_limits(settings.DB_MAX_CONNECTIONS, settings.WEB_CONCURRENCY)
+    logger.info(
+        f"Database schema at revision {revision}; pool_size={limits.pool_size}, "
+        f"max_overflow={limits.max_overflow} ({settings.DB_MAX_CONNECTIONS} connections "
+        f"across {settings.WEB_CONCURRENCY} workers{', via PgBouncer' if settings.DB_PGBOUNCER else ''})"
+    )
+
+    # External tracer for request timing spans (TRACE_HOOK), if any
+    trace_hook = Tracing.load_hook()
+    if trace_hook:
+        logger.info(f"Timing spans are also sent to {trace_hook}")
+
+    # Load the tenant API keys (reloaded every API_KEYS_REFRESH_SECONDS)
+    key_count = await TenantRegistry.load()
+    if key_count:
+        logger.info(f"Loaded {key_count} API keys")
+    else:
+        logger.warning("No API keys configured (API_KEY, api_keys table or API_KEYS_FILE)! API will reject all requests.")
 
     # Initialize Redis connection
     logger.info("Initializing Redis cache...")
     await RedisCache.get_client()
     logger.info("Cache initialized!")
 
+    # Start background workers for asynchronous recommendation jobs
+    await RecommendationJobManager.start()
+
+    # Measure read replica lag for routing read-only queries (if configured)
+    ReadRouter.start()
+
+    # Measure event loop lag for load shedding
+    LoadShedder.start()
+
+    # Check dependencies in the background for /health/detailed and /ready
+    HealthProber.start()
+
+    # Open connections and load data before /ready lets traffic in
+    Warmup.start()
+
+    # Publish this worker's metrics for /metrics on the other workers
+    if settings.METRICS_MULTIPROC_DIR:
+        REGISTRY.start_snapshots(settings.METRICS_MULTIPROC_DIR, settings.METRICS_SNAPSHOT_INTERVAL)
+
     yield
 
     # Shutdown - cleanup resources
     logger.info("Shutting down...")
+    await Warmup.stop()
+    await LoadShedder.stop()
+    await ReadRouter.stop()
+    await HealthProber.stop()
+    if settings.METRICS_MULTIPROC_DIR:
+        await REGISTRY.stop_snapshots(settings.METRICS_MULTIPROC_DIR)
+    await RecommendationJobManager.stop()
+    await WebhookClient.close()
     await RecommendationService.close_http_client()
     await RedisCache.close()
     if async_engine:
@@ -65,11 +120,17 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Add rate limiter to app state
-app.state.limiter = limiter
-
-# Add rate limit exceeded exception handler
+# Add rate limit exceeded exception handler and X-RateLimit-* response headers
 app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+app.add_middleware(RateLimitHeadersMiddleware)
+app.add_exception_handler(QuotaExceeded, quota_exceeded_handler)
+
+# Timing spans for sampled requests: Server-Timing header and a JSON log line
+app.add_middleware(RequestTimingMiddleware)
+
+# Shed load with 503 before the request reaches any route (only CORS runs
+# before it, so browsers can read the rejection)
+app.add_middleware(LoadSheddingMiddleware)
 
 # CORS middleware - Configure for production
 # TODO: Replace "*" with your actual frontend domains in production
@@ -78,7 +139,7 @@ app.add_middleware(
     allow_origins=["*"],  # Change to specific origins in production: ["https://yourdomain.com"]
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS"],
-    allow_headers=["X-API-Key", "Content-Type", "Authorization"],
+    allow_headers=["X-API-Key", "Content-Type", "Authorization", "Idempotency-Key"],
 )
 
 # Include routers
@@ -86,6 +147,11 @@ app.include_router(health_router)
 app.include_router(questions_router)
 app.include_router(pathways_router)
 app.include_router(recommendations_router)
+app.include_router(sessions_router)
+app.include_router(metrics_router)
+app.include_router(analytics_router)
+app.include_router(export_router)
+app.include_router(admin_router)
 
 
 @app.get("/")
@@ -100,13 +166,27 @@ async def root():
             "public": {
                 "GET /": "This info",
                 "GET /health": "Simple health check",
-                "GET /health/detailed": "Detailed health check with dependency status"
+                "GET /health/live": "Liveness probe",
+                "GET /ready": "Readiness probe (503 until warmed up and dependencies are reachable)",
+                "GET /health/ready": "Same as /ready",
+                "GET /health/detailed": "Dependency status from the last background check",
+                "GET /metrics": "Prometheus metrics"
             },
             "protected": {
                 "GET /questions/{entry_type}": "Get questionnaire questions",
                 "GET /pathways": "Get all available pathways",
                 "POST /recommend": "Get AI pathway recommendation",
-                "GET /users/{user_id}/history": "Get user's recommendation history"
+                "POST /recommend/jobs": "Queue an AI pathway recommendation (returns 202 with job id)",
+                "GET /recommend/jobs/{job_id}": "Get status/result of a recommendation job",
+                "POST /sessions": "Start an incremental questionnaire session",
+                "POST /sessions/{session_id}/answers": "Add answers as the user gives them",
+                "POST /sessions/{session_id}/submit": "Finish the session and get the recommendation",
+                "GET /users/{user_id}/history": "Get user's recommendation history",
+                "GET /analytics/pathways": "Pathway/profile counts and confidence over time",
+                "GET /export/recommendations": "Stream recommendations as NDJSON or CSV"
+            },
+            "admin": {
+                "POST /admin/profile": "Sample a worker's CPU profile (ADMIN_API_KEY)"
             }
         },
         "docs": "/docs"
@@ -2,6 +2,7 @@
 
 from app.schemas.models import (
     EntryType,
+    JobStatus,
     SpiritualStage,
     EmotionalState,
     PrimaryNeed,
@@ -11,11 +12,18 @@ from app.schemas.models import (
     PathwayRecommendation,
     RecommendationRequest,
     RecommendationResponse,
+    RecommendationJobRequest,
+    RecommendationJobResponse,
+    QuestionnaireSessionCreate,
+    QuestionnaireSessionAnswers,
+    QuestionnaireSessionResponse,
     UserHistoryResponse,
+    PathwayAnalyticsResponse,
 )
 
 __all__ = [
     "EntryType",
+    "JobStatus",
     "SpiritualStage",
     "EmotionalState",
     "PrimaryNeed",
@@ -25,5 +33,11 @@ __all__ = [
     "PathwayRecommendation",
     "RecommendationRequest",
     "RecommendationResponse",
+    "RecommendationJobRequest",
+    "RecommendationJobResponse",
+    "QuestionnaireSessionCreate",
+    "QuestionnaireSessionAnswers",
+    "QuestionnaireSessionResponse",
     "UserHistoryResponse",
+    "PathwayAnalyticsResponse",
 ]
@@ -1,6 +1,6 @@
 import re
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, Field, HttpUrl, field_validator, model_validator
 from enum import Enum
 
 
@@ -40,6 +40,14 @@ class PrimaryNeed(str, Enum):
     GUIDANCE = "guidance"
 
 
+class JobStatus(str, Enum):
+    """Lifecycle state of an asynchronous recommendation job."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class QuestionnaireAnswer(BaseModel):
     """Single questionnaire answer."""
     question_number: int
@@ -158,9 +166,77 @@ class RecommendationResponse(BaseModel):
     error: Optional[str] = None
 
 
+class RecommendationJobRequest(RecommendationRequest):
+    """Request model for an asynchronous recommendation job."""
+    webhook_url: Optional[HttpUrl] = Field(
+        None,
+        description="Optional URL that receives a POST with the job result once it finishes"
+    )
+
+
+class RecommendationJobResponse(BaseModel):
+    """Status (and result, once finished) of an asynchronous recommendation job."""
+    success: bool
+    job_id: str
+    status: JobStatus
+    status_url: Optional[str] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    completed_at: Optional[str] = None
+    data: Optional[PathwayRecommendation] = None
+    user_id: Optional[str] = None
+    recommendation_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class QuestionnaireSessionCreate(BaseModel):
+    """Request to start an incremental questionnaire session."""
+    user_id: Optional[str] = Field(None, max_length=255)
+    entry_type: EntryType
+
+    @field_validator('user_id')
+    @classmethod
+    def validate_user_id(cls, v: Optional[str]) -> Optional[str]:
+        """Same rules as RecommendationRequest.user_id."""
+        return RecommendationRequest.validate_user_id(v)
+
+
+class QuestionnaireSessionAnswers(BaseModel):
+    """Answers given so far (or changed) in a questionnaire session."""
+    answers: Dict[str, str]
+
+    @field_validator('answers')
+    @classmethod
+    def validate_answers(cls, v: Dict[str, str]) -> Dict[str, str]:
+        """Same rules as RecommendationRequest.answers."""
+        return RecommendationRequest.validate_answers(v)
+
+
+class QuestionnaireSessionResponse(BaseModel):
+    """State of a questionnaire session."""
+    success: bool
+    session_id: str
+    entry_type: EntryType
+    answered: int
+    total_questions: int
+    speculating: int = 0
+
+
 class UserHistoryResponse(BaseModel):
     """Response for user's recommendation history."""
     success: bool
     user_id: str
     recommendations: List[Dict[str, Any]] = []
+    next_cursor: Optional[str] = None
+    error: Optional[str] = None
+
+
+class PathwayAnalyticsResponse(BaseModel):
+    """Recommendation counts over a time window, from the hourly rollups."""
+    success: bool
+    start: str
+    end: str
+    granularity: str
+    group_by: List[str] = []
+    rows: List[Dict[str, Any]] = []
     error: Optional[str] = None
@@ -1,5 +1,7 @@
 """Business logic services."""
 
 from app.services.recommendation import RecommendationService
+from app.services.jobs import RecommendationJobManager
+from app.services.speculation import QuestionnaireSessionManager
 
-__all__ = ["RecommendationService"]
+__all__ = ["RecommendationService", "RecommendationJobManager", "QuestionnaireSessionManager"]
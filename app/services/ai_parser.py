@@ -0,0 +1,365 @@
+import json
+from typing import Any, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from app.schemas import PathwayRecommendation
+
+
+class AIResponseParseError(Exception):
+    """
+    Raised when no usable recommendation can be recovered from AI output.
+
+    Deliberately not a ValueError: routes map ValueError to 400, but this is
+    an upstream failure, not a client error.
+    """
+
+
+# Fields a complete recommendation must contain (dotted for nested fields)
+REQUIRED_FIELDS = (
+    "recommended_pathway",
+    "confidence",
+    "detected_profile.spiritual_stage",
+    "detected_profile.primary_need",
+    "detected_profile.emotional_state",
+    "reasoning",
+    "next_step_message",
+)
+
+_WHITESPACE = " \t\r\n"
+_VALID_ESCAPES = '"\\/bfnrtu'
+_LITERALS = {
+    "true": "true", "false": "false", "null": "null",
+    "True": "true", "False": "false", "None": "null",
+}
+
+
+def _strip_fences(content: str) -> str:
+    """Remove markdown code fences the model sometimes wraps JSON in."""
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content[7:]
+    elif content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+    return content.strip()
+
+
+def _next_significant(text: str, pos: int) -> int:
+    """Index of the next non-whitespace character at or after pos."""
+    length = len(text)
+    while pos < length and text[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _closes_string(text: str, pos: int, is_key: bool, in_array: bool) -> bool:
+    """
+    Decide whether the quote at text[pos] terminates the current string.
+
+    Models regularly emit unescaped quotes inside prose fields. A quote only
+    closes the string when what follows is structurally valid JSON.
+    """
+    nxt = _next_significant(text, pos + 1)
+    if nxt >= len(text):
+        return True
+    ch = text[nxt]
+    if is_key:
+        return ch == ":"
+    if ch in "}]":
+        return True
+    if ch != ",":
+        return False
+    after = _next_significant(text, nxt + 1)
+    if after >= len(text):
+        return True
+    if in_array:
+        return text[after] in '"{[-0123456789tfnTFN'
+    if text[after] in '"}':
+        return True
+    # Unquoted key following the comma, e.g. `, reasoning: "..."`
+    end = after
+    while end < len(text) and (text[end].isalnum() or text[end] == "_"):
+        end += 1
+    nxt = _next_significant(text, end)
+    return end > after and nxt < len(text) and text[nxt] == ":"
+
+
+def repair_json(content: str) -> Tuple[str, bool]:
+    """
+    Rebuild a syntactically valid JSON object from (possibly broken) AI output.
+
+    Handles code fences, leading/trailing prose, trailing commas, unescaped
+    quotes and raw control characters inside strings, Python literals and
+    truncation (e.g. at max_tokens). On truncation the output is rolled back
+    to the last fully written member, so a half-written field is dropped
+    rather than returned cut off mid-sentence.
+
+    Args:
+        content: Raw message content from the model
+
+    Returns:
+        Tuple of (repaired JSON text, whether the input was truncated)
+
+    Raises:
+        AIResponseParseError: If the content contains no JSON object at all
+    """
+    text = _strip_fences(content)
+    start = text.find("{")
+    if start == -1:
+        raise AIResponseParseError("No JSON object found in AI response")
+
+    out: List[str] = []
+    # Each frame is [bracket, state]; state is one of key/colon/value/comma
+    stack: List[List[str]] = []
+    safe_len = 0
+    safe_stack: List[str] = []
+    truncated = False
+    i = start
+    length = len(text)
+
+    def mark_safe() -> None:
+        nonlocal safe_len, safe_stack
+        safe_len = len(out)
+        safe_stack = [frame[0] for frame in stack]
+
+    def value_done() -> None:
+        if stack:
+            stack[-1][1] = "comma"
+
+    while i < length:
+        ch = text[i]
+
+        if ch in _WHITESPACE:
+            i += 1
+            continue
+
+        state = stack[-1][1] if stack else "value"
+        in_array = bool(stack) and stack[-1][0] == "["
+
+        if state == "comma" and not in_array and ch == '"':
+            # Missing comma between members
+            out.append(",")
+            stack[-1][1] = state = "key"
+
+        if ch == '"' or (state == "key" and (ch.isalpha() or ch == "_")):
+            is_key = state == "key"
+            if ch != '"':
+                # Unquoted key: read an identifier and quote it
+                j = i
+                while j < length and (text[j].isalnum() or text[j] == "_"):
+                    j += 1
+                out.append(json.dumps(text[i:j]))
+                i = j
+                stack[-1][1] = "colon"
+                continue
+
+            buf = ['"']
+            j = i + 1
+            closed = False
+            while j < length:
+                c = text[j]
+                if c == "\\":
+                    if j + 1 < length and text[j + 1] in _VALID_ESCAPES:
+                        buf.append(text[j:j + 2])
+                        j += 2
+                    elif j + 1 < length:
+                        buf.append("\\\\")
+                        j += 1
+                    else:
+                        j += 1
+                    continue
+                if c == '"':
+                    if _closes_string(text, j, is_key, in_array):
+                        closed = True
+                        j += 1
+                        break
+                    buf.append('\\"')
+                elif c == "\n":
+                    buf.append("\\n")
+                elif c == "\r":
+                    buf.append("\\r")
+                elif c == "\t":
+                    buf.append("\\t")
+                elif ord(c) < 0x20:
+                    buf.append(f"\\u{ord(c):04x}")
+                else:
+                    buf.append(c)
+                j += 1
+
+            if not closed:
+                truncated = True
+                break
+
+            buf.append('"')
+            out.append("".join(buf))
+            i = j
+            if is_key:
+                stack[-1][1] = "colon"
+            else:
+                value_done()
+                mark_safe()
+            continue
+
+        if ch == ":":
+            if stack and state == "colon":
+                out.append(":")
+                stack[-1][1] = "value"
+            i += 1
+            continue
+
+        if ch == ",":
+            if stack and state == "comma":
+                out.append(",")
+                stack[-1][1] = "value" if in_array else "key"
+            i += 1
+            continue
+
+        if ch in "{[":
+            out.append(ch)
+            stack.append([ch, "key" if ch == "{" else "value"])
+            mark_safe()
+            i += 1
+            continue
+
+        if ch in "}]":
+            if stack:
+                if state in ("colon", "value") and stack[-1][0] == "{":
+                    # Key without a value - drop the dangling member
+                    if out[-1] == ":":
+                        out.pop()
+                    if out[-1] not in ("{", ","):
+                        out.pop()
+                if out[-1] == ",":
+                    out.pop()
+                out.append("}" if stack[-1][0] == "{" else "]")
+                stack.pop()
+                value_done()
+                mark_safe()
+            i += 1
+            if not stack:
+                break
+            continue
+
+        # Bare token: number or literal
+        j = i
+        while j < length and text[j] not in ",}]" and text[j] not in _WHITESPACE:
+            j += 1
+        token = text[i:j]
+        if j >= length:
+            # Token runs into end of input, so it may be cut short
+            truncated = True
+            break
+        if state == "value":
+            out.append(_LITERALS.get(token, token))
+            value_done()
+            mark_safe()
+        i = j
+
+    if stack:
+        truncated = True
+        del out[safe_len:]
+        while out and out[-1] in (",", ":"):
+            if out[-1] == ":":
+                out.pop()
+            out.pop()
+        for bracket in reversed(safe_stack):
+            out.append("}" if bracket == "{" else "]")
+
+    return "".join(out), truncated
+
+
+def _normalize(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Fix up common value-level defects before validation."""
+    confidence = data.get("confidence")
+    if isinstance(confidence, str):
+        try:
+            confidence = float(confidence.strip().rstrip("%"))
+        except ValueError:
+            confidence = None
+        if confidence is None:
+            data.pop("confidence")
+        else:
+            data["confidence"] = confidence
+    if isinstance(confidence, (int, float)) and 1.0 < confidence <= 100.0:
+        # Model answered as a percentage
+        data["confidence"] = confidence / 100.0
+    return data
+
+
+def find_missing_fields(data: Dict[str, Any]) -> List[str]:
+    """
+    Validate data against PathwayRecommendation.
+
+    Returns:
+        Dotted names of fields that are missing or invalid (empty if valid)
+    """
+    try:
+        PathwayRecommendation.model_validate(data)
+        return []
+    except ValidationError as e:
+        missing = []
+        for error in e.errors():
+            loc = ".".join(str(part) for part in error["loc"])
+            if loc == "detected_profile":
+                missing.extend(f for f in REQUIRED_FIELDS if f.startswith("detected_profile."))
+            elif loc:
+                missing.append(loc)
+        return [f for f in REQUIRED_FIELDS if f in missing] or list(REQUIRED_FIELDS)
+
+
+def drop_fields(data: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Remove (possibly nested) invalid fields so a follow-up can replace them."""
+    for field in fields:
+        parent, _, name = field.rpartition(".")
+        if not parent:
+            data.pop(name, None)
+        elif isinstance(data.get(parent), dict):
+            data[parent].pop(name, None)
+        else:
+            data.pop(parent, None)
+    return data
+
+
+def merge_fields(base: Dict[str, Any], extra: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge follow-up fields into a partial response (nested dicts merged)."""
+    for key, value in extra.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            base[key] = merge_fields(base[key], value)
+        elif key not in base or base[key] in (None, ""):
+            base[key] = value
+    return base
+
+
+def parse_ai_response(content: str) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Tolerantly parse AI output into a recommendation dict.
+
+    Args:
+        content: Raw message content from the model
+
+    Returns:
+        Tuple of (parsed data with invalid fields removed, missing field names)
+
+    Raises:
+        AIResponseParseError: If nothing resembling a JSON object was returned
+    """
+    content = _strip_fences(content)
+
+    # Fast path: well-formed output
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        repaired, _ = repair_json(content)
+        try:
+            data = json.loads(repaired)
+        except json.JSONDecodeError as e:
+            raise AIResponseParseError(f"Failed to parse AI response as JSON: {e}")
+
+    if not isinstance(data, dict):
+        raise AIResponseParseError("AI response is not a JSON object")
+
+    data = _normalize(data)
+    missing = find_missing_fields(data)
+    return drop_fields(data, missing), missing
@@ -0,0 +1,144 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.models import PathwayRecommendationRecord, PathwayRollup
+from app.schemas import EmotionalState, PrimaryNeed, SpiritualStage
+from app.services.pathways import profile_value
+
+logger = logging.getLogger(__name__)
+
+# group_by name -> (rollup column, decoder for the response)
+DIMENSIONS = {
+    "pathway": (PathwayRollup.pathway_id, None),
+    "entry_type": (PathwayRollup.entry_type, None),
+    "spiritual_stage": (PathwayRollup.spiritual_stage_code, SpiritualStage),
+    "primary_need": (PathwayRollup.primary_need_code, PrimaryNeed),
+    "emotional_state": (PathwayRollup.emotional_state_code, EmotionalState),
+}
+
+GRANULARITIES = ("hour", "day", "total")
+
+
+class AnalyticsService:
+    """Pathway analytics served from the hourly pathway_rollups table."""
+
+    _pathway_names = {p["id"]: f"{p['name']} ({p['duration']})" for p in settings.PATHWAYS}
+
+    @staticmethod
+    def hour_bucket(timestamp: datetime) -> datetime:
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+
+    @classmethod
+    async def record(cls, db: AsyncSession, record: PathwayRecommendationRecord, entry_type: str):
+        """
+        Count a new recommendation in its hourly rollup row.
+
+        Runs in the caller's transaction (no commit), so the rollup only
+        changes if the recommendation itself is committed.
+        """
+        stmt = pg_insert(PathwayRollup).values(
+            bucket=cls.hour_bucket(record.created_at or datetime.utcnow()),
+            pathway_id=record.pathway_id or 0,
+            entry_type=entry_type,
+            spiritual_stage_code=record.spiritual_stage_code or 0,
+            primary_need_code=record.primary_need_code or 0,
+            emotional_state_code=record.emotional_state_code or 0,
+            recommendation_count=1,
+            confidence_sum=record.confidence,
+        )
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=list(PathwayRollup.__table__.primary_key.columns),
+            set_={
+                "recommendation_count": PathwayRollup.recommendation_count + 1,
+                "confidence_sum": PathwayRollup.confidence_sum + stmt.excluded.confidence_sum,
+            },
+        ))
+
+    @classmethod
+    async def query(
+        cls,
+        db: AsyncSession,
+        start: datetime,
+        end: datetime,
+        granularity: str = "day",
+        group_by: Optional[List[str]] = None,
+        pathway_id: Optional[int] = None,
+        entry_type: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Recommendation counts and average confidence over a time window.
+
+        Args:
+            db: Database session
+            start: Window start (inclusive, rounded down to the hour)
+            end: Window end (exclusive)
+            granularity: "hour", "day" or "total" (one row per group)
+            group_by: Dimensions to break down by (keys of DIMENSIONS)
+            pathway_id: Only count this pathway
+            entry_type: Only count this entry type
+
+        Returns:
+            List of rows with bucket, the grouped dimensions, count and avg_confidence
+
+        Raises:
+            ValueError: If the window, granularity or a dimension is invalid
+        """
+        group_by = group_by or []
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        unknown = [name for name in group_by if name not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown group_by: {', '.join(unknown)}. Use {', '.join(DIMENSIONS)}")
+        if end <= start:
+            raise ValueError("end must be after start")
+        if (end - start).days > settings.ANALYTICS_MAX_WINDOW_DAYS:
+            raise ValueError(f"Window is limited to {settings.ANALYTICS_MAX_WINDOW_DAYS} days")
+
+        columns = []
+        if granularity != "total":
+            bucket = PathwayRollup.bucket if granularity == "hour" else func.date_trunc("day", PathwayRollup.bucket)
+            columns.append(bucket.label("bucket"))
+        columns += [DIMENSIONS[name][0].label(name) for name in group_by]
+
+        total = func.sum(PathwayRollup.recommendation_count)
+        stmt = select(
+            *columns,
+            total.label("count"),
+            (func.sum(PathwayRollup.confidence_sum) / total).label("avg_confidence"),
+        ).where(
+            PathwayRollup.bucket >= cls.hour_bucket(start),
+            PathwayRollup.bucket < end,
+        )
+        if pathway_id is not None:
+            stmt = stmt.where(PathwayRollup.pathway_id == pathway_id)
+        if entry_type is not None:
+            stmt = stmt.where(PathwayRollup.entry_type == entry_type)
+        if columns:
+            stmt = stmt.group_by(*columns).order_by(*columns)
+
+        return [cls._format_row(row, group_by) for row in (await db.execute(stmt)).all()]
+
+    @classmethod
+    def _format_row(cls, row, group_by: List[str]) -> Dict[str, Any]:
+        result = {}
+        if "bucket" in row._fields:
+            result["bucket"] = row.bucket.isoformat()
+        for name in group_by:
+            value = getattr(row, name)
+            enum_cls = DIMENSIONS[name][1]
+            if name == "pathway":
+                result["pathway_id"] = value or None
+                result["pathway"] = cls._pathway_names.get(value)
+            elif enum_cls is not None:
+                result[name] = profile_value(enum_cls, value)
+            else:
+                result[name] = value
+        result["count"] = int(row.count or 0)
+        result["avg_confidence"] = round(float(row.avg_confidence), 4) if row.avg_confidence is not None else None
+        return result
@@ -0,0 +1,137 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.core.metrics import Counter
+from app.db.models import PathwayRecommendationRecord, QuestionnaireResponse, User
+from app.db.routing import ReadRouter
+
+logger = logging.getLogger(__name__)
+
+EXPORTED_ROWS = Counter(
+    "recommendation_export_rows_total",
+    "Recommendations streamed by GET /export/recommendations, by format",
+    ["format"],
+)
+
+R = PathwayRecommendationRecord
+Q = QuestionnaireResponse
+
+EXPORT_COLUMNS = [
+    R.id,
+    R.created_at,
+    R.user_id,
+    User.external_user_id,
+    Q.entry_type,
+    R.recommended_pathway,
+    R.pathway_id,
+    R.confidence,
+    R.spiritual_stage,
+    R.primary_need,
+    R.emotional_state,
+    R.reasoning,
+    R.next_step_message,
+    Q.answers,
+]
+FIELDNAMES = [column.key for column in EXPORT_COLUMNS]
+
+FORMATS = ("ndjson", "csv")
+
+
+class ExportService:
+    """
+    Streams recommendations out of the database with a server-side cursor.
+
+    Rows are fetched EXPORT_BATCH_SIZE at a time and encoded batch by batch,
+    so memory stays flat however many rows match.
+    """
+
+    @staticmethod
+    def build_query(
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        pathway_id: Optional[int] = None,
+        entry_type: Optional[str] = None,
+    ):
+        """Projected export query, oldest first."""
+        stmt = (
+            select(*EXPORT_COLUMNS)
+            .join(User, User.id == R.user_id)
+            .join(Q, Q.id == R.questionnaire_response_id)
+        )
+        if start:
+            # The questionnaire is stored just before its recommendation; the
+            # extra bound lets Postgres prune questionnaire partitions too
+            stmt = stmt.where(R.created_at >= start, Q.created_at >= start - timedelta(days=1))
+        if end:
+            stmt = stmt.where(R.created_at < end, Q.created_at < end)
+        if pathway_id is not None:
+            stmt = stmt.where(R.pathway_id == pathway_id)
+        if entry_type:
+            stmt = stmt.where(Q.entry_type == entry_type)
+        return stmt.order_by(R.created_at, R.id)
+
+    @staticmethod
+    def _row_dict(row) -> dict:
+        data = row._asdict()
+        data["id"] = str(data["id"])
+        data["user_id"] = str(data["user_id"])
+        data["created_at"] = data["created_at"].isoformat()
+        return data
+
+    @classmethod
+    def _encode(cls, rows, fmt: str, header: bool) -> str:
+        if fmt == "ndjson":
+            return "".join(json.dumps(cls._row_dict(row), ensure_ascii=False) + "\n" for row in rows)
+
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=FIELDNAMES)
+        if header:
+            writer.writeheader()
+        for row in rows:
+            data = cls._row_dict(row)
+            data["answers"] = json.dumps(data["answers"], ensure_ascii=False)
+            writer.writerow(data)
+        return buffer.getvalue()
+
+    @classmethod
+    async def stream(cls, stmt, fmt: str, gzip: bool = False) -> AsyncIterator[bytes]:
+        """
+        Encoded export body, one chunk per fetched batch.
+
+        Opens its own (read replica when usable) session: the response streams
+        after the endpoint has returned, when request-scoped dependencies are
+        already closed.
+        """
+        compressor = zlib.compressobj(wbits=31) if gzip else None  # wbits=31: gzip container
+        exported = 0
+        header = True
+        async with ReadRouter.session() as session:
+            result = await session.stream(
+                stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+            )
+            async for rows in result.partitions():
+                chunk = cls._encode(rows, fmt, header).encode()
+                header = False
+                exported += len(rows)
+                EXPORTED_ROWS.inc(len(rows), format=fmt)
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                    if not chunk:
+                        continue
+                yield chunk
+
+        if header and fmt == "csv":
+            # No rows: still send the header line
+            chunk = cls._encode([], fmt, True).encode()
+            yield compressor.compress(chunk) if compressor else chunk
+        if compressor:
+            yield compressor.flush()
+        logger.info(f"Exported {exported} recommendations as {fmt}")
@@ -0,0 +1,303 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from cachetools import TTLCache
+
+from app.config import settings
+from app.core.cache import RedisCache
+from app.core.metrics import Counter, Gauge, Histogram, REGISTRY
+from app.core.tenants import Tenant, Tier
+from app.core.webhooks import WebhookClient, WebhookURLError, resolve_webhook
+from app.db.database import AsyncSessionLocal
+from app.schemas import JobStatus, RecommendationJobRequest, RecommendationRequest
+from app.services.recommendation import RecommendationService
+
+logger = logging.getLogger(__name__)
+
+JOBS_TOTAL = Counter(
+    "recommend_jobs_total",
+    "Asynchronous recommendation jobs by status transition",
+    ["status"],
+)
+JOB_LATENCY = Histogram(
+    "recommend_job_latency_seconds",
+    "Asynchronous recommendation job latency by stage (queue_wait, processing, total)",
+    ["stage"],
+)
+JOB_QUEUE_DEPTH = Gauge(
+    "recommend_job_queue_depth",
+    "Number of recommendation jobs waiting in the queue",
+    multiprocess_mode="max",  # The Redis queue is shared, every worker sees the same depth
+)
+WEBHOOK_DELIVERIES = Counter(
+    "recommend_job_webhooks_total",
+    "Webhook deliveries for finished jobs by outcome (delivered, failed, rejected)",
+    ["outcome"],
+)
+
+
+class InMemoryJobBackend:
+    """
+    Process-local job queue and store.
+
+    Only suitable for tests and single-worker deployments: a job submitted
+    to one worker is invisible to the others.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._jobs: TTLCache = TTLCache(maxsize=10000, ttl=settings.RECOMMEND_JOB_TTL)
+
+    async def enqueue(self, job_id: str) -> None:
+        self._queue.put_nowait(job_id)
+
+    async def dequeue(self, timeout: float) -> Optional[str]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        self._jobs[job["job_id"]] = job
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    async def depth(self) -> int:
+        return self._queue.qsize()
+
+
+class RedisJobBackend:
+    """Job queue (Redis list) and job store (Redis strings with TTL) shared by all workers."""
+
+    QUEUE_KEY = "recommend_jobs:queue"
+    JOB_KEY_PREFIX = "recommend_job:"
+
+    def __init__(self, client):
+        self._client = client
+
+    async def enqueue(self, job_id: str) -> None:
+        await self._client.lpush(self.QUEUE_KEY, job_id)
+
+    async def dequeue(self, timeout: float) -> Optional[str]:
+        item = await self._client.brpop(self.QUEUE_KEY, timeout=max(1, int(timeout)))
+        return item[1] if item else None
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        await self._client.setex(
+            f"{self.JOB_KEY_PREFIX}{job['job_id']}",
+            settings.RECOMMEND_JOB_TTL,
+            json.dumps(job),
+        )
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        value = await self._client.get(f"{self.JOB_KEY_PREFIX}{job_id}")
+        return json.loads(value) if value else None
+
+    async def depth(self) -> int:
+        return await self._client.llen(self.QUEUE_KEY)
+
+
+class RecommendationJobManager:
+    """
+    Runs recommendation requests in the background.
+
+    Jobs are queued in Redis (or in memory when RECOMMEND_JOB_BACKEND=memory
+    or Redis is unreachable) and processed by a pool of asyncio workers in
+    each app process. Results are kept for RECOMMEND_JOB_TTL seconds for
+    polling and optionally POSTed to a client webhook.
+    """
+
+    _backend = None
+    _workers: List[asyncio.Task] = []
+    _webhook_tasks: Set[asyncio.Task] = set()
+    _service: Optional[RecommendationService] = None
+
+    @classmethod
+    async def get_backend(cls):
+        """Get or create the configured job backend."""
+        if cls._backend is None:
+            client = None
+            if settings.RECOMMEND_JOB_BACKEND == "redis":
+                client = await RedisCache.get_available_client()
+                if client is None:
+                    logger.warning("Redis unavailable, recommendation jobs use in-memory queue")
+            cls._backend = RedisJobBackend(client) if client else InMemoryJobBackend()
+        return cls._backend
+
+    @classmethod
+    async def start(cls):
+        """Start the background worker pool (call on startup)."""
+        await cls.get_backend()
+        cls._service = RecommendationService()
+        REGISTRY.register_collector(cls._collect_metrics)
+        cls._workers = [
+            asyncio.create_task(cls._worker(i))
+            for i in range(settings.RECOMMEND_JOB_WORKERS)
+        ]
+        logger.info(f"Started {len(cls._workers)} recommendation job workers")
+
+    @classmethod
+    async def stop(cls):
+        """Stop the worker pool (call on shutdown)."""
+        for task in cls._workers:
+            task.cancel()
+        await asyncio.gather(*cls._workers, return_exceptions=True)
+        cls._workers = []
+
+    @classmethod
+    async def submit(cls, request: RecommendationJobRequest, tenant: Optional[Tenant] = None) -> Dict[str, Any]:
+        """
+        Queue a recommendation job.
+
+        Args:
+            request: Recommendation request with optional webhook_url
+            tenant: Submitting tenant, charged and scheduled when the job runs
+
+        Returns:
+            The stored job record
+
+        Raises:
+            WebhookURLError: If webhook_url points at a host or address that may not be called
+        """
+        if request.webhook_url:
+            await resolve_webhook(str(request.webhook_url))
+        backend = await cls.get_backend()
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "status": JobStatus.QUEUED.value,
+            "request": request.model_dump(mode="json", exclude={"webhook_url"}),
+            "webhook_url": str(request.webhook_url) if request.webhook_url else None,
+            "tenant": {"id": tenant.id, "tier": tenant.tier.value} if tenant else None,
+            "created_at": datetime.utcnow().isoformat(),
+            "enqueued_at": time.time(),
+        }
+        await backend.save(job)
+        await backend.enqueue(job["job_id"])
+        JOBS_TOTAL.inc(status=JobStatus.QUEUED.value)
+        return job
+
+    @classmethod
+    async def get(cls, job_id: str) -> Optional[Dict[str, Any]]:
+        """Load a job record by id."""
+        backend = await cls.get_backend()
+        return await backend.load(job_id)
+
+    @classmethod
+    async def _collect_metrics(cls):
+        backend = await cls.get_backend()
+        JOB_QUEUE_DEPTH.set(await backend.depth())
+
+    @classmethod
+    async def _worker(cls, worker_id: int):
+        """Pull jobs off the queue until cancelled."""
+        backend = await cls.get_backend()
+        while True:
+            try:
+                job_id = await backend.dequeue(timeout=settings.RECOMMEND_JOB_POLL_TIMEOUT)
+                if job_id:
+                    await cls._run_job(backend, job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} error: {e}")
+                await asyncio.sleep(1.0)
+
+    @classmethod
+    async def _run_job(cls, backend, job_id: str):
+        """Process a single job and record its outcome."""
+        job = await backend.load(job_id)
+        if job is None:
+            logger.warning(f"Job {job_id} expired before it was processed")
+            return
+
+        started = time.time()
+        JOB_LATENCY.observe(started - job["enqueued_at"], stage="queue_wait")
+        job["status"] = JobStatus.RUNNING.value
+        job["started_at"] = datetime.utcnow().isoformat()
+        await backend.save(job)
+
+        try:
+            request = RecommendationRequest(**job["request"])
+            async with AsyncSessionLocal() as db:
+                tenant = Tenant(job["tenant"]["id"], Tier(job["tenant"]["tier"])) if job.get("tenant") else None
+                recommendation, user_id, recommendation_id = await cls._service.get_recommendation(
+                    request, db, tenant
+                )
+            job["status"] = JobStatus.COMPLETED.value
+            job["result"] = {
+                "data": recommendation.model_dump(),
+                "user_id": user_id,
+                "recommendation_id": recommendation_id,
+            }
+        except Exception as e:
+            logger.error(f"Recommendation job {job_id} failed: {e}")
+            job["status"] = JobStatus.FAILED.value
+            job["error"] = f"Failed to generate recommendation: {str(e)}"
+
+        finished = time.time()
+        job["completed_at"] = datetime.utcnow().isoformat()
+        await backend.save(job)
+        JOBS_TOTAL.inc(status=job["status"])
+        JOB_LATENCY.observe(finished - started, stage="processing")
+        JOB_LATENCY.observe(finished - job["enqueued_at"], stage="total")
+
+        if job.get("webhook_url"):
+            # Deliver in the background so retries don't hold up the worker
+            task = asyncio.create_task(cls._deliver_webhook(job))
+            cls._webhook_tasks.add(task)
+            task.add_done_callback(cls._webhook_tasks.discard)
+
+    @classmethod
+    def to_response(cls, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Shape a job record for API responses and webhook payloads."""
+        result = job.get("result") or {}
+        return {
+            "success": job["status"] != JobStatus.FAILED.value,
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "status_url": f"/recommend/jobs/{job['job_id']}",
+            "created_at": job.get("created_at"),
+            "started_at": job.get("started_at"),
+            "completed_at": job.get("completed_at"),
+            "data": result.get("data"),
+            "user_id": result.get("user_id"),
+            "recommendation_id": result.get("recommendation_id"),
+            "error": job.get("error"),
+        }
+
+    @classmethod
+    async def _deliver_webhook(cls, job: Dict[str, Any]):
+        """POST the finished job to its webhook, retrying with backoff."""
+        body = json.dumps(cls.to_response(job)).encode()
+        headers = {"Content-Type": "application/json"}
+        if settings.JOB_WEBHOOK_SECRET:
+            signature = hmac.new(settings.JOB_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+            headers["X-Webhook-Signature"] = f"sha256={signature}"
+
+        for attempt in range(settings.JOB_WEBHOOK_MAX_RETRIES):
+            try:
+                # Re-checked on every attempt: the host may resolve differently now
+                response = await WebhookClient.post(job["webhook_url"], content=body, headers=headers)
+                if response.status_code < 300:
+                    WEBHOOK_DELIVERIES.inc(outcome="delivered")
+                    return
+                logger.warning(f"Webhook for job {job['job_id']} returned {response.status_code}")
+            except WebhookURLError as e:
+                logger.warning(f"Webhook for job {job['job_id']} rejected: {e}")
+                WEBHOOK_DELIVERIES.inc(outcome="rejected")
+                return
+            except Exception as e:
+                logger.warning(f"Webhook for job {job['job_id']} failed (attempt {attempt + 1}): {e}")
+
+            if attempt < settings.JOB_WEBHOOK_MAX_RETRIES - 1:
+                await asyncio.sleep(settings.AI_RETRY_DELAY * (2 ** attempt))
+
+        WEBHOOK_DELIVERIES.inc(outcome="failed")
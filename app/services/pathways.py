@@ -0,0 +1,98 @@
+"""
+Resolve free-text AI output to catalog ids and enum codes for storage.
+
+The AI names pathways loosely ("Overcoming Anxiety (10-14 days)",
+"overcoming anxiety", "Finding Purpose and Calling"), so names are
+normalized before an exact lookup, with substring and fuzzy matching as
+fallbacks. Results are memoized since the AI repeats the same strings.
+"""
+import difflib
+import re
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, Optional, Type
+
+from app.config import settings
+from app.core.metrics import Counter
+
+PATHWAY_RESOLUTIONS = Counter(
+    "pathway_resolutions_total",
+    "AI pathway names resolved to catalog ids by method (exact, contains, fuzzy, unresolved)",
+    ["method"],
+)
+
+FUZZY_CUTOFF = 0.75
+
+
+def normalize_pathway_name(name: str) -> str:
+    """Lowercase, drop durations/numbering/punctuation, and spell out '&'."""
+    name = re.sub(r"\([^)]*\)", " ", name.lower())  # "(10-14 days)"
+    name = re.sub(r"^\s*\d+[.)]\s*", "", name)  # "9. Overcoming Anxiety"
+    name = name.replace("&", " and ")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name).split())
+
+
+def _build_lookup() -> Dict[str, int]:
+    return {normalize_pathway_name(p["name"]): p["id"] for p in settings.PATHWAYS}
+
+
+_LOOKUP = _build_lookup()
+# Longest first, so "new believer foundations" wins over any shorter name it contains
+_BY_LENGTH = sorted(_LOOKUP.items(), key=lambda item: -len(item[0]))
+
+
+@lru_cache(maxsize=1024)
+def _resolve(normalized: str) -> tuple:
+    if normalized in _LOOKUP:
+        return _LOOKUP[normalized], "exact"
+    for key, pathway_id in _BY_LENGTH:
+        if key in normalized:
+            return pathway_id, "contains"
+    match = difflib.get_close_matches(normalized, _LOOKUP.keys(), n=1, cutoff=FUZZY_CUTOFF)
+    if match:
+        return _LOOKUP[match[0]], "fuzzy"
+    return None, "unresolved"
+
+
+def resolve_pathway_id(name: Optional[str]) -> Optional[int]:
+    """
+    Catalog id (settings.PATHWAYS) of a pathway named by the AI.
+
+    Args:
+        name: Pathway name as returned by the AI
+
+    Returns:
+        The pathway id, or None if nothing in the catalog is close enough
+    """
+    if not name:
+        return None
+    pathway_id, method = _resolve(normalize_pathway_name(name))
+    PATHWAY_RESOLUTIONS.inc(method=method)
+    return pathway_id
+
+
+@lru_cache(maxsize=None)
+def _profile_codes(enum_cls: Type[Enum]) -> Dict[str, int]:
+    # Codes follow declaration order in app/schemas/models.py: only ever append members
+    return {member.value: code for code, member in enumerate(enum_cls, start=1)}
+
+
+def profile_code(enum_cls: Type[Enum], value: Optional[str]) -> int:
+    """
+    Storage code of a detected profile value, e.g. SpiritualStage "New Believer" -> 2.
+
+    Args:
+        enum_cls: Profile enum from app.schemas (SpiritualStage, PrimaryNeed, EmotionalState)
+        value: Value as returned by the AI
+
+    Returns:
+        1-based position of the matching member, or 0 if it matches none
+    """
+    key = "_".join(re.sub(r"[^a-z]+", " ", (value or "").lower()).split())
+    return _profile_codes(enum_cls).get(key, 0)
+
+
+def profile_value(enum_cls: Type[Enum], code: Optional[int]) -> Optional[str]:
+    """Inverse of profile_code(); None for 0 (unknown) or unassigned codes."""
+    members = list(enum_cls)
+    return members[code - 1].value if code and 0 < code <= len(members) else None
@@ -1,31 +1,86 @@
 import json
+import uuid
+import importlib.util
+import base64
 import logging
 import asyncio
+import time
+from datetime import datetime
 from pathlib import Path
 import httpx
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.config import settings
 from app.core.cache import RedisCache
+from app.core.history_cache import HistoryCache
+from app.core.metrics import Counter, Histogram
+from app.core.quota import QuotaManager, QuotaReservation
+from app.core.scheduler import AIScheduler
+from app.core.tenants import Tenant, Tier
+from app.core.tracing import annotate, span
+from app.core.user_resolver import UserResolver
 from app.schemas import (
     EntryType,
     PathwayRecommendation,
     DetectedProfile,
     RecommendationRequest,
+    SpiritualStage,
+    PrimaryNeed,
+    EmotionalState,
 )
+from app.services.ai_parser import (
+    AIResponseParseError,
+    drop_fields,
+    find_missing_fields,
+    merge_fields,
+    parse_ai_response,
+)
+from app.services.analytics import AnalyticsService
+from app.services.pathways import profile_code, resolve_pathway_id
 from app.db.models import (
     User,
     QuestionnaireResponse,
     PathwayRecommendationRecord,
+    AIRawResponse,
 )
+from app.db.partitions import retention_cutoff
+from app.db.routing import ReadRouter
 
 logger = logging.getLogger(__name__)
 
+RECOMMENDATION_SECONDS = Histogram(
+    "recommendation_duration_seconds",
+    "Latency of admitted recommendation requests (/recommend, session submit, jobs) "
+    "by cache outcome (hit, miss) and status (success, error)",
+    ["cache", "status"],
+)
+AI_REQUEST_SECONDS = Histogram(
+    "ai_request_duration_seconds",
+    "Latency of single AI API requests by HTTP status code (or timeout, connect_error, error)",
+    ["status"],
+)
+AI_RETRIES = Counter(
+    "ai_retries_total",
+    "AI API requests retried, by reason (HTTP status code, timeout, connect_error, error)",
+    ["reason"],
+)
+AI_TOKENS = Counter(
+    "ai_tokens_total",
+    "Tokens used by AI API completions, by kind (prompt, completion)",
+    ["kind"],
+)
+
 # Base directory for data files
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
+# Idle connections the shared AI client keeps open (and warmup may open)
+AI_KEEPALIVE_CONNECTIONS = 20
+# httpx speaks HTTP/2 only with the h2 package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
 
 class RecommendationService:
     """
@@ -193,18 +248,42 @@ Return ONLY valid JSON (no markdown, no extra text):
 
     @classmethod
     async def get_http_client(cls) -> httpx.AsyncClient:
-        """Get or create shared HTTP client with connection pooling."""
+        """Get or create shared HTTP client with connection pooling (HTTP/2 when AI_HTTP2 and h2 is installed)."""
         if cls._http_client is None or cls._http_client.is_closed:
             cls._http_client = httpx.AsyncClient(
                 timeout=30.0,
                 limits=httpx.Limits(
-                    max_keepalive_connections=20,
+                    max_keepalive_connections=AI_KEEPALIVE_CONNECTIONS,
                     max_connections=100,
                     keepalive_expiry=30.0
-                )
+                ),
+                http2=settings.AI_HTTP2 and HTTP2_AVAILABLE,
             )
         return cls._http_client
 
+    @classmethod
+    async def warm_http_client(cls, connections: int) -> int:
+        """
+        Open keep-alive connections to the AI endpoint before the first call.
+
+        Sends concurrent HEAD requests to OPENROUTER_BASE_URL (any response
+        will do: the point is the TCP and TLS handshakes). Over HTTP/2 they
+        share one multiplexed connection.
+
+        Returns:
+            Number of requests that got a response
+        """
+        client = await cls.get_http_client()
+        connections = min(connections, AI_KEEPALIVE_CONNECTIONS)
+        results = await asyncio.gather(
+            *(client.head(settings.OPENROUTER_BASE_URL) for _ in range(connections)),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        return len(results) - len(errors)
+
     @classmethod
     async def close_http_client(cls):
         """Close shared HTTP client (call on shutdown)."""
@@ -242,35 +321,59 @@ Return ONLY valid JSON (no markdown, no extra text):
 
         return question_key
 
-    async def _get_or_create_user(
+    async def _resolve_user_id(
         self, db: AsyncSession, external_user_id: Optional[str] = None
-    ) -> User:
-        """Get existing user or create a new one (async)."""
+    ) -> uuid.UUID:
+        """
+        Get the internal id of an existing user or create a new one (async).
+
+        Returning users are resolved through UserResolver (in-process LRU,
+        then Redis), so the hot path usually skips the users lookup entirely.
+        """
         if external_user_id:
+            cached = await UserResolver.get(external_user_id)
+            if cached:
+                return uuid.UUID(cached)
+
             result = await db.execute(
-                select(User).where(User.external_user_id == external_user_id)
+                select(User.id).where(User.external_user_id == external_user_id)
             )
-            user = result.scalar_one_or_none()
-            if user:
-                return user
-
-        # Create new user
-        user = User(external_user_id=external_user_id)
+            user_id = result.scalar_one_or_none()
+            if user_id is None:
+                # Concurrent first requests for the same user must not trip the unique index
+                result = await db.execute(
+                    pg_insert(User)
+                    .values(external_user_id=external_user_id)
+                    .on_conflict_do_nothing(index_elements=[User.external_user_id])
+                    .returning(User.id)
+                )
+                user_id = result.scalar_one_or_none()
+                await db.commit()
+                if user_id is None:
+                    result = await db.execute(
+                        select(User.id).where(User.external_user_id == external_user_id)
+                    )
+                    user_id = result.scalar_one()
+
+            await UserResolver.set(external_user_id, str(user_id))
+            return user_id
+
+        # Anonymous request - create new user
+        user = User()
         db.add(user)
         await db.commit()
-        await db.refresh(user)
-        return user
+        return user.id
 
     async def _store_questionnaire_response(
         self,
         db: AsyncSession,
-        user: User,
+        user_id: uuid.UUID,
         entry_type: str,
         answers: Dict[str, str]
     ) -> QuestionnaireResponse:
         """Store questionnaire answers in database (async)."""
         response = QuestionnaireResponse(
-            user_id=user.id,
+            user_id=user_id,
             entry_type=entry_type,
             answers=answers
         )
@@ -282,27 +385,43 @@ Return ONLY valid JSON (no markdown, no extra text):
     async def _store_recommendation(
         self,
         db: AsyncSession,
-        user: User,
+        user_id: uuid.UUID,
         questionnaire_response: QuestionnaireResponse,
         recommendation: PathwayRecommendation,
         raw_response: Dict
     ) -> PathwayRecommendationRecord:
         """Store AI recommendation in database (async)."""
+        # Raw payloads are content-addressed: cache hits reuse the stored copy
+        raw_response_hash = AIRawResponse.hash_payload(raw_response)
+        await db.execute(
+            pg_insert(AIRawResponse)
+            .values(content_hash=raw_response_hash, payload=raw_response)
+            .on_conflict_do_nothing(index_elements=[AIRawResponse.content_hash])
+        )
+        profile = recommendation.detected_profile
         record = PathwayRecommendationRecord(
-            user_id=user.id,
+            user_id=user_id,
             questionnaire_response_id=questionnaire_response.id,
             recommended_pathway=recommendation.recommended_pathway,
+            pathway_id=resolve_pathway_id(recommendation.recommended_pathway),
             confidence=recommendation.confidence,
-            spiritual_stage=recommendation.detected_profile.spiritual_stage,
-            primary_need=recommendation.detected_profile.primary_need,
-            emotional_state=recommendation.detected_profile.emotional_state,
+            spiritual_stage=profile.spiritual_stage,
+            primary_need=profile.primary_need,
+            emotional_state=profile.emotional_state,
+            spiritual_stage_code=profile_code(SpiritualStage, profile.spiritual_stage),
+            primary_need_code=profile_code(PrimaryNeed, profile.primary_need),
+            emotional_state_code=profile_code(EmotionalState, profile.emotional_state),
             reasoning=recommendation.reasoning,
             next_step_message=recommendation.next_step_message,
-            raw_ai_response=raw_response
+            raw_response_hash=raw_response_hash,
+            created_at=datetime.utcnow(),  # Set here so the rollup uses the same hour
         )
         db.add(record)
+        await AnalyticsService.record(db, record, questionnaire_response.entry_type)
         await db.commit()
         await db.refresh(record)
+        # Only after the commit, so concurrent readers can't re-cache the old page
+        await HistoryCache.invalidate(str(user_id))
         return record
 
     def _format_user_prompt(self, request: RecommendationRequest) -> str:
@@ -352,7 +471,70 @@ Based on the above questions and answers, analyze this user's:
 Then recommend the BEST matching pathway from the provided list.
 Return your response in the exact JSON format specified."""
 
-    async def _call_ai_api_with_retry(self, user_prompt: str) -> Dict:
+    def _build_messages(self, user_prompt: str) -> List[Dict[str, str]]:
+        """Build the chat messages for a recommendation request."""
+        return [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    async def _call_ai_api_with_retry(self, user_prompt: str, usage: Optional[List[int]] = None) -> Dict:
+        """
+        Get a validated recommendation dict from the AI.
+
+        Transport failures are retried by _request_completion_with_retry.
+        Malformed output (trailing commas, unescaped quotes, truncation at
+        max_tokens) is repaired locally, and only fields that could not be
+        recovered are re-requested with a short follow-up prompt instead of
+        repeating the whole call.
+
+        Args:
+            user_prompt: Formatted questions and answers
+            usage: If given, the token usage of every completion is appended to it
+        """
+        messages = self._build_messages(user_prompt)
+        content = await self._request_completion_with_retry(messages, usage)
+        data, missing = self._parse_ai_response(content)
+
+        for followup in range(settings.AI_REPAIR_MAX_FOLLOWUPS):
+            if not missing:
+                break
+            logger.warning(
+                f"AI response missing fields {missing}, requesting them "
+                f"(follow-up {followup + 1}/{settings.AI_REPAIR_MAX_FOLLOWUPS})"
+            )
+            followup_messages = messages + [
+                {"role": "assistant", "content": content},
+                {"role": "user", "content": self._format_followup_prompt(missing)},
+            ]
+            followup_content = await self._request_completion_with_retry(followup_messages, usage)
+            try:
+                extra, _ = self._parse_ai_response(followup_content)
+            except AIResponseParseError as e:
+                logger.warning(f"Follow-up response unusable: {e}")
+                continue
+            data = merge_fields(data, extra)
+            missing = find_missing_fields(data)
+            data = drop_fields(data, missing)
+
+        if missing:
+            raise AIResponseParseError(f"AI response incomplete, missing fields: {', '.join(missing)}")
+
+        return PathwayRecommendation.model_validate(data).model_dump()
+
+    def _format_followup_prompt(self, missing: List[str]) -> str:
+        """Short prompt asking the model for only the fields it failed to return."""
+        fields = ", ".join(missing)
+        return (
+            "Your previous response was cut off or invalid. Do not repeat it. "
+            f"Return ONLY a JSON object containing these fields: {fields}. "
+            "Use nested objects for dotted names (e.g. detected_profile.primary_need "
+            "goes inside \"detected_profile\")."
+        )
+
+    async def _request_completion_with_retry(
+        self, messages: List[Dict[str, str]], usage: Optional[List[int]] = None
+    ) -> str:
         """
         Call OpenRouter AI API with retry logic for resilience.
 
@@ -361,44 +543,47 @@ Return your response in the exact JSON format specified."""
         - Timeout errors
         - 5xx server errors
         - 429 rate limit errors
+        - Malformed API envelopes (missing choices/content)
         """
         last_exception = None
 
         for attempt in range(settings.AI_MAX_RETRIES):
             try:
-                return await self._call_ai_api_once(user_prompt)
+                return await self._call_ai_api_once(messages, usage)
             except httpx.TimeoutException as e:
-                last_exception = e
+                last_exception, reason = e, "timeout"
                 logger.warning(f"AI API timeout (attempt {attempt + 1}/{settings.AI_MAX_RETRIES}): {e}")
             except httpx.ConnectError as e:
-                last_exception = e
+                last_exception, reason = e, "connect_error"
                 logger.warning(f"AI API connection error (attempt {attempt + 1}/{settings.AI_MAX_RETRIES}): {e}")
             except httpx.HTTPStatusError as e:
                 if e.response.status_code in (429, 500, 502, 503, 504):
-                    last_exception = e
+                    last_exception, reason = e, str(e.response.status_code)
                     logger.warning(f"AI API error {e.response.status_code} (attempt {attempt + 1}/{settings.AI_MAX_RETRIES})")
                 else:
                     raise  # Don't retry on 4xx errors (except 429)
             except Exception as e:
-                last_exception = e
+                last_exception, reason = e, "error"
                 logger.error(f"Unexpected AI API error (attempt {attempt + 1}/{settings.AI_MAX_RETRIES}): {e}")
 
             # Wait before retry with exponential backoff
             if attempt < settings.AI_MAX_RETRIES - 1:
+                AI_RETRIES.inc(reason=reason)
                 wait_time = settings.AI_RETRY_DELAY * (2 ** attempt)
                 logger.info(f"Retrying in {wait_time}s...")
                 await asyncio.sleep(wait_time)
 
         raise Exception(f"AI API failed after {settings.AI_MAX_RETRIES} attempts: {last_exception}")
 
-    async def _call_ai_api_once(self, user_prompt: str) -> Dict:
-        """Single AI API call (used by retry wrapper)."""
+    async def _call_ai_api_once(self, messages: List[Dict[str, str]], usage: Optional[List[int]] = None) -> str:
+        """
+        Single AI API call (used by retry wrapper). Returns the raw message content.
+
+        The call's total token usage is appended to `usage` if given.
+        """
         payload = {
             "model": self.model,
-            "messages": [
-                {"role": "system", "content": self.SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
+            "messages": messages,
             "temperature": 0.3,
             "max_tokens": 500,
         }
@@ -411,21 +596,89 @@ Return your response in the exact JSON format specified."""
         }
 
         client = await self.get_http_client()
-        response = await client.post(
-            self.base_url,
-            json=payload,
-            headers=headers
-        )
+        status = "error"
+        start = time.perf_counter()
+        try:
+            with span("ai.call"):
+                response = await client.post(
+                    self.base_url,
+                    json=payload,
+                    headers=headers
+                )
+            status = str(response.status_code)
+        except httpx.TimeoutException:
+            status = "timeout"
+            raise
+        except httpx.ConnectError:
+            status = "connect_error"
+            raise
+        finally:
+            AI_REQUEST_SECONDS.observe(time.perf_counter() - start, status=status)
         response.raise_for_status()
 
         result = response.json()
-        ai_content = result["choices"][0]["message"]["content"]
-        return self._parse_ai_response(ai_content)
+        token_usage = result.get("usage") or {}
+        AI_TOKENS.inc(int(token_usage.get("prompt_tokens") or 0), kind="prompt")
+        AI_TOKENS.inc(int(token_usage.get("completion_tokens") or 0), kind="completion")
+        if usage is not None:
+            usage.append(int(token_usage.get("total_tokens") or 0))
+        return result["choices"][0]["message"]["content"]
+
+    async def generate_recommendation_data(self, request: RecommendationRequest) -> Dict:
+        """
+        Get the recommendation dict for a set of answers, without touching the database.
+
+        Checks the Redis cache for an identical answer pattern first and only
+        calls the AI API on a miss, caching the result. Also used to warm the
+        cache speculatively before a questionnaire is submitted.
+        """
+        cache_key = RedisCache.generate_cache_key(request.entry_type.value, request.answers)
+        recommendation_data = await RedisCache.get(cache_key)
+
+        if recommendation_data is None:
+            recommendation_data = await self._generate_uncached(request, cache_key)
+        else:
+            logger.info(f"Cache hit for key {cache_key[:16]}...")
+
+        return recommendation_data
+
+    async def _generate_uncached(
+        self,
+        request: RecommendationRequest,
+        cache_key: str,
+        reservation: Optional[QuotaReservation] = None,
+        tier: Tier = Tier.BATCH
+    ) -> Dict:
+        """
+        Call the AI API for a cache miss and cache the result.
+
+        The call waits for an AIScheduler slot at `tier` (batch by default,
+        e.g. for speculative warming) and settles the quota reservation.
+        """
+        # Cache miss - call AI API with retry logic
+        logger.info(f"Cache miss for key {cache_key[:16]}..., calling AI API")
+        with span("ai.prompt"):
+            user_prompt = self._format_user_prompt(request)
+        usage: List[int] = []
+        try:
+            async with AIScheduler.slot(tier):
+                recommendation_data = await self._call_ai_api_with_retry(user_prompt, usage)
+        finally:
+            # Failed calls still pay for the completions they received
+            with span("quota.reconcile"):
+                await QuotaManager.reconcile(reservation, sum(usage))
+            annotate(ai_tokens=sum(usage))
+        # Store in Redis cache
+        with span("cache.store"):
+            await RedisCache.set(cache_key, recommendation_data)
+        logger.info(f"Cached response for key {cache_key[:16]}...")
+        return recommendation_data
 
     async def get_recommendation(
         self,
         request: RecommendationRequest,
-        db: AsyncSession
+        db: AsyncSession,
+        tenant: Optional[Tenant] = None
     ) -> Tuple[PathwayRecommendation, str, str]:
         """
         Get pathway recommendation from OpenRouter AI and store in database.
@@ -440,142 +693,240 @@ Return your response in the exact JSON format specified."""
         Args:
             request: The recommendation request with entry type and answers
             db: Async database session
+            tenant: Calling tenant, charged to its quotas and scheduled at its
+                tier; None for internal callers (no quota, interactive)
 
         Returns:
             Tuple of (PathwayRecommendation, user_id, recommendation_id)
+
+        Raises:
+            QuotaExceeded: If the caller's request or AI budget is exhausted
         """
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY is not set. Please set it in environment variables.")
+        start = time.perf_counter()
 
-        # 1. Get or create user (async)
-        user = await self._get_or_create_user(db, request.user_id)
-
-        # 2. Store questionnaire answers (async)
-        questionnaire_response = await self._store_questionnaire_response(
-            db,
-            user,
-            request.entry_type.value,
-            request.answers
-        )
-
-        # 3. Check Redis cache for similar answer patterns
+        # 0. Look up the answer pattern, then charge the quota before any writes:
+        # a cache hit only costs a request unit, a miss also reserves AI tokens
         cache_key = RedisCache.generate_cache_key(request.entry_type.value, request.answers)
-        recommendation_data = await RedisCache.get(cache_key)
-
-        if recommendation_data is None:
-            # Cache miss - call AI API with retry logic
-            logger.info(f"Cache miss for key {cache_key[:16]}..., calling AI API")
-            user_prompt = self._format_user_prompt(request)
-            recommendation_data = await self._call_ai_api_with_retry(user_prompt)
-            # Store in Redis cache
-            await RedisCache.set(cache_key, recommendation_data)
-            logger.info(f"Cached response for key {cache_key[:16]}...")
-        else:
-            logger.info(f"Cache hit for key {cache_key[:16]}...")
-
-        # 4. Create recommendation object
-        recommendation = PathwayRecommendation(
-            recommended_pathway=recommendation_data["recommended_pathway"],
-            confidence=recommendation_data["confidence"],
-            detected_profile=DetectedProfile(
-                spiritual_stage=recommendation_data["detected_profile"]["spiritual_stage"],
-                primary_need=recommendation_data["detected_profile"]["primary_need"],
-                emotional_state=recommendation_data["detected_profile"]["emotional_state"]
-            ),
-            reasoning=recommendation_data["reasoning"],
-            next_step_message=recommendation_data["next_step_message"]
-        )
-
-        # 5. Store recommendation in database (async)
-        recommendation_record = await self._store_recommendation(
-            db,
-            user,
-            questionnaire_response,
-            recommendation,
-            recommendation_data
-        )
-
-        return recommendation, str(user.id), str(recommendation_record.id)
-
-    def _parse_ai_response(self, content: str) -> Dict:
-        """Parse the AI response content to extract JSON."""
-        content = content.strip()
+        with span("cache.lookup"):
+            cached_data = await RedisCache.get(cache_key)
+        annotate(cache="miss" if cached_data is None else "hit")
+        reservation = None
+        if tenant:
+            with span("quota.admit"):
+                reservation = await QuotaManager.admit(tenant.id, ai_call=cached_data is None)
+
+        # Latency of admitted requests only (quota rejections are counted by QuotaManager)
+        status = "error"
+        try:
+            try:
+                # 1. Get or create user (async)
+                with span("db.user"):
+                    user_id = await self._resolve_user_id(db, request.user_id)
+
+                # 2. Store questionnaire answers (async)
+                with span("db.questionnaire"):
+                    questionnaire_response = await self._store_questionnaire_response(
+                        db,
+                        user_id,
+                        request.entry_type.value,
+                        request.answers
+                    )
+            except Exception:
+                # No AI call was made: give the reserved tokens back
+                await QuotaManager.reconcile(reservation, 0)
+                raise
+
+            # 3. Get recommendation data (Redis cache or AI API)
+            if cached_data is not None:
+                logger.info(f"Cache hit for key {cache_key[:16]}...")
+                recommendation_data = cached_data
+            else:
+                tier = tenant.tier if tenant else Tier.INTERACTIVE
+                recommendation_data = await self._generate_uncached(request, cache_key, reservation, tier)
+
+            # 4. Create recommendation object
+            recommendation = PathwayRecommendation(
+                recommended_pathway=recommendation_data["recommended_pathway"],
+                confidence=recommendation_data["confidence"],
+                detected_profile=DetectedProfile(
+                    spiritual_stage=recommendation_data["detected_profile"]["spiritual_stage"],
+                    primary_need=recommendation_data["detected_profile"]["primary_need"],
+                    emotional_state=recommendation_data["detected_profile"]["emotional_state"]
+                ),
+                reasoning=recommendation_data["reasoning"],
+                next_step_message=recommendation_data["next_step_message"]
+            )
 
-        if content.startswith("```json"):
-            content = content[7:]
-        elif content.startswith("```"):
-            content = content[3:]
+            # 5. Store recommendation in database (async). The user's reads go to the
+            # primary from before the commit, so a lagging replica never serves (or
+            # re-caches) history without the new record
+            await ReadRouter.mark_write(str(user_id), request.user_id)
+            with span("db.recommendation"):
+                recommendation_record = await self._store_recommendation(
+                    db,
+                    user_id,
+                    questionnaire_response,
+                    recommendation,
+                    recommendation_data
+                )
 
-        if content.endswith("```"):
-            content = content[:-3]
+            status = "success"
+            return recommendation, str(user_id), str(recommendation_record.id)
+        finally:
+            RECOMMENDATION_SECONDS.observe(
+                time.perf_counter() - start,
+                cache="miss" if cached_data is None else "hit",
+                status=status,
+            )
 
-        content = content.strip()
+    def _parse_ai_response(self, content: str) -> Tuple[Dict, List[str]]:
+        """
+        Parse the AI response content, repairing common JSON defects.
 
+        Returns:
+            Tuple of (recovered fields, names of fields still missing)
+        """
+        with span("ai.parse"):
+            return parse_ai_response(content)
+
+    # Columns returned by get_user_history (raw_ai_response etc. are never loaded)
+    HISTORY_COLUMNS = (
+        PathwayRecommendationRecord.id,
+        PathwayRecommendationRecord.user_id,
+        PathwayRecommendationRecord.recommended_pathway,
+        PathwayRecommendationRecord.confidence,
+        PathwayRecommendationRecord.spiritual_stage,
+        PathwayRecommendationRecord.primary_need,
+        PathwayRecommendationRecord.emotional_state,
+        PathwayRecommendationRecord.reasoning,
+        PathwayRecommendationRecord.created_at,
+    )
+
+    @staticmethod
+    def encode_history_cursor(created_at: datetime, record_id: uuid.UUID) -> str:
+        """Opaque keyset cursor pointing just past (created_at, id)."""
+        raw = json.dumps({"t": created_at.isoformat(), "id": str(record_id)})
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_history_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+        """Decode a cursor from encode_history_cursor (raises ValueError if invalid)."""
         try:
-            return json.loads(content)
-        except json.JSONDecodeError as e:
-            start_idx = content.find("{")
-            end_idx = content.rfind("}") + 1
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            data = json.loads(raw)
+            return datetime.fromisoformat(data["t"]), uuid.UUID(data["id"])
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {e}")
 
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = content[start_idx:end_idx]
-                return json.loads(json_str)
-
-            raise ValueError(f"Failed to parse AI response as JSON: {e}")
-
-    async def get_user_history(self, db: AsyncSession, user_id: str) -> list:
+    async def get_user_history(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Tuple[list, Optional[str]]:
         """
-        Get user's recommendation history (async).
+        Get one page of a user's recommendation history, newest first (async).
+
+        Pages are served from HistoryCache when possible. Otherwise the user
+        is resolved and the page fetched in a single joined query that
+        selects only the returned columns. Pages use keyset pagination on
+        (created_at, id), served by the (user_id, created_at) index, so every
+        page costs the same no matter how long the history is.
 
         Args:
             db: Async database session
             user_id: Can be either the internal UUID or the external_user_id
+            limit: Maximum number of records to return
+            cursor: next_cursor from the previous page, if any
 
         Returns:
-            List of recommendation history records
-        """
-        import uuid as uuid_module
+            Tuple of (list of history records, cursor for the next page or None)
 
-        user = None
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        # Known user: serve from the history cache, else query by user_id only
+        internal_id = await UserResolver.get(user_id)
+        if internal_id:
+            version, cached = await HistoryCache.get_page(internal_id, limit, cursor)
+            if cached is not None:
+                return cached
+            records, next_cursor, _ = await self._query_history(
+                db, PathwayRecommendationRecord.user_id == uuid.UUID(internal_id), limit, cursor
+            )
+            await HistoryCache.set_page(internal_id, version, limit, cursor, records, next_cursor)
+            return records, next_cursor
 
-        # First, try to find by internal UUID
+        # Unknown identifier: resolve the user in the same query as the page
+        user_match = User.external_user_id == user_id
         try:
-            user_uuid = uuid_module.UUID(user_id)
-            result = await db.execute(
-                select(User).where(User.id == user_uuid)
-            )
-            user = result.scalar_one_or_none()
-        except (ValueError, AttributeError):
-            # Not a valid UUID, will try external_user_id next
+            # A random UUID colliding with another user's external id is not a practical concern
+            user_match = or_(User.id == uuid.UUID(user_id), user_match)
+        except ValueError:
             pass
 
-        # If not found by UUID, try external_user_id
-        if not user:
-            result = await db.execute(
-                select(User).where(User.external_user_id == user_id)
-            )
-            user = result.scalar_one_or_none()
-
-        if not user:
-            return []
-
-        result = await db.execute(
-            select(PathwayRecommendationRecord)
-            .where(PathwayRecommendationRecord.user_id == user.id)
-            .order_by(PathwayRecommendationRecord.created_at.desc())
+        records, next_cursor, resolved_id = await self._query_history(
+            db, user_match, limit, cursor, join_users=True
         )
-        recommendations = result.scalars().all()
+        if resolved_id:
+            await UserResolver.set(user_id, resolved_id)
+        return records, next_cursor
 
-        return [
+    async def _query_history(
+        self,
+        db: AsyncSession,
+        condition,
+        limit: int,
+        cursor: Optional[str],
+        join_users: bool = False,
+    ) -> Tuple[list, Optional[str], Optional[str]]:
+        """
+        Run the keyset-paginated history query for one page.
+
+        Returns:
+            Tuple of (records, next cursor, internal user id of the rows or None)
+        """
+        stmt = select(*self.HISTORY_COLUMNS)
+        if join_users:
+            stmt = stmt.join(User, User.id == PathwayRecommendationRecord.user_id)
+        stmt = stmt.where(condition)
+        # Plain created_at bounds alongside the keyset comparison, so Postgres
+        # can prune partitions (it doesn't prune on row comparisons)
+        cutoff = retention_cutoff()
+        if cutoff:
+            stmt = stmt.where(PathwayRecommendationRecord.created_at >= cutoff)
+        if cursor:
+            created_at, record_id = self.decode_history_cursor(cursor)
+            stmt = stmt.where(
+                PathwayRecommendationRecord.created_at <= created_at,
+                tuple_(PathwayRecommendationRecord.created_at, PathwayRecommendationRecord.id)
+                < tuple_(created_at, record_id),
+            )
+        stmt = stmt.order_by(
+            PathwayRecommendationRecord.created_at.desc(),
+            PathwayRecommendationRecord.id.desc(),
+        ).limit(limit + 1)
+
+        rows = (await db.execute(stmt)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_history_cursor(rows[-1].created_at, rows[-1].id)
+
+        records = [
             {
-                "id": str(rec.id),
-                "recommended_pathway": rec.recommended_pathway,
-                "confidence": rec.confidence,
-                "spiritual_stage": rec.spiritual_stage,
-                "primary_need": rec.primary_need,
-                "emotional_state": rec.emotional_state,
-                "reasoning": rec.reasoning,
-                "created_at": rec.created_at.isoformat()
+                "id": str(row.id),
+                "recommended_pathway": row.recommended_pathway,
+                "confidence": row.confidence,
+                "spiritual_stage": row.spiritual_stage,
+                "primary_need": row.primary_need,
+                "emotional_state": row.emotional_state,
+                "reasoning": row.reasoning,
+                "created_at": row.created_at.isoformat()
             }
-            for rec in recommendations
+            for row in rows
         ]
+        return records, next_cursor, str(rows[0].user_id) if rows else None
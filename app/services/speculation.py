@@ -0,0 +1,325 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import math
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from cachetools import TTLCache
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.cache import RedisCache
+from app.core.metrics import Counter
+from app.core.tenants import Tenant
+from app.schemas import EntryType, PathwayRecommendation, RecommendationRequest
+from app.services.recommendation import RecommendationService
+
+logger = logging.getLogger(__name__)
+
+SPECULATIONS = Counter(
+    "questionnaire_speculations_total",
+    "Speculative recommendation precomputations by outcome (started, cancelled, hit, miss)",
+    ["outcome"],
+)
+
+
+class QuestionnaireSessionManager:
+    """
+    Questionnaire sessions that receive answers as the user gives them.
+
+    Once enough of the flow is answered (SPECULATION_MIN_PROGRESS) and only a
+    few questions remain, the most likely completions are computed in the
+    background so the AI result is already cached when the questionnaire is
+    submitted. Likelihood comes from how often each option was chosen in
+    previous submissions. Speculation is capped per session and per worker,
+    and speculations that no longer match the user's answers are cancelled.
+
+    Session state lives in Redis so any worker can serve the next request;
+    the speculative tasks themselves run in the worker that started them.
+    """
+
+    SESSION_PREFIX = "questionnaire_session:"
+    STATS_PREFIX = "answer_stats:"
+
+    _fallback_sessions: TTLCache = TTLCache(maxsize=10000, ttl=settings.SESSION_TTL)
+    _fallback_stats: Dict[str, Dict[str, int]] = {}
+    # session_id -> cache_key -> {"answers": ..., "task": ...}; cancelled and
+    # finished speculations stay listed so they count against the session budget
+    _speculations: TTLCache = TTLCache(maxsize=10000, ttl=settings.SESSION_TTL)
+    _active: int = 0
+    _service = RecommendationService()
+
+    @classmethod
+    def _flow_questions(cls, entry_type: str) -> Dict[str, Dict]:
+        """Map of question key (Q1, Q2, ...) to question definition for a flow."""
+        flow = RecommendationService._load_questions().get("flows", {}).get(entry_type, {})
+        return {f"Q{q['question_number']}": q for q in flow.get("questions", [])}
+
+    @classmethod
+    async def _save(cls, session: Dict[str, Any]):
+        cls._fallback_sessions[session["session_id"]] = session
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                await client.setex(
+                    f"{cls.SESSION_PREFIX}{session['session_id']}",
+                    settings.SESSION_TTL,
+                    json.dumps(session),
+                )
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+
+    @classmethod
+    async def create_session(cls, entry_type: EntryType, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Start a new questionnaire session."""
+        session = {
+            "session_id": str(uuid.uuid4()),
+            "entry_type": entry_type.value,
+            "user_id": user_id,
+            "answers": {},
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        await cls._save(session)
+        return session
+
+    @classmethod
+    async def get_session(cls, session_id: str) -> Optional[Dict[str, Any]]:
+        """Load a session by id (None if unknown or expired)."""
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                value = await client.get(f"{cls.SESSION_PREFIX}{session_id}")
+                return json.loads(value) if value else None
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+        return cls._fallback_sessions.get(session_id)
+
+    @classmethod
+    def describe(cls, session: Dict[str, Any]) -> Dict[str, Any]:
+        """Shape a session for API responses."""
+        return {
+            "session_id": session["session_id"],
+            "entry_type": session["entry_type"],
+            "answered": len(session["answers"]),
+            "total_questions": len(cls._flow_questions(session["entry_type"])),
+            "speculating": sum(
+                1 for spec in cls._speculations.get(session["session_id"], {}).values()
+                if not spec["task"].done()
+            ),
+        }
+
+    @classmethod
+    async def add_answers(cls, session: Dict[str, Any], answers: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Record new answers, cancel diverged speculations and start new ones.
+
+        Args:
+            session: Session from get_session()
+            answers: Validated answers to add or change
+
+        Returns:
+            The updated session
+        """
+        previous = session["answers"]
+        changed = any(key in previous and previous[key] != value for key, value in answers.items())
+        if changed:
+            # An earlier answer was revised, so every speculation is built on a stale prefix
+            cls._cancel(session["session_id"], lambda spec: True)
+        else:
+            cls._cancel(
+                session["session_id"],
+                lambda spec: any(spec["answers"].get(k) != v for k, v in answers.items()),
+            )
+
+        session["answers"] = {**previous, **answers}
+        await cls._save(session)
+        await cls._maybe_speculate(session)
+        return session
+
+    @classmethod
+    async def submit(
+        cls,
+        session: Dict[str, Any],
+        db: AsyncSession,
+        answers: Optional[Dict[str, str]] = None,
+        tenant: Optional[Tenant] = None,
+    ) -> Tuple[PathwayRecommendation, str, str]:
+        """
+        Finish a session and get its recommendation.
+
+        Waits for a speculation that matches the final answers (so the result
+        comes from cache), cancels the rest, and records answer statistics.
+        `tenant` is charged as in RecommendationService.get_recommendation.
+        """
+        final_answers = {**session["answers"], **(answers or {})}
+        request = RecommendationRequest(
+            user_id=session.get("user_id"),
+            entry_type=session["entry_type"],
+            answers=final_answers,
+        )
+        cache_key = RedisCache.generate_cache_key(request.entry_type.value, request.answers)
+
+        specs = cls._speculations.pop(session["session_id"], {})
+        match = specs.get(cache_key)
+        for spec in specs.values():
+            if spec is not match:
+                cls._cancel_spec(spec)
+        if match is not None and not match["task"].cancelled():
+            SPECULATIONS.inc(outcome="hit")
+            # Shield so a client disconnect doesn't throw away the warm result
+            await asyncio.gather(asyncio.shield(match["task"]), return_exceptions=True)
+        elif specs:
+            SPECULATIONS.inc(outcome="miss")
+
+        await cls._record_stats(request.entry_type.value, request.answers)
+        await cls._delete(session["session_id"])
+        return await cls._service.get_recommendation(request, db, tenant)
+
+    @classmethod
+    async def _delete(cls, session_id: str):
+        cls._fallback_sessions.pop(session_id, None)
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                await client.delete(f"{cls.SESSION_PREFIX}{session_id}")
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+
+    @classmethod
+    def _cancel_spec(cls, spec: Dict[str, Any]):
+        if not spec["task"].done():
+            spec["task"].cancel()
+            SPECULATIONS.inc(outcome="cancelled")
+
+    @classmethod
+    def _cancel(cls, session_id: str, predicate):
+        """Cancel running speculations of a session that match predicate."""
+        for spec in cls._speculations.get(session_id, {}).values():
+            if predicate(spec):
+                cls._cancel_spec(spec)
+
+    @classmethod
+    async def _load_stats(cls, entry_type: str, question_key: str) -> Dict[str, int]:
+        stats_key = f"{cls.STATS_PREFIX}{entry_type}:{question_key}"
+        client = await RedisCache.get_available_client()
+        if client:
+            try:
+                return {k: int(v) for k, v in (await client.hgetall(stats_key)).items()}
+            except Exception as e:
+                RedisCache.mark_unavailable(e)
+        return cls._fallback_stats.get(stats_key, {})
+
+    @classmethod
+    async def _record_stats(cls, entry_type: str, answers: Dict[str, str]):
+        """Count chosen options per question (used to rank likely completions)."""
+        questions = cls._flow_questions(entry_type)
+        client = await RedisCache.get_available_client()
+        for key, value in answers.items():
+            if value not in questions.get(key, {}).get("options", []):
+                continue  # Only count known options so the stats stay bounded
+            stats_key = f"{cls.STATS_PREFIX}{entry_type}:{key}"
+            local = cls._fallback_stats.setdefault(stats_key, {})
+            local[value] = local.get(value, 0) + 1
+            if client:
+                try:
+                    await client.hincrby(stats_key, value, 1)
+                except Exception as e:
+                    RedisCache.mark_unavailable(e)
+                    client = None
+
+    @classmethod
+    async def _likely_completions(
+        cls, entry_type: str, remaining: List[str], questions: Dict[str, Dict], limit: int
+    ) -> List[Dict[str, str]]:
+        """Most likely answer combinations for the remaining questions."""
+        choices = []
+        for key in remaining:
+            question = questions[key]
+            options = [o for o in question.get("options", []) if o.lower() != "other"]
+            if question.get("multiple_selection") or not options:
+                return []  # Free-form or multi-select answers can't be enumerated
+            counts = await cls._load_stats(entry_type, key)
+            total = sum(counts.get(o, 0) for o in options) + len(options)
+            # Laplace smoothing so unseen options still get a (small) chance
+            choices.append([(o, (counts.get(o, 0) + 1) / total) for o in options])
+
+        ranked = heapq.nlargest(
+            limit,
+            itertools.product(*choices),
+            key=lambda combo: math.prod(p for _, p in combo),
+        )
+        return [
+            {key: option for key, (option, _) in zip(remaining, combo)}
+            for combo in ranked
+        ]
+
+    @classmethod
+    async def _maybe_speculate(cls, session: Dict[str, Any]):
+        """Start speculative precomputation if the session is far enough along."""
+        if settings.SPECULATION_MAX_CANDIDATES <= 0:
+            return
+
+        entry_type = session["entry_type"]
+        answers = session["answers"]
+        questions = cls._flow_questions(entry_type)
+        if not questions:
+            return
+
+        answered = sum(1 for key in questions if key in answers)
+        if answered < math.ceil(len(questions) * settings.SPECULATION_MIN_PROGRESS):
+            return
+        remaining = [key for key in questions if key not in answers]
+        if len(remaining) > settings.SPECULATION_MAX_REMAINING:
+            return
+
+        session_id = session["session_id"]
+        specs = cls._speculations.get(session_id)
+        if specs is None:
+            specs = cls._speculations[session_id] = {}
+        running = sum(1 for spec in specs.values() if not spec["task"].done())
+        budget = min(
+            settings.SPECULATION_MAX_CANDIDATES - running,
+            settings.SPECULATION_SESSION_BUDGET - len(specs),
+        )
+        if budget <= 0:
+            return
+
+        if remaining:
+            completions = await cls._likely_completions(
+                entry_type, remaining, questions, settings.SPECULATION_MAX_CANDIDATES
+            )
+        else:
+            completions = [{}]
+
+        for completion in completions:
+            if budget <= 0 or cls._active >= settings.SPECULATION_MAX_CONCURRENT:
+                break
+            request = RecommendationRequest(
+                entry_type=entry_type,
+                answers={**answers, **completion},
+            )
+            cache_key = RedisCache.generate_cache_key(entry_type, request.answers)
+            if cache_key in specs:
+                continue
+            task = asyncio.create_task(cls._speculate(request))
+            task.add_done_callback(cls._on_speculation_done)
+            specs[cache_key] = {"answers": request.answers, "task": task}
+            cls._active += 1
+            budget -= 1
+            SPECULATIONS.inc(outcome="started")
+
+    @classmethod
+    async def _speculate(cls, request: RecommendationRequest):
+        try:
+            await cls._service.generate_recommendation_data(request)
+        except Exception as e:
+            logger.info(f"Speculative recommendation failed: {e}")
+
+    @classmethod
+    def _on_speculation_done(cls, task: asyncio.Task):
+        # Done callback rather than finally: a task cancelled before it starts never runs its body
+        cls._active -= 1
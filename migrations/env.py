@@ -0,0 +1,70 @@
+"""
+Alembic environment.
+
+Migrations run on the app's own DATABASE_URL (asyncpg). app.db.migrations
+passes in an open connection (`config.attributes["connection"]`) so the
+migrate command can run everything in one transaction under an advisory
+lock; the `alembic` CLI opens its own connection.
+"""
+import asyncio
+from logging.config import fileConfig
+
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from alembic import context
+
+from app.db.database import ASYNC_DATABASE_URL, connect_args
+from app.db.models import Base
+
+config = context.config
+
+# Only when run from the alembic CLI: inside the app this would replace its logging setup
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL instead of running it (`alembic upgrade head --sql`)."""
+    context.configure(
+        url=ASYNC_DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(connection=connection, target_metadata=target_metadata)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    connectable = create_async_engine(ASYNC_DATABASE_URL, poolclass=pool.NullPool, connect_args=connect_args())
+
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await connectable.dispose()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        do_run_migrations(connection)
+    else:
+        asyncio.run(run_async_migrations())
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
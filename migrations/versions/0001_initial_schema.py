@@ -0,0 +1,100 @@
+"""Initial schema: users, questionnaire responses and recommendations
+
+Databases created by the app's old create_all() startup are adopted at this
+revision by scripts/migrate.py; the later revisions are written to be safe on
+them whichever of the since-added tables and columns they already have.
+
+With DB_PARTITIONING_ENABLED the two append-only tables are created
+range-partitioned by month (see app/db/partitions.py).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.config import settings
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONED = settings.DB_PARTITIONING_ENABLED
+
+
+def _partitioned_table_args(name: str) -> list:
+    """Primary key (partitioned tables need the partition key in it) and partitioning option."""
+    if PARTITIONED:
+        return [sa.PrimaryKeyConstraint("id", "created_at", name=f"{name}_pkey")]
+    return [sa.PrimaryKeyConstraint("id", name=f"{name}_pkey")]
+
+
+def _partition_kwargs() -> dict:
+    return {"postgresql_partition_by": "RANGE (created_at)"} if PARTITIONED else {}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("external_user_id", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_users_external_user_id", "users", ["external_user_id"], unique=True)
+    op.create_index("ix_users_created_at", "users", ["created_at"])
+
+    op.create_table(
+        "questionnaire_responses",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("entry_type", sa.String(50), nullable=False),
+        sa.Column("answers", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        *_partitioned_table_args("questionnaire_responses"),
+        **_partition_kwargs(),
+    )
+    op.create_index("ix_questionnaire_responses_user_id", "questionnaire_responses", ["user_id"])
+    op.create_index("ix_questionnaire_responses_created_at", "questionnaire_responses", ["created_at"])
+
+    # Foreign keys into a partitioned table can't be declared
+    questionnaire_fk = () if PARTITIONED else (sa.ForeignKey("questionnaire_responses.id"),)
+    op.create_table(
+        "pathway_recommendations",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("questionnaire_response_id", postgresql.UUID(as_uuid=True), *questionnaire_fk, nullable=False),
+        sa.Column("recommended_pathway", sa.String(255), nullable=False),
+        sa.Column("confidence", sa.Float(), nullable=False),
+        sa.Column("spiritual_stage", sa.String(100), nullable=False),
+        sa.Column("primary_need", sa.String(100), nullable=False),
+        sa.Column("emotional_state", sa.String(100), nullable=False),
+        sa.Column("reasoning", sa.Text(), nullable=False),
+        sa.Column("next_step_message", sa.Text(), nullable=False),
+        sa.Column("raw_ai_response", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        *_partitioned_table_args("pathway_recommendations"),
+        **_partition_kwargs(),
+    )
+    op.create_index("ix_pathway_recommendations_user_id", "pathway_recommendations", ["user_id"])
+    op.create_index(
+        "ix_pathway_recommendations_recommended_pathway", "pathway_recommendations", ["recommended_pathway"]
+    )
+    op.create_index("ix_pathway_recommendations_created_at", "pathway_recommendations", ["created_at"])
+    op.create_index("ix_recommendations_user_created", "pathway_recommendations", ["user_id", "created_at"])
+    op.create_index(
+        "ix_recommendations_pathway_created", "pathway_recommendations", ["recommended_pathway", "created_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("pathway_recommendations")
+    op.drop_table("questionnaire_responses")
+    op.drop_table("users")
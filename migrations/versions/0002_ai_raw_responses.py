@@ -0,0 +1,41 @@
+"""Content-addressed storage of raw AI responses
+
+Adds ai_raw_responses and pathway_recommendations.raw_response_hash. Existing
+inline raw_ai_response values are moved by scripts/backfill_raw_responses.py.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Adopted databases may already have the table (create_all) and column
+    # (an earlier run of the backfill script)
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS ai_raw_responses ("
+        "content_hash VARCHAR(64) NOT NULL, "
+        "payload JSON NOT NULL, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+        "CONSTRAINT ai_raw_responses_pkey PRIMARY KEY (content_hash))"
+    )
+    op.execute(
+        "ALTER TABLE pathway_recommendations "
+        "ADD COLUMN IF NOT EXISTS raw_response_hash VARCHAR(64) "
+        "REFERENCES ai_raw_responses(content_hash)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("pathway_recommendations", "raw_response_hash")
+    op.drop_table("ai_raw_responses")
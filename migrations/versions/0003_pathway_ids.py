@@ -0,0 +1,57 @@
+"""Normalized pathway ids and profile enum codes on recommendations
+
+Existing rows are filled by scripts/backfill_pathway_ids.py, which drops the
+indexes on the free-text recommended_pathway column once it is done. On a
+database without rows to fill they are dropped here.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CODE_COLUMNS = ("pathway_id", "spiritual_stage_code", "primary_need_code", "emotional_state_code")
+
+TEXT_INDEXES = ("ix_recommendations_pathway_created", "ix_pathway_recommendations_recommended_pathway")
+
+
+def upgrade() -> None:
+    for column in CODE_COLUMNS:
+        op.execute(f"ALTER TABLE pathway_recommendations ADD COLUMN IF NOT EXISTS {column} SMALLINT")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_recommendations_pathway_id_created "
+        "ON pathway_recommendations (pathway_id, created_at)"
+    )
+
+    # Codes are always written (0 = unknown), so a NULL code marks a row still to backfill
+    drops = " ".join(f"DROP INDEX IF EXISTS {index};" for index in TEXT_INDEXES)
+    op.execute(
+        "DO $$ BEGIN "
+        "IF NOT EXISTS (SELECT 1 FROM pathway_recommendations WHERE spiritual_stage_code IS NULL) THEN "
+        f"{drops} "
+        "END IF; "
+        "END $$"
+    )
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_pathway_recommendations_recommended_pathway", "pathway_recommendations", ["recommended_pathway"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_recommendations_pathway_created", "pathway_recommendations", ["recommended_pathway", "created_at"],
+        if_not_exists=True,
+    )
+    op.drop_index("ix_recommendations_pathway_id_created", "pathway_recommendations")
+    for column in CODE_COLUMNS:
+        op.drop_column("pathway_recommendations", column)
@@ -0,0 +1,40 @@
+"""Hourly pathway rollups for analytics
+
+The app keeps the rollups current as it writes; fill them for existing
+recommendations with scripts/rebuild_rollups.py.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Adopted databases may already have the table (create_all)
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS pathway_rollups ("
+        "bucket TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+        "pathway_id SMALLINT NOT NULL, "
+        "entry_type VARCHAR(50) NOT NULL, "
+        "spiritual_stage_code SMALLINT NOT NULL, "
+        "primary_need_code SMALLINT NOT NULL, "
+        "emotional_state_code SMALLINT NOT NULL, "
+        "recommendation_count INTEGER NOT NULL, "
+        "confidence_sum FLOAT NOT NULL, "
+        "CONSTRAINT pathway_rollups_pkey PRIMARY KEY "
+        "(bucket, pathway_id, entry_type, spiritual_stage_code, primary_need_code, emotional_state_code))"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("pathway_rollups")
@@ -0,0 +1,39 @@
+"""API key registry for multi-tenant access
+
+Keys are added with scripts/api_keys.py; the API_KEY setting keeps working
+as the "default" tenant.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "api_keys",
+        sa.Column("key_hash", sa.String(length=64), nullable=False),
+        sa.Column("key_prefix", sa.String(length=16), nullable=False),
+        sa.Column("tenant", sa.String(length=100), nullable=False),
+        sa.Column("tier", sa.String(length=20), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("revoked_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("key_hash", name="api_keys_pkey"),
+    )
+    op.create_index("ix_api_keys_tenant", "api_keys", ["tenant"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_api_keys_tenant", table_name="api_keys")
+    op.drop_table("api_keys")
@@ -3,17 +3,25 @@ Entry point for running the application.
 
 Usage:
     python run.py                    # Development mode (single worker, auto-reload)
-    python run.py --production       # Production mode (4 workers, no reload)
+    python run.py --production       # Production mode (WEB_CONCURRENCY workers, default 4, no reload)
+    python run.py --no-migrate       # Skip the schema migration step
 
-Or use uvicorn directly:
+Database migrations are applied once, before any worker starts.
+
+Or use uvicorn directly (apply migrations first):
+    python scripts/migrate.py
     uvicorn app.main:app --reload    # Development
-    uvicorn app.main:app --workers 4 # Production
+    uvicorn app.main:app --workers 4 # Production (set METRICS_MULTIPROC_DIR to an
+                                     # empty directory for metrics across workers)
 """
 
+import os
 import sys
+import tempfile
 import uvicorn
 
 from app.config import settings
+from app.db.migrations import migrate
 
 
 def main():
@@ -21,19 +29,30 @@ def main():
     # Check for production flag
     production = "--production" in sys.argv or "-p" in sys.argv
 
+    # Once here rather than in every worker's startup
+    if "--no-migrate" not in sys.argv:
+        before, after = migrate()
+        if before != after:
+            print(f"Migrated database schema from {before or 'empty'} to {after}")
+
     if production or not settings.DEBUG:
         # Production mode
         print("Starting in PRODUCTION mode...")
+        # A fresh directory per start, so /metrics sums only this deployment's workers
+        if not settings.METRICS_MULTIPROC_DIR:
+            os.environ["METRICS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="logosreach-metrics-")
         uvicorn.run(
             "app.main:app",
             host="0.0.0.0",
             port=8000,
-            workers=4,
+            workers=settings.WEB_CONCURRENCY,
             log_level="info"
         )
     else:
         # Development mode
         print("Starting in DEVELOPMENT mode...")
+        # Single worker: its pool may use the whole connection budget
+        os.environ["WEB_CONCURRENCY"] = "1"
         uvicorn.run(
             "app.main:app",
             host="0.0.0.0",
@@ -0,0 +1,110 @@
+"""
+Manage tenant API keys in the api_keys table.
+
+A new key is printed once and only its sha256 hash is stored. Running
+workers pick up changes within API_KEYS_REFRESH_SECONDS. For deployments
+using API_KEYS_FILE instead, `hash` prints the file entry for a key.
+
+Usage:
+    python scripts/api_keys.py create --tenant acme --tier batch
+    python scripts/api_keys.py list
+    python scripts/api_keys.py revoke --prefix lr_AbCdEf
+    python scripts/api_keys.py hash --tenant acme --tier batch KEY
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import asyncio
+import json
+import secrets
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from app.core.tenants import TenantRegistry, Tier
+from app.db.database import AsyncSessionLocal, async_engine
+from app.db.models import ApiKey
+
+KEY_PREFIX_LENGTH = 11  # "lr_" + 8 random characters
+
+
+async def create(tenant: str, tier: Tier):
+    key = f"lr_{secrets.token_urlsafe(32)}"
+    async with AsyncSessionLocal() as db:
+        db.add(ApiKey(
+            key_hash=TenantRegistry.hash_key(key),
+            key_prefix=key[:KEY_PREFIX_LENGTH],
+            tenant=tenant,
+            tier=tier.value,
+        ))
+        await db.commit()
+    print(f"Created {tier.value} key for tenant '{tenant}' (store it now, it is not shown again):")
+    print(key)
+
+
+async def list_keys():
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(ApiKey).order_by(ApiKey.tenant, ApiKey.created_at))).scalars().all()
+    print(f"{'prefix':<13} {'tenant':<24} {'tier':<12} {'created':<20} revoked")
+    for row in rows:
+        revoked = row.revoked_at.strftime("%Y-%m-%d %H:%M") if row.revoked_at else "-"
+        print(f"{row.key_prefix:<13} {row.tenant:<24} {row.tier:<12} {row.created_at:%Y-%m-%d %H:%M}     {revoked}")
+
+
+async def revoke(prefix: str):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(ApiKey)
+            .where(ApiKey.key_prefix == prefix, ApiKey.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow())
+        )
+        await db.commit()
+    print(f"Revoked {result.rowcount} key(s) with prefix {prefix}")
+
+
+async def run(args):
+    try:
+        if args.command == "create":
+            await create(args.tenant, Tier(args.tier))
+        elif args.command == "list":
+            await list_keys()
+        else:
+            await revoke(args.prefix)
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    tiers = [tier.value for tier in Tier]
+
+    create_parser = commands.add_parser("create", help="Create a key and print it")
+    create_parser.add_argument("--tenant", required=True)
+    create_parser.add_argument("--tier", choices=tiers, default=Tier.INTERACTIVE.value)
+
+    commands.add_parser("list", help="List keys (prefixes only)")
+
+    revoke_parser = commands.add_parser("revoke", help="Revoke the keys with a prefix")
+    revoke_parser.add_argument("--prefix", required=True)
+
+    hash_parser = commands.add_parser("hash", help="Print an API_KEYS_FILE entry for a key")
+    hash_parser.add_argument("--tenant", required=True)
+    hash_parser.add_argument("--tier", choices=tiers, default=Tier.INTERACTIVE.value)
+    hash_parser.add_argument("key")
+
+    args = parser.parse_args()
+    if args.command == "hash":
+        print(json.dumps({"tenant": args.tenant, "key_sha256": TenantRegistry.hash_key(args.key), "tier": args.tier}))
+        return
+    if AsyncSessionLocal is None:
+        parser.error("DATABASE_URL is not set")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Backfill pathway ids and profile enum codes on existing recommendations.
+
+Run after `python scripts/migrate.py`, which adds the pathway_id / *_code
+columns and the (pathway_id, created_at) index. Resolves the free-text
+recommended_pathway and profile fields of older rows in batches (see
+app/services/pathways.py). Each batch commits on its own, so the script can be
+stopped and re-run. Once every row is filled, the indexes on the free-text
+recommended_pathway column are dropped (skip with --keep-text-indexes).
+
+Usage:
+    python scripts/backfill_pathway_ids.py
+    python scripts/backfill_pathway_ids.py --batch-size 5000 --keep-text-indexes
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from sqlalchemy import bindparam, select, text, update
+
+from app.db.database import async_engine
+from app.db.models import PathwayRecommendationRecord
+from app.schemas import EmotionalState, PrimaryNeed, SpiritualStage
+from app.services.pathways import profile_code, resolve_pathway_id
+
+TEXT_INDEXES = [
+    "ix_recommendations_pathway_created",
+    "ix_pathway_recommendations_recommended_pathway",
+]
+
+
+async def backfill(batch_size: int, keep_text_indexes: bool):
+    records = PathwayRecommendationRecord.__table__
+    # Codes are always written (0 = unknown), so a NULL code marks an unprocessed row
+    pending = (
+        select(
+            records.c.id,
+            records.c.created_at,
+            records.c.recommended_pathway,
+            records.c.spiritual_stage,
+            records.c.primary_need,
+            records.c.emotional_state,
+        )
+        .where(records.c.spiritual_stage_code.is_(None))
+        .limit(batch_size)
+    )
+    fill = (
+        update(records)
+        .where(records.c.id == bindparam("row_id"), records.c.created_at == bindparam("row_created_at"))
+        .values(
+            pathway_id=bindparam("new_pathway_id"),
+            spiritual_stage_code=bindparam("stage"),
+            primary_need_code=bindparam("need"),
+            emotional_state_code=bindparam("state"),
+        )
+    )
+
+    rows_done, unresolved, start = 0, Counter(), time.perf_counter()
+    while True:
+        async with async_engine.begin() as conn:
+            rows = (await conn.execute(pending)).all()
+            if not rows:
+                break
+            params = []
+            for row in rows:
+                pathway_id = resolve_pathway_id(row.recommended_pathway)
+                if pathway_id is None:
+                    unresolved[row.recommended_pathway] += 1
+                params.append({
+                    "row_id": row.id,
+                    "row_created_at": row.created_at,
+                    "new_pathway_id": pathway_id,
+                    "stage": profile_code(SpiritualStage, row.spiritual_stage),
+                    "need": profile_code(PrimaryNeed, row.primary_need),
+                    "state": profile_code(EmotionalState, row.emotional_state),
+                })
+            await conn.execute(fill, params)
+
+        rows_done += len(rows)
+        elapsed = time.perf_counter() - start
+        print(f"{rows_done} rows filled ({rows_done / elapsed:.0f} rows/s)")
+
+    if not keep_text_indexes:
+        async with async_engine.begin() as conn:
+            for index in TEXT_INDEXES:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+
+    await async_engine.dispose()
+    print(f"\nDone: {rows_done} rows filled, {sum(unresolved.values())} with an unresolved pathway.")
+    for name, count in unresolved.most_common(10):
+        print(f"  {count:6d}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=2000, help="Rows per transaction (default 2000)")
+    parser.add_argument(
+        "--keep-text-indexes", action="store_true",
+        help="Keep the indexes on the free-text recommended_pathway column",
+    )
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size, args.keep_text_indexes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Move inline raw AI responses into the content-addressed ai_raw_responses table.
+
+Run after `python scripts/migrate.py`, which adds the ai_raw_responses table
+and the pathway_recommendations.raw_response_hash column. Batch by batch, it
+hashes each row's raw_ai_response, stores every distinct payload once, points
+the row at its hash and clears the inline copy. Each batch commits on its own,
+so the script can be stopped and re-run at any time. Afterwards, run VACUUM (or wait for autovacuum)
+so Postgres can reuse the freed TOAST space.
+
+Usage:
+    python scripts/backfill_raw_responses.py
+    python scripts/backfill_raw_responses.py --batch-size 500 --keep-inline
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.db.database import async_engine
+from app.db.models import AIRawResponse, PathwayRecommendationRecord
+
+
+async def backfill(batch_size: int, keep_inline: bool):
+    records = PathwayRecommendationRecord.__table__
+    pending = (
+        select(records.c.id, records.c.created_at, records.c.raw_ai_response)
+        .where(records.c.raw_ai_response.isnot(None), records.c.raw_response_hash.is_(None))
+        .limit(batch_size)
+    )
+    # Row updates carry created_at too, so partitioned tables only touch one partition
+    point_at_hash = (
+        update(records)
+        .where(records.c.id == bindparam("row_id"), records.c.created_at == bindparam("row_created_at"))
+        .values(raw_response_hash=bindparam("hash"))
+    )
+    if not keep_inline:
+        point_at_hash = point_at_hash.values(raw_ai_response=None)
+
+    rows_done, start = 0, time.perf_counter()
+    while True:
+        async with async_engine.begin() as conn:
+            rows = (await conn.execute(pending)).all()
+            if not rows:
+                break
+
+            row_hashes = [AIRawResponse.hash_payload(row.raw_ai_response) for row in rows]
+            distinct = {h: row.raw_ai_response for h, row in zip(row_hashes, rows)}
+            await conn.execute(
+                pg_insert(AIRawResponse).on_conflict_do_nothing(index_elements=["content_hash"]),
+                [{"content_hash": h, "payload": payload} for h, payload in distinct.items()],
+            )
+            await conn.execute(
+                point_at_hash,
+                [
+                    {"row_id": row.id, "row_created_at": row.created_at, "hash": h}
+                    for h, row in zip(row_hashes, rows)
+                ],
+            )
+
+        rows_done += len(rows)
+        elapsed = time.perf_counter() - start
+        print(f"{rows_done} rows moved ({rows_done / elapsed:.0f} rows/s)")
+
+    async with async_engine.connect() as conn:
+        stored = (await conn.execute(select(func.count()).select_from(AIRawResponse.__table__))).scalar()
+    await async_engine.dispose()
+    print(f"\nDone: {rows_done} rows now reference {stored} stored payloads.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per transaction (default 1000)")
+    parser.add_argument(
+        "--keep-inline", action="store_true",
+        help="Keep raw_ai_response on the rows (only link them to their hash)",
+    )
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size, args.keep_inline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Fuzz and benchmark the tolerant AI response parser.
+
+Checks every case in scripts/ai_response_corpus.json, then mutates the
+valid corpus entries at random (truncation, dropped/duplicated characters,
+stray commas and quotes) and verifies the parser only ever returns a dict
+or raises AIResponseParseError. Finally times the parser on each corpus case.
+
+Usage:
+    python scripts/bench_ai_parser.py
+    python scripts/bench_ai_parser.py --iterations 50000 --seed 7
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import json
+import random
+import time
+
+from app.services.ai_parser import AIResponseParseError, parse_ai_response
+
+CORPUS_PATH = Path(__file__).resolve().parent / "ai_response_corpus.json"
+
+
+def check_corpus(corpus: list) -> int:
+    """Verify expected outcome for each corpus case. Returns failure count."""
+    failures = 0
+    for case in corpus:
+        try:
+            data, missing = parse_ai_response(case["content"])
+            ok = not case.get("error") and sorted(missing) == sorted(case["missing"])
+        except AIResponseParseError:
+            ok = bool(case.get("error"))
+            missing = "error"
+        if not ok:
+            failures += 1
+            print(f"  FAIL {case['name']}: got {missing}, expected {case.get('missing', 'error')}")
+    print(f"Corpus: {len(corpus) - failures}/{len(corpus)} cases passed")
+    return failures
+
+
+def mutate(content: str, rng: random.Random) -> str:
+    """Apply one random defect to content."""
+    pos = rng.randrange(len(content))
+    choice = rng.randrange(5)
+    if choice == 0:
+        return content[:pos]
+    if choice == 1:
+        return content[:pos] + content[pos + 1:]
+    if choice == 2:
+        return content[:pos] + rng.choice(',"{}[]:\\\n') + content[pos:]
+    if choice == 3:
+        return content[:pos] + content[pos] + content[pos:]
+    end = min(len(content), pos + rng.randrange(1, 40))
+    return content[:pos] + content[end:]
+
+
+def fuzz(corpus: list, iterations: int, seed: int) -> int:
+    """Run random mutations through the parser. Returns crash count."""
+    rng = random.Random(seed)
+    seeds = [case["content"] for case in corpus if not case.get("error")]
+    crashes = 0
+    for _ in range(iterations):
+        content = seeds[rng.randrange(len(seeds))]
+        for _ in range(rng.randrange(1, 4)):
+            if content:
+                content = mutate(content, rng)
+        try:
+            data, missing = parse_ai_response(content)
+            assert isinstance(data, dict) and isinstance(missing, list)
+        except AIResponseParseError:
+            pass
+        except Exception as e:
+            crashes += 1
+            if crashes <= 5:
+                print(f"  CRASH {type(e).__name__}: {e}\n    input: {content!r}")
+    print(f"Fuzz: {iterations} mutated inputs, {crashes} unexpected exceptions")
+    return crashes
+
+
+def benchmark(corpus: list, rounds: int) -> None:
+    """Print per-call parse time for each corpus case."""
+    print(f"\n{'case':<24}{'us/call':>10}")
+    for case in corpus:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            try:
+                parse_ai_response(case["content"])
+            except AIResponseParseError:
+                pass
+        elapsed = (time.perf_counter() - start) / rounds * 1e6
+        print(f"{case['name']:<24}{elapsed:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = json.loads(CORPUS_PATH.read_text(encoding="utf-8"))
+    failures = check_corpus(corpus)
+    failures += fuzz(corpus, args.iterations, args.seed)
+    benchmark(corpus, args.rounds)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark the cost of the Prometheus metrics (app/core/metrics.py).
+
+Reports:
+- the time per metric update on the request path (labelled Counter.inc,
+  Histogram.observe, Gauge.set);
+- the cost of one /recommend cache hit's worth of updates;
+- how long a /metrics scrape takes for one worker and, with snapshots of
+  --workers other workers in a temporary METRICS_MULTIPROC_DIR, for all of
+  them (the scrape cost, not per request).
+
+Series are first filled with --series label combinations per metric, so the
+render and merge numbers reflect a warmed-up worker.
+
+Usage:
+    python scripts/bench_metrics.py
+    python scripts/bench_metrics.py --iterations 1000000 --workers 16
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+from app.config import settings
+import app.main  # noqa: F401  (registers every metric of the app)
+from app.core.cache import CACHE_LOOKUPS
+from app.core.load_shedding import HTTP_IN_FLIGHT
+from app.core.metrics import REGISTRY, Counter, Histogram
+from app.core.quota import QUOTA_DECISIONS
+from app.core.rate_limit import RATE_LIMIT_CHECKS
+from app.services.recommendation import RECOMMENDATION_SECONDS
+
+
+def per_op(label: str, fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    seconds = (time.perf_counter() - start) / iterations
+    print(f"{label:<36} {seconds * 1e9:8.0f} ns")
+    return seconds
+
+
+def recommend_cache_hit():
+    # Updates made while serving one /recommend cache hit
+    RATE_LIMIT_CHECKS.inc(source="local", result="allowed")
+    CACHE_LOOKUPS.inc(layer="redis", result="hit")
+    QUOTA_DECISIONS.inc(kind="cache_hit", result="allowed")
+    RECOMMENDATION_SECONDS.observe(0.042, cache="hit", status="success")
+
+
+def fill_series(series: int):
+    for metric in REGISTRY._metrics:
+        for i in range(series):
+            labels = {name: f"{name}{i}" for name in metric.labelnames}
+            if isinstance(metric, Histogram):
+                metric.observe(0.1 * i, **labels)
+            elif isinstance(metric, Counter):
+                metric.inc(**labels)
+            else:
+                metric.set(i, **labels)
+            if not metric.labelnames:
+                break
+
+
+async def time_render(multiproc_dir: str, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await REGISTRY.render(multiproc_dir)
+    return (time.perf_counter() - start) / rounds
+
+
+async def main_async(args):
+    settings.REDIS_URL = ""
+
+    print(f"Per update ({args.iterations} iterations):")
+    per_op("Counter.inc (2 labels)", lambda: RATE_LIMIT_CHECKS.inc(source="local", result="allowed"), args.iterations)
+    per_op("Histogram.observe (2 labels)", lambda: RECOMMENDATION_SECONDS.observe(0.042, cache="hit", status="success"), args.iterations)
+    per_op("Gauge.set (no labels)", lambda: HTTP_IN_FLIGHT.set(3), args.iterations)
+    per_op("/recommend cache hit (4 updates)", recommend_cache_hit, args.iterations)
+
+    fill_series(args.series)
+    snapshot = json.dumps({metric.name: metric.snapshot() for metric in REGISTRY._metrics})
+    series = sum(len(metric._values) for metric in REGISTRY._metrics)
+    print(f"\nScrape ({len(REGISTRY._metrics)} metrics, {series} series per worker, {args.rounds} rounds):")
+    print(f"{'this worker only':<36} {await time_render('', args.rounds) * 1e3:8.2f} ms")
+    with tempfile.TemporaryDirectory() as multiproc_dir:
+        for i in range(args.workers):
+            # Pids of exited processes: counters and histograms are merged, gauges skipped
+            (Path(multiproc_dir) / f"{4_000_000 + i}.json").write_text(snapshot)
+        label = f"+ {args.workers} worker snapshots"
+        print(f"{label:<36} {await time_render(multiproc_dir, args.rounds) * 1e3:8.2f} ms")
+        start = time.perf_counter()
+        await REGISTRY.write_snapshot(multiproc_dir)
+        print(f"{'write_snapshot (every interval)':<36} {(time.perf_counter() - start) * 1e3:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200000, help="Updates per measurement (default 200000)")
+    parser.add_argument("--series", type=int, default=10, help="Label combinations per metric (default 10)")
+    parser.add_argument("--workers", type=int, default=4, help="Other workers' snapshots to merge (default 4)")
+    parser.add_argument("--rounds", type=int, default=20, help="Scrapes per measurement (default 20)")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark the per-request overhead of rate limiting: slowapi vs the GCRA limiter.
+
+Sends --requests sequential requests through three in-process apps with the
+same trivial route (no limit, slowapi's fixed window, app/core/rate_limit.py)
+and reports the mean time per request, the overhead over no limit and how
+many requests were rejected. The default limit is high enough that nothing
+is rejected, so only the cost of checking is measured. Requests rotate over
+--clients API keys.
+
+By default both limiters keep their state in memory; with --redis both use
+REDIS_URL, which is where the GCRA limiter's local token reservations matter.
+
+Usage:
+    python scripts/bench_rate_limit.py
+    python scripts/bench_rate_limit.py --redis --requests 5000 --clients 10
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded as SlowapiRateLimitExceeded
+
+from app.config import settings
+from app.core.cache import RedisCache
+from app.core.rate_limit import (
+    RATE_LIMIT_CHECKS,
+    RateLimiter,
+    RateLimitExceeded,
+    RateLimitHeadersMiddleware,
+    get_api_key_or_ip,
+    rate_limit_exceeded_handler,
+)
+
+
+def unlimited_app(limit: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping(request: Request):
+        return {"ok": True}
+
+    return app
+
+
+def slowapi_app(limit: str, redis: bool) -> FastAPI:
+    limiter = Limiter(
+        key_func=get_api_key_or_ip,
+        storage_uri=settings.REDIS_URL if redis else "memory://",
+        strategy="fixed-window",
+    )
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.add_exception_handler(SlowapiRateLimitExceeded, _rate_limit_exceeded_handler)
+
+    @app.get("/ping")
+    @limiter.limit(limit)
+    async def ping(request: Request):
+        return {"ok": True}
+
+    return app
+
+
+def gcra_app(limit: str) -> FastAPI:
+    limiter = RateLimiter(key_func=get_api_key_or_ip)
+    app = FastAPI()
+    app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+    app.add_middleware(RateLimitHeadersMiddleware)
+
+    @app.get("/ping")
+    @limiter.limit(limit)
+    async def ping(request: Request):
+        return {"ok": True}
+
+    return app
+
+
+async def run(app: FastAPI, requests: int, clients: int):
+    """Mean seconds per request and the number of rejected (429) requests."""
+    headers = [{"X-API-Key": f"bench-client-{i:08d}"} for i in range(clients)]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up (route compilation, Redis connections, first reservations)
+        for h in headers:
+            await client.get("/ping", headers=h)
+        rejected = 0
+        start = time.perf_counter()
+        for i in range(requests):
+            response = await client.get("/ping", headers=headers[i % clients])
+            if response.status_code == 429:
+                rejected += 1
+            elif response.status_code != 200:
+                raise RuntimeError(f"Unexpected {response.status_code}: {response.text}")
+        return (time.perf_counter() - start) / requests, rejected
+
+
+async def main_async(args):
+    if not args.redis:
+        settings.REDIS_URL = ""
+    elif await RedisCache.get_available_client() is None:
+        raise SystemExit(f"Redis at {settings.REDIS_URL} is not reachable")
+
+    baseline, _ = await run(unlimited_app(args.limit), args.requests, args.clients)
+    results = [
+        ("no limit", (baseline, 0)),
+        ("slowapi", await run(slowapi_app(args.limit, args.redis), args.requests, args.clients)),
+        ("gcra", await run(gcra_app(args.limit), args.requests, args.clients)),
+    ]
+
+    storage = f"Redis ({settings.REDIS_URL})" if args.redis else "memory"
+    print(f"{args.requests} requests, {args.clients} clients, limit {args.limit}, storage: {storage}")
+    for name, (seconds, rejected) in results:
+        print(
+            f"{name:<10} {seconds * 1e6:9.1f} us/request | "
+            f"overhead {(seconds - baseline) * 1e6:8.1f} us | rejected {rejected}"
+        )
+    sources = {}
+    for (source, _), count in RATE_LIMIT_CHECKS._values.items():
+        sources[source] = sources.get(source, 0) + int(count)
+    print("gcra checks by source: " + ", ".join(f"{k}={v}" for k, v in sorted(sources.items())))
+    await RedisCache.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per limiter (default 2000)")
+    parser.add_argument("--clients", type=int, default=1, help="Distinct API keys (default 1)")
+    parser.add_argument("--limit", default="1000000/minute", help="Limit for both limiters (default 1000000/minute)")
+    parser.add_argument("--redis", action="store_true", help="Keep limiter state in REDIS_URL instead of memory")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Check that the history cache never serves a stale page under concurrent writes.
+
+Creates a throwaway user, then runs --writers tasks that store
+recommendations for it through RecommendationService._store_recommendation
+alongside --readers tasks that keep reading its history through
+get_user_history (each operation on its own session, like separate
+requests). Before each read, a reader notes every record whose write had
+fully finished (commit and cache invalidation); the page it gets back must
+contain all of them. A page missing one is stale and fails the check
+(exit status 1). Readers go on for --settle seconds after each round's
+last write, when a stale page would no longer be replaced by the next one,
+and each history query is followed by a random pause of up to --delay
+seconds, so writes regularly land between a read's query and its cache
+store.
+
+Writes stop at HISTORY_MAX_LIMIT records, so the whole history fits on the
+one page the readers request. Readers that find the page cached get it
+from HistoryCache, so a good share of the reads exercise the cache. The
+user's rows, and their counts in the analytics rollups, are removed
+afterwards.
+
+Needs DATABASE_URL (a development database: it writes real rows for the
+duration). Uses REDIS_URL when reachable, the in-memory fallback otherwise
+or with --memory.
+
+Usage:
+    python scripts/check_history_cache.py
+    python scripts/check_history_cache.py --writers 8 --readers 16 --rounds 5 --memory
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import delete, func, select, update
+
+from app.config import settings
+from app.core.cache import RedisCache
+from app.core.history_cache import HISTORY_CACHE_REQUESTS
+from app.db.database import AsyncSessionLocal, async_engine
+from app.db.models import PathwayRecommendationRecord, PathwayRollup, QuestionnaireResponse, User
+from app.schemas import DetectedProfile, EmotionalState, PathwayRecommendation, PrimaryNeed, SpiritualStage
+from app.services.recommendation import RecommendationService
+
+R = PathwayRecommendationRecord
+Q = QuestionnaireResponse
+
+
+def sample_recommendation(n: int) -> PathwayRecommendation:
+    return PathwayRecommendation(
+        recommended_pathway=random.choice(settings.PATHWAYS)["name"],
+        confidence=round(random.uniform(0.5, 1.0), 2),
+        detected_profile=DetectedProfile(
+            spiritual_stage=random.choice(list(SpiritualStage)).value,
+            primary_need=random.choice(list(PrimaryNeed)).value,
+            emotional_state=random.choice(list(EmotionalState)).value,
+        ),
+        reasoning=f"History cache check record {n}",
+        next_step_message="-",
+    )
+
+
+class SlowHistoryService(RecommendationService):
+    """Pauses after each history query, widening the window between a read's query and its cache store."""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    async def _query_history(self, *args, **kwargs):
+        result = await super()._query_history(*args, **kwargs)
+        await asyncio.sleep(random.uniform(0, self.delay))
+        return result
+
+
+async def writer(service: RecommendationService, user_id, records: int, completed: list, counter: list):
+    while counter[0] < records:
+        counter[0] += 1
+        n = counter[0]
+        async with AsyncSessionLocal() as db:
+            questionnaire = await service._store_questionnaire_response(db, user_id, "no_im_new", {"Q1": str(n)})
+            record = await service._store_recommendation(
+                db, user_id, questionnaire, sample_recommendation(n), {"check": n}
+            )
+        # Recorded only now: _store_recommendation has committed and invalidated
+        completed.append(str(record.id))
+        await asyncio.sleep(random.uniform(0, 0.01))
+
+
+async def reader(service: RecommendationService, user_id: str, done: asyncio.Event, completed: list, stats: dict):
+    while not done.is_set():
+        expected = set(completed)
+        async with AsyncSessionLocal() as db:
+            records, _ = await service.get_user_history(db, user_id, settings.HISTORY_MAX_LIMIT)
+        missing = expected - {r["id"] for r in records}
+        stats["reads"] += 1
+        if missing:
+            stats["stale"] += 1
+            print(f"STALE: page missing {len(missing)} of {len(expected)} finished writes")
+        await asyncio.sleep(random.uniform(0, 0.005))
+
+
+async def cleanup(user_id):
+    """Delete the user's rows and take their counts back out of the rollups."""
+    bucket = func.date_trunc("hour", R.created_at)
+    dimensions = [
+        bucket,
+        func.coalesce(R.pathway_id, 0),
+        Q.entry_type,
+        func.coalesce(R.spiritual_stage_code, 0),
+        func.coalesce(R.primary_need_code, 0),
+        func.coalesce(R.emotional_state_code, 0),
+    ]
+    async with async_engine.begin() as conn:
+        rows = (await conn.execute(
+            select(*dimensions, func.count(), func.sum(R.confidence))
+            .join(Q, Q.id == R.questionnaire_response_id)
+            .where(R.user_id == user_id)
+            .group_by(*dimensions)
+        )).all()
+        for row in rows:
+            *key, count, confidence = row
+            match = [
+                column == value
+                for column, value in zip(
+                    [
+                        PathwayRollup.bucket,
+                        PathwayRollup.pathway_id,
+                        PathwayRollup.entry_type,
+                        PathwayRollup.spiritual_stage_code,
+                        PathwayRollup.primary_need_code,
+                        PathwayRollup.emotional_state_code,
+                    ],
+                    key,
+                )
+            ]
+            await conn.execute(update(PathwayRollup).where(*match).values(
+                recommendation_count=PathwayRollup.recommendation_count - count,
+                confidence_sum=PathwayRollup.confidence_sum - confidence,
+            ))
+        await conn.execute(delete(PathwayRollup).where(PathwayRollup.recommendation_count <= 0))
+        await conn.execute(delete(R).where(R.user_id == user_id))
+        await conn.execute(delete(Q).where(Q.user_id == user_id))
+        await conn.execute(delete(User).where(User.id == user_id))
+
+
+async def run(writers: int, readers: int, rounds: int, settle: float, delay: float, memory: bool) -> bool:
+    if memory:
+        settings.REDIS_URL = ""
+    backend = "redis" if await RedisCache.get_available_client() else "in-memory fallback"
+    service = SlowHistoryService(delay)
+    stats = {"reads": 0, "stale": 0}
+    hits_before = dict((tuple(k), v) for k, v in HISTORY_CACHE_REQUESTS.snapshot()).get(("hit",), 0)
+
+    start = time.perf_counter()
+    for round_number in range(rounds):
+        async with AsyncSessionLocal() as db:
+            user = User()
+            db.add(user)
+            await db.commit()
+            user_id = user.id
+        try:
+            completed, counter, done = [], [0], asyncio.Event()
+            reader_tasks = [
+                asyncio.create_task(reader(service, str(user_id), done, completed, stats))
+                for _ in range(readers)
+            ]
+            await asyncio.gather(*(
+                writer(service, user_id, settings.HISTORY_MAX_LIMIT, completed, counter)
+                for _ in range(writers)
+            ))
+            # Keep reading after the last write: a stale page cached by then
+            # would otherwise never be read before the next write drops it
+            await asyncio.sleep(settle)
+            done.set()
+            await asyncio.gather(*reader_tasks)
+        finally:
+            await cleanup(user_id)
+        print(f"Round {round_number + 1}: {len(completed)} writes, {stats['reads']} reads so far")
+
+    hits = dict((tuple(k), v) for k, v in HISTORY_CACHE_REQUESTS.snapshot()).get(("hit",), 0) - hits_before
+    print(f"\nCache backend: {backend}")
+    print(f"{rounds} rounds in {time.perf_counter() - start:.1f}s: {stats['reads']} reads "
+          f"({hits:.0f} served from the cache), {stats['stale']} stale")
+    await RedisCache.close()
+    await async_engine.dispose()
+    return stats["stale"] == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4, help="Concurrent writers (default: 4)")
+    parser.add_argument("--readers", type=int, default=8, help="Concurrent readers (default: 8)")
+    parser.add_argument("--rounds", type=int, default=3, help="Throwaway users to run through (default: 3)")
+    parser.add_argument(
+        "--settle", type=float, default=0.5,
+        help="Seconds readers keep going after each round's last write (default: 0.5)",
+    )
+    parser.add_argument(
+        "--delay", type=float, default=0.02,
+        help="Up to this many seconds of extra latency after each history query (default: 0.02)",
+    )
+    parser.add_argument("--memory", action="store_true", help="Use the in-memory cache instead of Redis")
+    args = parser.parse_args()
+    if AsyncSessionLocal is None:
+        sys.exit("DATABASE_URL is not set")
+    ok = asyncio.run(run(args.writers, args.readers, args.rounds, args.settle, args.delay, args.memory))
+    print("OK: no stale pages" if ok else "FAILED: stale pages were served")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
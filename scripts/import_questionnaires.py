@@ -0,0 +1,507 @@
+"""
+Bulk import historical questionnaire responses (and optionally their
+recommendations) without going through /recommend or the AI.
+
+Input files are NDJSON (.ndjson / .jsonl) or CSV (.csv):
+
+    NDJSON: {"user_id": "ext-1", "entry_type": "no_im_new", "answers": {"Q1": "..."},
+             "created_at": "2024-05-01T10:00:00",
+             "recommendation": {"recommended_pathway": "...", "confidence": 0.8,
+                                "detected_profile": {...}, "reasoning": "...",
+                                "next_step_message": "..."}}
+    CSV:    user_id, entry_type, created_at, then either an `answers` column
+            (JSON) or Q1..Qn columns, plus optional recommended_pathway,
+            confidence, spiritual_stage, primary_need, emotional_state,
+            reasoning, next_step_message
+
+user_id, created_at (UTC) and the recommendation are optional. Rows without
+created_at get the input file's modification time, fixed in the checkpoint
+the first time the file is imported, so a re-run gives them the same value.
+Rows are validated with the same rules as POST /recommend; the validators run
+once per distinct answer rather than once per row, and only failing rows go
+through full model validation. Invalid rows go to the rejects file with the reason.
+
+Each batch upserts its users (through a temp table) and COPYs the
+questionnaire responses and recommendations in one transaction, then records
+its position in the checkpoint file, so an interrupted import resumes where it
+stopped. Row ids are derived from file name and row number, so a batch that was
+committed but not checkpointed is detected and not imported twice: its rows are
+skipped by id (with DB_PARTITIONING_ENABLED the primary key also includes
+created_at, so each batch is first checked for existing ids rather than
+relying on key conflicts).
+
+Afterwards, rebuild the analytics rollups for the imported range (the script
+prints the command). Cached history pages of existing users refresh within
+HISTORY_CACHE_TTL.
+
+Usage:
+    python scripts/import_questionnaires.py legacy/*.ndjson
+    python scripts/import_questionnaires.py export.csv --batch-size 20000 --rejects bad.ndjson
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import asyncpg
+from pydantic import TypeAdapter, ValidationError
+
+from app.config import settings
+from app.db.database import async_engine
+from app.db.partitions import ensure_partitions, month_start
+from app.schemas import (
+    EmotionalState,
+    EntryType,
+    PathwayRecommendation,
+    PrimaryNeed,
+    RecommendationRequest,
+    SpiritualStage,
+)
+from app.services.pathways import profile_code, resolve_pathway_id
+
+# Namespace for deterministic row ids (file name + row number)
+IMPORT_NAMESPACE = uuid.UUID("5b7c1f0e-3f0a-4d7e-9a57-2f1a6d0c9b11")
+
+QUESTION_COLUMN = re.compile(r"^Q\d+$")
+RECOMMENDATION_COLUMNS = ("recommended_pathway", "confidence", "reasoning", "next_step_message")
+PROFILE_COLUMNS = ("spiritual_stage", "primary_need", "emotional_state")
+
+QUESTIONNAIRE_COLUMNS = ["id", "user_id", "entry_type", "answers", "created_at"]
+RECOMMENDATION_TABLE_COLUMNS = [
+    "id", "user_id", "questionnaire_response_id", "recommended_pathway", "pathway_id",
+    "confidence", "spiritual_stage", "primary_need", "emotional_state",
+    "spiritual_stage_code", "primary_need_code", "emotional_state_code",
+    "reasoning", "next_step_message", "created_at",
+]
+
+ENTRY_TYPES = {entry_type.value: entry_type for entry_type in EntryType}
+
+requests_adapter = TypeAdapter(List[RecommendationRequest])
+recommendations_adapter = TypeAdapter(List[Optional[PathwayRecommendation]])
+timestamps_adapter = TypeAdapter(List[Optional[datetime]])
+
+
+# --- Reading -----------------------------------------------------------------
+
+def _csv_row(row: Dict[str, str]) -> Dict[str, Any]:
+    """Reshape a flat CSV row into the NDJSON layout."""
+    if row.get("answers"):
+        answers = json.loads(row["answers"])
+    else:
+        answers = {k: v for k, v in row.items() if QUESTION_COLUMN.match(k or "") and v}
+    record = {
+        "user_id": row.get("user_id") or None,
+        "entry_type": row.get("entry_type"),
+        "answers": answers,
+        "created_at": row.get("created_at") or None,
+    }
+    if row.get("recommended_pathway"):
+        record["recommendation"] = {
+            **{k: row.get(k) for k in RECOMMENDATION_COLUMNS},
+            "detected_profile": {k: row.get(k) for k in PROFILE_COLUMNS},
+        }
+    return record
+
+
+def read_rows(path: Path) -> Iterator[Tuple[int, Any]]:
+    """Yield (row number, raw record) - raw is an error string for unparseable rows."""
+    with path.open(newline="", encoding="utf-8") as f:
+        if path.suffix.lower() == ".csv":
+            for number, row in enumerate(csv.DictReader(f), start=1):
+                try:
+                    yield number, _csv_row(row)
+                except ValueError as e:
+                    yield number, f"Invalid answers JSON: {e}"
+        else:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield number, json.loads(line)
+                except ValueError as e:
+                    yield number, f"Invalid JSON: {e}"
+
+
+# --- Validation --------------------------------------------------------------
+
+def _validate_all(adapter: TypeAdapter, values: List[Any]) -> Tuple[List[Any], Dict[int, str]]:
+    """
+    Validate a whole column in one call, isolating the rows that fail.
+
+    Returns:
+        (validated values with None for failed rows, {index: error message})
+    """
+    try:
+        return adapter.validate_python(values), {}
+    except ValidationError as e:
+        errors: Dict[int, str] = {}
+        for error in e.errors():
+            index = error["loc"][0]
+            field = ".".join(str(part) for part in error["loc"][1:])
+            errors.setdefault(index, f"{field}: {error['msg']}" if field else error["msg"])
+        good = [i for i in range(len(values)) if i not in errors]
+        validated = [None] * len(values)
+        for i, value in zip(good, adapter.validate_python([values[i] for i in good])):
+            validated[i] = value
+        return validated, errors
+
+
+@lru_cache(maxsize=200_000)
+def _validated_answer(key: str, value: str) -> Tuple[str, str]:
+    """One (question, answer) pair through the real RecommendationRequest rules."""
+    return next(iter(RecommendationRequest.validate_answers({key: value}).items()))
+
+
+def _fast_request(raw: Dict[str, Any]) -> Optional[RecommendationRequest]:
+    """
+    Validate a row with the RecommendationRequest validators, memoized per
+    distinct answer: legacy exports repeat the same few options per question,
+    so most rows are dictionary lookups. Returns None if the row needs the
+    full (slow) validation, which also produces the error message.
+    """
+    answers = raw.get("answers")
+    entry_type = raw.get("entry_type")
+    user_id = raw.get("user_id")
+    if (
+        entry_type not in ENTRY_TYPES
+        or not isinstance(answers, dict)
+        or not 0 < len(answers) <= settings.MAX_ANSWERS_COUNT
+        or not (user_id is None or isinstance(user_id, str) and len(user_id) <= 255)
+    ):
+        return None
+    try:
+        validated = {}
+        for key, value in answers.items():
+            if not isinstance(key, str) or not isinstance(value, str):
+                return None
+            key, value = _validated_answer(key, value)
+            validated[key] = value
+        user_id = RecommendationRequest.validate_user_id(user_id)
+    except ValueError:
+        return None
+    return RecommendationRequest.model_construct(
+        user_id=user_id, entry_type=ENTRY_TYPES[entry_type], answers=validated
+    )
+
+
+def validate_batch(batch: List[Tuple[int, Any]], default_created_at: datetime):
+    """
+    Validate a batch of raw records with RecommendationRequest rules.
+
+    Args:
+        batch: (row number, raw record) pairs
+        default_created_at: created_at for rows that have none
+
+    Returns:
+        (valid rows as (row number, request, created_at, recommendation),
+         rejects as (row number, raw record, reason))
+    """
+    rejects = [
+        (n, None, raw) if isinstance(raw, str) else (n, raw, "Expected a JSON object")
+        for n, raw in batch if not isinstance(raw, dict)
+    ]
+    batch = [(n, raw) for n, raw in batch if isinstance(raw, dict)]
+
+    requests = [_fast_request(raw) for _, raw in batch]
+    slow = [i for i, request in enumerate(requests) if request is None]
+    errors: Dict[int, str] = {}
+    if slow:
+        slow_requests, slow_errors = _validate_all(requests_adapter, [
+            {"user_id": batch[i][1].get("user_id"), "entry_type": batch[i][1].get("entry_type"),
+             "answers": batch[i][1].get("answers")}
+            for i in slow
+        ])
+        for j, i in enumerate(slow):
+            requests[i] = slow_requests[j]
+            if j in slow_errors:
+                errors[i] = slow_errors[j]
+    timestamps, time_errors = _validate_all(timestamps_adapter, [raw.get("created_at") for _, raw in batch])
+    recommendations, rec_errors = _validate_all(
+        recommendations_adapter, [raw.get("recommendation") for _, raw in batch]
+    )
+
+    valid = []
+    for i, (number, raw) in enumerate(batch):
+        reason = errors.get(i) or time_errors.get(i) or rec_errors.get(i)
+        if reason:
+            rejects.append((number, raw, reason))
+            continue
+        created_at = timestamps[i] or default_created_at
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        valid.append((number, requests[i], created_at, recommendations[i]))
+    return valid, rejects
+
+
+# --- Loading -----------------------------------------------------------------
+
+class Importer:
+    """Loads validated batches with COPY; one transaction per batch."""
+
+    def __init__(self):
+        self.user_ids: Dict[str, uuid.UUID] = {}  # external_user_id -> users.id seen so far
+        self.months = set()  # Months with an ensured partition
+
+    def _row_id(self, source: str, number: int, kind: str) -> uuid.UUID:
+        return uuid.uuid5(IMPORT_NAMESPACE, f"{source}:{number}:{kind}")
+
+    async def _upsert_users(
+        self, pg: asyncpg.Connection, rows, source: str
+    ) -> Tuple[Dict[int, uuid.UUID], Dict[str, uuid.UUID]]:
+        """
+        Insert missing users.
+
+        Returns:
+            (row number -> users.id, newly resolved external ids to remember
+            once the transaction has committed)
+        """
+        resolved: Dict[str, uuid.UUID] = {}
+        new_users = {}  # external id (or anonymous row key) -> (id, external id)
+        for number, request, _, _ in rows:
+            external = request.user_id
+            if external is None:
+                new_users[number] = (self._row_id(source, number, "user"), None)
+            elif external not in self.user_ids and external not in new_users:
+                new_users[external] = (uuid.uuid5(IMPORT_NAMESPACE, f"user:{external}"), external)
+
+        if new_users:
+            await pg.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS import_users "
+                "(id UUID, external_user_id VARCHAR(255)) ON COMMIT DELETE ROWS"
+            )
+            await pg.copy_records_to_table(
+                "import_users", records=list(new_users.values()), columns=["id", "external_user_id"]
+            )
+            await pg.execute(
+                "INSERT INTO users (id, external_user_id, created_at, updated_at) "
+                "SELECT id, external_user_id, now() AT TIME ZONE 'utc', now() AT TIME ZONE 'utc' "
+                "FROM import_users ON CONFLICT DO NOTHING"
+            )
+            # Existing users keep their id, whatever we generated for them
+            for record in await pg.fetch(
+                "SELECT users.id, users.external_user_id FROM users "
+                "JOIN import_users USING (external_user_id)"
+            ):
+                resolved[record["external_user_id"]] = record["id"]
+
+        known = {**self.user_ids, **resolved}
+        row_users = {
+            number: known[request.user_id] if request.user_id else new_users[number][0]
+            for number, request, _, _ in rows
+        }
+        return row_users, resolved
+
+    def _records(self, rows, source: str, user_ids: Dict[int, uuid.UUID]):
+        questionnaires, recommendations = [], []
+        for number, request, created_at, recommendation in rows:
+            questionnaire_id = self._row_id(source, number, "questionnaire")
+            questionnaires.append((
+                questionnaire_id, user_ids[number], request.entry_type.value,
+                json.dumps(request.answers), created_at,
+            ))
+            if recommendation is not None:
+                profile = recommendation.detected_profile
+                recommendations.append((
+                    self._row_id(source, number, "recommendation"), user_ids[number], questionnaire_id,
+                    recommendation.recommended_pathway,
+                    resolve_pathway_id(recommendation.recommended_pathway),
+                    recommendation.confidence,
+                    profile.spiritual_stage, profile.primary_need, profile.emotional_state,
+                    profile_code(SpiritualStage, profile.spiritual_stage),
+                    profile_code(PrimaryNeed, profile.primary_need),
+                    profile_code(EmotionalState, profile.emotional_state),
+                    recommendation.reasoning, recommendation.next_step_message, created_at,
+                ))
+        return questionnaires, recommendations
+
+    async def _copy(self, pg: asyncpg.Connection, table: str, columns: List[str], records, safe: bool):
+        if not records:
+            return
+        if not safe:
+            await pg.copy_records_to_table(table, records=records, columns=columns)
+            return
+        # Retry path: COPY into a scratch table and skip rows whose id already
+        # exists - by id, as a partitioned table's key also includes created_at
+        scratch = f"import_{table}"
+        await pg.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {scratch} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+        await pg.copy_records_to_table(scratch, records=records, columns=columns)
+        column_list = ", ".join(columns)
+        await pg.execute(
+            f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {scratch} s "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE t.id = s.id) ON CONFLICT DO NOTHING"
+        )
+
+    async def load(self, rows, source: str) -> int:
+        """Load one validated batch. Returns the number of recommendations loaded."""
+        if settings.DB_PARTITIONING_ENABLED:
+            months = {month_start(created_at) for _, _, created_at, _ in rows} - self.months
+            if months:
+                async with async_engine.begin() as conn:
+                    await ensure_partitions(conn, months=months)
+                self.months |= months
+
+        for safe in (False, True):
+            try:
+                async with async_engine.connect() as conn:
+                    pg = (await conn.get_raw_connection()).driver_connection
+                    # The transaction is asyncpg's own: SQLAlchemy only begins one
+                    # on its first statement, and none runs through it here
+                    async with pg.transaction():
+                        user_ids, resolved = await self._upsert_users(pg, rows, source)
+                        questionnaires, recommendations = self._records(rows, source, user_ids)
+                        if not safe and settings.DB_PARTITIONING_ENABLED:
+                            # The key includes created_at, so a re-imported row with a
+                            # different created_at wouldn't conflict: look for the ids
+                            safe = await pg.fetchval(
+                                "SELECT EXISTS (SELECT 1 FROM questionnaire_responses WHERE id = ANY($1::uuid[]))",
+                                [record[0] for record in questionnaires],
+                            )
+                            if safe:
+                                print(f"  {source}: batch partly imported before, skipping existing rows")
+                        await self._copy(pg, "questionnaire_responses", QUESTIONNAIRE_COLUMNS, questionnaires, safe)
+                        await self._copy(
+                            pg, "pathway_recommendations", RECOMMENDATION_TABLE_COLUMNS, recommendations, safe
+                        )
+                if len(self.user_ids) > 1_000_000:
+                    self.user_ids.clear()
+                self.user_ids.update(resolved)
+                return len(recommendations)
+            except asyncpg.UniqueViolationError:
+                if safe:
+                    raise
+                # Some rows were loaded by an earlier run that stopped before checkpointing
+                print(f"  {source}: batch partly imported before, retrying with conflict skipping")
+
+
+# --- Checkpoints ---------------------------------------------------------------
+
+def load_checkpoint(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Rows done per file ("files") and each file's default created_at ("created_at")."""
+    checkpoint = json.loads(path.read_text()) if path.exists() else {}
+    return {"files": checkpoint.get("files", {}), "created_at": checkpoint.get("created_at", {})}
+
+
+def save_checkpoint(path: Path, checkpoint: Dict[str, Dict[str, Any]]):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(checkpoint, indent=2))
+    os.replace(tmp, path)  # Atomic, so a crash never leaves a torn checkpoint
+
+
+def default_created_at(path: Path, checkpoint: Dict[str, Dict[str, Any]]) -> datetime:
+    """created_at for a file's undated rows: its mtime when first imported, then kept in the checkpoint."""
+    source = path.name
+    if source not in checkpoint["created_at"]:
+        mtime = datetime.fromtimestamp(path.stat().st_mtime, timezone.utc).replace(tzinfo=None)
+        checkpoint["created_at"][source] = mtime.isoformat()
+    return datetime.fromisoformat(checkpoint["created_at"][source])
+
+
+# --- Main ----------------------------------------------------------------------
+
+async def run(args: argparse.Namespace):
+    checkpoint_path = Path(args.checkpoint)
+    checkpoint = load_checkpoint(checkpoint_path)
+    done = checkpoint["files"]
+    importer = Importer()
+    totals = {"read": 0, "questionnaires": 0, "recommendations": 0, "rejected": 0}
+    validate_seconds = 0.0
+    first, last = None, None
+    start = time.perf_counter()
+
+    with open(args.rejects, "a", encoding="utf-8") as rejects_file:
+        for path in map(Path, args.files):
+            source = path.name
+            skip = done.get(source, 0)
+            if skip:
+                print(f"{source}: resuming after row {skip}")
+            position = skip
+            file_created_at = default_created_at(path, checkpoint)
+            save_checkpoint(checkpoint_path, checkpoint)
+
+            rows = read_rows(path)
+            while True:
+                batch = []
+                for number, raw in rows:
+                    if number <= skip:
+                        continue
+                    batch.append((number, raw))
+                    if len(batch) >= args.batch_size:
+                        break
+                if not batch:
+                    break
+
+                t0 = time.perf_counter()
+                valid, rejects = validate_batch(batch, file_created_at)
+                validate_seconds += time.perf_counter() - t0
+
+                if valid:
+                    totals["recommendations"] += await importer.load(valid, source)
+                    totals["questionnaires"] += len(valid)
+                    batch_times = [created_at for _, _, created_at, _ in valid]
+                    first = min(t for t in (first, *batch_times) if t)
+                    last = max(t for t in (last, *batch_times) if t)
+                for number, raw, reason in rejects:
+                    rejects_file.write(json.dumps({"file": source, "row": number, "error": reason, "record": raw}) + "\n")
+                rejects_file.flush()
+
+                totals["read"] += len(batch)
+                totals["rejected"] += len(rejects)
+                position = batch[-1][0]
+                done[source] = position
+                save_checkpoint(checkpoint_path, checkpoint)
+
+                elapsed = time.perf_counter() - start
+                print(f"{source}: row {position}, {totals['read'] / elapsed:.0f} rows/s")
+
+    await async_engine.dispose()
+    elapsed = time.perf_counter() - start
+
+    print("\n=== Import summary ===")
+    print(f"Rows read:               {totals['read']}")
+    print(f"Questionnaires imported: {totals['questionnaires']}")
+    print(f"Recommendations:         {totals['recommendations']}")
+    print(f"Rejected:                {totals['rejected']} (see {args.rejects})")
+    print(f"Elapsed:                 {elapsed:.1f}s")
+    if totals["read"]:
+        print(f"Throughput:              {totals['read'] / elapsed:.0f} rows/s overall")
+        print(f"Validation:              {totals['read'] / max(validate_seconds, 1e-9):.0f} rows/s")
+    if totals["recommendations"] and first:
+        print(
+            "\nUpdate analytics with:\n"
+            f"  python scripts/rebuild_rollups.py --since {first:%Y-%m-%d} "
+            f"--until {(last.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)).isoformat()}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="NDJSON (.ndjson/.jsonl) or CSV (.csv) files")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per transaction (default 5000)")
+    parser.add_argument(
+        "--checkpoint", default="import-checkpoint.json",
+        help="Checkpoint file, keyed by input file name (default import-checkpoint.json)",
+    )
+    parser.add_argument(
+        "--rejects", default="import-rejects.ndjson",
+        help="Where invalid rows are appended (default import-rejects.ndjson)",
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
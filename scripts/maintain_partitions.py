@@ -0,0 +1,71 @@
+"""
+Maintain the monthly partitions of questionnaire_responses and
+pathway_recommendations (requires DB_PARTITIONING_ENABLED=true).
+
+Creates partitions for the coming months and detaches (or drops) partitions
+older than the retention period. Run it at least monthly, e.g. from cron:
+
+    0 3 1 * * cd /app && python scripts/maintain_partitions.py
+
+Usage:
+    python scripts/maintain_partitions.py
+    python scripts/maintain_partitions.py --months-ahead 6 --retention-months 24
+    python scripts/maintain_partitions.py --retention-months 12 --drop --dry-run
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import asyncio
+
+from app.config import settings
+from app.db.database import async_engine
+from app.db.partitions import apply_retention, ensure_partitions
+
+
+async def maintain(args: argparse.Namespace) -> int:
+    if not settings.DB_PARTITIONING_ENABLED:
+        print("DB_PARTITIONING_ENABLED is not set - tables are not partitioned.")
+        return 1
+
+    async with async_engine.begin() as conn:
+        created = await ensure_partitions(conn, args.months_ahead, dry_run=args.dry_run)
+        removed = await apply_retention(
+            conn, args.retention_months, args.drop, dry_run=args.dry_run
+        )
+
+    await async_engine.dispose()
+
+    prefix = "Would " if args.dry_run else ""
+    action = "drop" if (args.drop if args.drop is not None else settings.PARTITION_RETENTION_DROP) else "detach"
+    for name in created:
+        print(f"{prefix}create {name}")
+    for name in removed:
+        print(f"{prefix}{action} {name}")
+    print(f"{len(created)} partitions created, {len(removed)} removed")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--months-ahead", type=int, default=None,
+        help=f"Months to create ahead (default PARTITION_PREMAKE_MONTHS={settings.PARTITION_PREMAKE_MONTHS})",
+    )
+    parser.add_argument(
+        "--retention-months", type=int, default=None,
+        help=f"Full months to keep, 0 keeps all (default PARTITION_RETENTION_MONTHS={settings.PARTITION_RETENTION_MONTHS})",
+    )
+    parser.add_argument(
+        "--drop", action="store_true", default=None,
+        help="Drop expired partitions instead of only detaching them",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only print what would be done")
+    sys.exit(asyncio.run(maintain(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Apply database schema migrations (Alembic, see migrations/).
+
+Run once per deploy, before the app workers start: they check the schema
+revision at startup and refuse to run against an older one. `python run.py`
+runs this for you. A database created before migrations existed is adopted
+automatically. Concurrent runs are serialized by an advisory lock.
+
+Usage:
+    python scripts/migrate.py                    # upgrade to the newest revision
+    python scripts/migrate.py --revision 0003    # upgrade to a specific revision
+    python scripts/migrate.py --check            # only report the current revision
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import asyncio
+import logging
+
+from app.db.database import async_engine
+from app.db.migrations import SchemaVersionError, head_revision, migrate, verify_schema
+
+
+async def check() -> int:
+    try:
+        revision = await verify_schema(async_engine)
+        print(f"Database schema is up to date (revision {revision})")
+        return 0
+    except SchemaVersionError as e:
+        print(e)
+        return 1
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--revision", default="head", help="Target revision (default: newest)")
+    parser.add_argument("--check", action="store_true", help="Only check the revision; exit 1 if behind")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    if args.check:
+        sys.exit(asyncio.run(check()))
+
+    before, after = migrate(args.revision)
+    if before == after:
+        print(f"Database schema already at revision {after}")
+    else:
+        print(f"Migrated database schema from {before or 'empty'} to {after} (newest: {head_revision()})")
+
+
+if __name__ == "__main__":
+    main()
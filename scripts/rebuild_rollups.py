@@ -0,0 +1,113 @@
+"""
+Rebuild the hourly pathway_rollups table from pathway_recommendations.
+
+The app keeps the rollups up to date as it writes recommendations. Use this
+script to backfill history (e.g. after first deploying the rollup table, or
+after running scripts/backfill_pathway_ids.py) or to repair a time range.
+The range is rebuilt one day per transaction, so each day's rollup rows are
+replaced atomically and only that day's partition is scanned.
+
+Usage:
+    python scripts/rebuild_rollups.py                      # everything
+    python scripts/rebuild_rollups.py --since 2026-01-01 --until 2026-02-01
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select
+
+from app.db.database import async_engine
+from app.db.models import PathwayRecommendationRecord, PathwayRollup, QuestionnaireResponse
+
+R = PathwayRecommendationRecord
+Q = QuestionnaireResponse
+
+
+def rollup_select(start: datetime, end: datetime):
+    """Aggregate one time range of recommendations into rollup rows."""
+    bucket = func.date_trunc("hour", R.created_at)
+    dimensions = [
+        bucket,
+        func.coalesce(R.pathway_id, 0),
+        Q.entry_type,
+        func.coalesce(R.spiritual_stage_code, 0),
+        func.coalesce(R.primary_need_code, 0),
+        func.coalesce(R.emotional_state_code, 0),
+    ]
+    return (
+        select(*dimensions, func.count(), func.sum(R.confidence))
+        .join(Q, Q.id == R.questionnaire_response_id)
+        .where(
+            R.created_at >= start,
+            R.created_at < end,
+            # A questionnaire is stored just before its recommendation; bounding
+            # it too lets Postgres prune questionnaire partitions
+            Q.created_at >= start - timedelta(days=1),
+            Q.created_at < end,
+        )
+        .group_by(*dimensions)
+    )
+
+
+async def rebuild(since: datetime, until: datetime):
+    columns = [
+        PathwayRollup.bucket,
+        PathwayRollup.pathway_id,
+        PathwayRollup.entry_type,
+        PathwayRollup.spiritual_stage_code,
+        PathwayRollup.primary_need_code,
+        PathwayRollup.emotional_state_code,
+        PathwayRollup.recommendation_count,
+        PathwayRollup.confidence_sum,
+    ]
+    if since is None:
+        async with async_engine.connect() as conn:
+            since = (await conn.execute(select(func.min(R.created_at)))).scalar()
+        if since is None:
+            print("No recommendations yet - nothing to rebuild.")
+            return
+    since = since.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    day, days, start = since, 0, time.perf_counter()
+    while day < until:
+        next_day = min(day + timedelta(days=1), until)
+        async with async_engine.begin() as conn:
+            await conn.execute(
+                delete(PathwayRollup).where(PathwayRollup.bucket >= day, PathwayRollup.bucket < next_day)
+            )
+            await conn.execute(insert(PathwayRollup).from_select(columns, rollup_select(day, next_day)))
+        days += 1
+        if days % 30 == 0:
+            print(f"Rebuilt up to {next_day:%Y-%m-%d} ({time.perf_counter() - start:.1f}s)")
+        day = next_day
+
+    await async_engine.dispose()
+    print(f"\nRebuilt {days} days of rollups in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--since", type=datetime.fromisoformat, default=None,
+        help="First day to rebuild (UTC, default: oldest recommendation)",
+    )
+    parser.add_argument(
+        "--until", type=datetime.fromisoformat, default=None,
+        help="End of the range, exclusive (UTC, default: start of the current hour)",
+    )
+    args = parser.parse_args()
+    # The current hour is left to the app's incremental updates
+    until = args.until or datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    asyncio.run(rebuild(args.since, until))
+
+
+if __name__ == "__main__":
+    main()
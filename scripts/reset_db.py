@@ -17,7 +17,22 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 import asyncio
 from sqlalchemy import text
 from app.db.database import async_engine
-from app.db.models import Base
+from app.db.migrations import upgrade_database
+from app.core.cache import RedisCache
+from app.core.history_cache import HistoryCache
+from app.core.user_resolver import UserResolver
+
+
+async def clear_user_caches():
+    """Drop cached user id mappings and history pages - they refer to the dropped users."""
+    client = await RedisCache.get_available_client()
+    if not client:
+        return
+    print("Clearing cached user references...")
+    for prefix in (UserResolver.KEY_PREFIX, HistoryCache.PAGE_PREFIX):
+        async for key in client.scan_iter(match=f"{prefix}*", count=1000):
+            await client.delete(key)
+    await RedisCache.close()
 
 
 async def reset_database():
@@ -30,17 +45,21 @@ async def reset_database():
         # Drop tables in correct order (respecting foreign keys)
         await conn.execute(text("DROP TABLE IF EXISTS pathway_enrollments CASCADE"))
         await conn.execute(text("DROP TABLE IF EXISTS pathway_recommendations CASCADE"))
+        await conn.execute(text("DROP TABLE IF EXISTS ai_raw_responses CASCADE"))
+        await conn.execute(text("DROP TABLE IF EXISTS pathway_rollups CASCADE"))
         await conn.execute(text("DROP TABLE IF EXISTS questionnaire_responses CASCADE"))
         await conn.execute(text("DROP TABLE IF EXISTS users CASCADE"))
+        await conn.execute(text("DROP TABLE IF EXISTS api_keys"))
+        await conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
 
         print("Tables dropped successfully!")
 
-        print("Creating tables with UUID schema...")
-        await conn.run_sync(Base.metadata.create_all)
-
-        print("Tables created successfully!")
+    print("Creating tables from migrations...")
+    _, revision = await upgrade_database(async_engine)
+    print(f"Tables created successfully! (schema revision {revision})")
 
     await async_engine.dispose()
+    await clear_user_caches()
     print("\nDatabase reset complete! You can now run: python run.py")
 
 
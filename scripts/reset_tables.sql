@@ -4,8 +4,13 @@
 -- Drop tables in correct order (respecting foreign keys)
 DROP TABLE IF EXISTS pathway_enrollments CASCADE;
 DROP TABLE IF EXISTS pathway_recommendations CASCADE;
+DROP TABLE IF EXISTS ai_raw_responses CASCADE;
+DROP TABLE IF EXISTS pathway_rollups CASCADE;
 DROP TABLE IF EXISTS questionnaire_responses CASCADE;
 DROP TABLE IF EXISTS users CASCADE;
+DROP TABLE IF EXISTS api_keys;
+-- Migration history: the next `python scripts/migrate.py` adopts the tables below
+DROP TABLE IF EXISTS alembic_version;
 
 -- Create users table with UUID
 CREATE TABLE users (
@@ -24,23 +29,49 @@ CREATE TABLE questionnaire_responses (
     created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW()
 );
 
+-- Create ai_raw_responses table (raw AI payloads, stored once per content hash)
+CREATE TABLE ai_raw_responses (
+    content_hash VARCHAR(64) PRIMARY KEY,
+    payload JSON NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW()
+);
+
 -- Create pathway_recommendations table
 CREATE TABLE pathway_recommendations (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     user_id UUID NOT NULL REFERENCES users(id),
     questionnaire_response_id UUID NOT NULL REFERENCES questionnaire_responses(id),
     recommended_pathway VARCHAR(255) NOT NULL,
+    pathway_id SMALLINT,
     confidence FLOAT NOT NULL,
     spiritual_stage VARCHAR(100) NOT NULL,
     primary_need VARCHAR(100) NOT NULL,
     emotional_state VARCHAR(100) NOT NULL,
+    spiritual_stage_code SMALLINT,
+    primary_need_code SMALLINT,
+    emotional_state_code SMALLINT,
     reasoning TEXT NOT NULL,
     next_step_message TEXT NOT NULL,
+    raw_response_hash VARCHAR(64) REFERENCES ai_raw_responses(content_hash),
     raw_ai_response JSON,
     created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW()
 );
 
+-- Create pathway_rollups table (hourly analytics counts, maintained by the app)
+CREATE TABLE pathway_rollups (
+    bucket TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    pathway_id SMALLINT NOT NULL,
+    entry_type VARCHAR(50) NOT NULL,
+    spiritual_stage_code SMALLINT NOT NULL,
+    primary_need_code SMALLINT NOT NULL,
+    emotional_state_code SMALLINT NOT NULL,
+    recommendation_count INTEGER NOT NULL DEFAULT 0,
+    confidence_sum FLOAT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, pathway_id, entry_type, spiritual_stage_code, primary_need_code, emotional_state_code)
+);
+
 -- Create indexes for better query performance
 CREATE INDEX idx_users_external_id ON users(external_user_id);
 CREATE INDEX idx_questionnaire_user_id ON questionnaire_responses(user_id);
 CREATE INDEX idx_recommendations_user_id ON pathway_recommendations(user_id);
+CREATE INDEX ix_recommendations_pathway_id_created ON pathway_recommendations(pathway_id, created_at);